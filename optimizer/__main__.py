@@ -0,0 +1,7 @@
+"""Headless-запуск: ``python -m optimizer fleet inventory.jsonl -o configs/``."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,323 @@
+"""Фоновый советник: подстройка настроек под нагрузку в течение суток.
+
+Калькулятор считает настройки один раз, а нагрузка меняется: днём
+упираемся в диск, ночью — в лимит соединений. Советник опрашивает
+qBittorrent (``sync/maindata``), окно за окном диагностирует узкое место
+(``diagnostics``) и через ``setPreferences`` по одному шагу меняет
+кэш диска, лимиты соединений и активных раздач:
+
+- пределы — от половины до двойного значения калькулятора (не шире
+  пределов UI qBittorrent); «авто» (-1) и 0 не трогаются, как и поля,
+  ключей которых нет в ``app/preferences`` (``disk_cache`` в сборках с
+  libtorrent 2.0 — сервер молча игнорирует такие ключи);
+- гистерезис — действуем, только если вердикт повторился ``confirm``
+  окон подряд со счётом ≥ 1; к значениям калькулятора возвращаемся,
+  когда все счета < ``RELAX_SCORE`` столько же окон;
+- ограничение частоты — не чаще одного изменения в ``cooldown_sec``,
+  одно поле за раз, шаг ×``step``;
+- эффект — следующее окно после изменения сравнивается с предыдущим;
+  если скорость упала больше чем на ``regression``, а узкое место не
+  ослабло, изменение откатывается.
+
+Каждое изменение и его измеренный эффект пишутся в журнал (JSONL).
+"""
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from .benchmark_manager import BenchmarkManager
+from .calculator import MAX_CONNECTIONS_GLOBAL, MAX_CONNECTIONS_PER_TORRENT, clamp
+from .diagnostics import INCONCLUSIVE, QUEUED_JOBS_LIMIT, QUEUE_TIME_LIMIT_MS, RunContext, diagnose_run
+from .models import OptimizedSettings
+from .sync_client import MaindataSync
+from .timeseries import MB, CounterRates, TimeSeries
+
+RELAX_SCORE = 0.5
+
+
+@dataclass(frozen=True)
+class Knob:
+    """Подстраиваемое поле ``OptimizedSettings`` и его ключ WebAPI."""
+    name: str
+    pref_key: str
+    floor: int
+    ceiling: int
+
+
+DEFAULT_KNOBS: tuple[Knob, ...] = (
+    Knob("disk_cache_mb", "disk_cache", 64, 8192),
+    Knob("max_connections_global", "max_connec", 50, MAX_CONNECTIONS_GLOBAL),
+    Knob("max_connections_per_torrent", "max_connec_per_torrent", 10, MAX_CONNECTIONS_PER_TORRENT),
+    Knob("max_active_downloads", "max_active_downloads", 1, 200),
+    Knob("max_active_torrents", "max_active_torrents", 2, 5000),
+)
+
+
+@dataclass
+class ChangeRecord:
+    """Одно изменение настройки и его измеренный эффект."""
+    timestamp: float
+    knob: str
+    pref_key: str
+    old: int
+    new: int
+    verdict: str
+    reason: str
+    score_before: float
+    throughput_before: float  # МБ/с, загрузка + отдача
+    score_after: Optional[float] = None
+    throughput_after: Optional[float] = None
+    reverted: bool = False
+
+    @property
+    def effect_pct(self) -> Optional[float]:
+        if self.throughput_after is None or not self.throughput_before:
+            return None
+        return (self.throughput_after - self.throughput_before) / self.throughput_before * 100
+
+
+class TuningAdvisor:
+    """Замкнутый цикл подстройки поверх рассчитанных ``OptimizedSettings``."""
+
+    def __init__(
+        self,
+        manager: BenchmarkManager,
+        settings: OptimizedSettings,
+        context: RunContext = RunContext(),
+        knobs: tuple[Knob, ...] = DEFAULT_KNOBS,
+        window: int = 60,
+        confirm: int = 3,
+        cooldown_sec: float = 300,
+        step: float = 1.25,
+        regression: float = 0.15,
+        log_path: Optional[Union[str, Path]] = None,
+        on_change: Optional[Callable[[ChangeRecord], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.manager = manager
+        self.sync = MaindataSync(manager)
+        self.rates = CounterRates()
+        self.context = context
+        self.window = window
+        self.confirm = confirm
+        self.cooldown_sec = cooldown_sec
+        self.step = step
+        self.regression = regression
+        self.log_path = Path(log_path) if log_path else None
+        self.on_change = on_change
+        self.clock = clock
+
+        # Поля с «авто»/выключенным значением не трогаем
+        self.knobs = {k.name: k for k in knobs if getattr(settings, k.name) > 0}
+        self.baseline = {name: getattr(settings, name) for name in self.knobs}
+        self.current = dict(self.baseline)
+        self.bounds = {
+            name: (max(k.floor, self.baseline[name] // 2), min(k.ceiling, self.baseline[name] * 2))
+            for name, k in self.knobs.items()
+        }
+        self.skipped: list[str] = []  # поля, неизвестные серверу (см. load_current)
+        self.samples: list[dict[str, Any]] = []
+        self.changes: list[ChangeRecord] = []
+        self._streak: tuple[str, int] = ("", 0)
+        self._last_change = -float("inf")
+        self._pending: Optional[ChangeRecord] = None
+        self._blocked: set[tuple[str, int]] = set()  # (поле, направление) после отката
+        self._stop = threading.Event()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Журнал и применение
+    # ─────────────────────────────────────────────────────────────────────────
+    def _log(self, event: str, record: ChangeRecord):
+        entry = {"event": event, **asdict(record), "effect_pct": record.effect_pct}
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _apply(self, name: str, value: int, verdict: str, reason: str, score: float, throughput: float) -> Optional[ChangeRecord]:
+        knob = self.knobs[name]
+        if not self.manager.set_preferences({knob.pref_key: value}):
+            print(f"Advisor: setPreferences {knob.pref_key}={value} failed")
+            return None
+        record = ChangeRecord(
+            timestamp=time.time(), knob=name, pref_key=knob.pref_key, old=self.current[name], new=value,
+            verdict=verdict, reason=reason, score_before=round(score, 2), throughput_before=round(throughput, 2),
+        )
+        self.current[name] = value
+        self.changes.append(record)
+        self._last_change = self.clock()
+        self._log("applied", record)
+        if self.on_change:
+            self.on_change(record)
+        return record
+
+    def _stepped(self, name: str, direction: int) -> Optional[int]:
+        """Следующее значение в пределах; ``None`` — упёрлись или заблокировано."""
+        if name not in self.knobs or (name, direction) in self._blocked:
+            return None
+        low, high = self.bounds[name]
+        value = self.current[name]
+        target = int(value * self.step) if direction > 0 else int(value / self.step)
+        if target == value:
+            target += direction
+        target = clamp(target, low, high)
+        return target if target != value else None
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Решения
+    # ─────────────────────────────────────────────────────────────────────────
+    def _actions(self, diagnosis) -> list[tuple[str, int, str]]:
+        """Кандидаты (поле, направление, причина) по вердикту, по приоритету."""
+        e = diagnosis.evidence
+        if diagnosis.verdict == "disk":
+            actions = []
+            if e["read_cache_overload"] or e["write_cache_overload"]:
+                actions.append(("disk_cache_mb", 1, "переполнение кэша диска"))
+            if e["queued_io_jobs"] >= QUEUED_JOBS_LIMIT or e["average_time_queue"] >= QUEUE_TIME_LIMIT_MS:
+                reason = f"очередь диска {e['queued_io_jobs']:.0f} заданий, {e['average_time_queue']:.0f} мс"
+                actions += [("max_active_downloads", -1, reason), ("max_active_torrents", -1, reason)]
+            return actions
+        if diagnosis.verdict == "peers":
+            reason = f"{e['peers']:.0f} пиров при лимите {self.current.get('max_connections_global')}"
+            return [("max_connections_global", 1, reason), ("max_connections_per_torrent", 1, reason)]
+        if diagnosis.verdict == "cpu":
+            return [("max_connections_global", -1, "CPU у предела")]
+        return []
+
+    def _relax_action(self) -> list[tuple[str, int, str]]:
+        """Шаг к значениям калькулятора: сначала самое далёкое от них поле."""
+        drift = sorted(
+            (abs(self.current[n] - self.baseline[n]) / self.baseline[n], n)
+            for n in self.knobs if self.current[n] != self.baseline[n]
+        )
+        return [
+            (n, 1 if self.current[n] < self.baseline[n] else -1, "нагрузка спала: возврат к расчёту")
+            for _, n in reversed(drift)
+        ]
+
+    def _finish_pending(self, diagnosis, throughput: float) -> bool:
+        """Эффект последнего изменения; ``True`` — изменение откатили."""
+        record, self._pending = self._pending, None
+        record.score_after = diagnosis.scores.get(record.verdict, 0.0)
+        record.throughput_after = round(throughput, 2)
+        self._log("measured", record)
+        effect = record.effect_pct
+        if (
+            effect is not None and effect < -self.regression * 100
+            and record.score_after >= record.score_before
+            and record.verdict != "relax"
+        ):
+            direction = 1 if record.new > record.old else -1
+            self._blocked.add((record.knob, direction))
+            record.reverted = True
+            self._apply(record.knob, record.old, "revert",
+                        f"скорость {effect:+.0f}% без ослабления узкого места — откат",
+                        record.score_after, throughput)
+            return True
+        return False
+
+    def evaluate(self) -> Optional[ChangeRecord]:
+        """Разобрать накопленное окно; вернуть применённое изменение, если было."""
+        samples, self.samples = self.samples, []
+        if not samples:
+            return None
+        series = TimeSeries.from_samples(samples)
+        throughput = (series.mean_rate("dl_speed") + series.mean_rate("ul_speed")) / MB
+        context = replace(
+            self.context, max_connections=self.current.get("max_connections_global", self.context.max_connections)
+        )
+        diagnosis = diagnose_run(samples, context)
+
+        if self._pending is not None and self._finish_pending(diagnosis, throughput):
+            self._streak = ("", 0)
+            return self.changes[-1]
+
+        top = max(diagnosis.scores.values())
+        state = diagnosis.verdict if diagnosis.verdict != INCONCLUSIVE else ("relax" if top < RELAX_SCORE else "hold")
+        verdict, count = self._streak
+        self._streak = (state, count + 1 if state == verdict else 1)
+        if self._streak[1] < self.confirm or state == "hold":
+            return None
+        if self.clock() - self._last_change < self.cooldown_sec:
+            return None
+
+        if state == "relax":
+            self._blocked.clear()
+            actions = self._relax_action()
+        else:
+            actions = self._actions(diagnosis)
+        for name, direction, reason in actions:
+            value = self._stepped(name, direction)
+            if state == "relax" and value is not None:
+                # Не перескакивать значение калькулятора
+                base = self.baseline[name]
+                value = min(value, base) if direction > 0 else max(value, base)
+            if value is None or value == self.current.get(name):
+                continue
+            score = diagnosis.scores.get(state, top)
+            record = self._apply(name, value, state, reason, score, throughput)
+            if record is not None:
+                self._pending = record
+                self._streak = ("", 0)
+            return record
+        return None
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Цикл
+    # ─────────────────────────────────────────────────────────────────────────
+    def sample(self) -> Optional[dict[str, Any]]:
+        """Один опрос в окно."""
+        if not self.sync.update():
+            self.rates.reset()
+            return None
+        stats = self.rates.apply(self.sync.main_stats())
+        self.samples.append(stats)
+        return stats
+
+    def stop(self):
+        """Остановить ``run()`` (безопасно из другого потока)."""
+        self._stop.set()
+
+    def restore(self) -> bool:
+        """Вернуть значения калькулятора."""
+        prefs = {self.knobs[n].pref_key: v for n, v in self.baseline.items() if self.current[n] != v}
+        if prefs and not self.manager.set_preferences(prefs):
+            return False
+        self.current = dict(self.baseline)
+        return True
+
+    def load_current(self) -> bool:
+        """Взять текущие значения из qBittorrent (их могли изменить вручную).
+
+        Поля, ключей которых сервер не вернул, исключаются из подстройки.
+        """
+        prefs = self.manager.get_preferences()
+        if prefs is None:
+            return False
+        for name, knob in list(self.knobs.items()):
+            if knob.pref_key not in prefs:
+                for table in (self.knobs, self.baseline, self.current, self.bounds):
+                    del table[name]
+                self.skipped.append(name)
+                continue
+            if isinstance(prefs.get(knob.pref_key), int) and prefs[knob.pref_key] > 0:
+                self.current[name] = prefs[knob.pref_key]
+        return True
+
+    def run(self, interval: float = 1.0, restore: bool = False):
+        """Опрос до ``stop()``: окно из ``window`` образцов → решение."""
+        self._stop.clear()
+        self.load_current()
+        try:
+            while not self._stop.is_set():
+                self.sample()
+                if len(self.samples) >= self.window:
+                    self.evaluate()
+                self._stop.wait(interval)
+        finally:
+            if restore and not self.restore():
+                print("Advisor: failed to restore calculated preferences")
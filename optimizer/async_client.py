@@ -0,0 +1,353 @@
+"""Асинхронный клиент qBittorrent WebAPI для опроса многих экземпляров.
+
+Транспорт — ``aiohttp``, если установлен (``pip install .[async]``),
+иначе встроенный HTTP/1.1 клиент на ``asyncio`` streams. Оба держат
+пул keep-alive соединений на хост и ограничивают число запросов к нему.
+
+``InstanceMonitor`` опрашивает все экземпляры параллельно (с общим
+лимитом конкурентности) и отдаёт один агрегированный поток снимков
+в формате ``BenchmarkManager.get_main_stats`` / ``get_torrent_stats``.
+"""
+
+import asyncio
+import json
+import ssl
+import time
+from typing import Any, AsyncIterator, Optional
+from urllib.parse import urlencode, urlsplit
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .benchmark_manager import BenchmarkManager
+from .timeseries import CounterRates
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ТРАНСПОРТ
+# ═══════════════════════════════════════════════════════════════════════════════
+class _StreamTransport:
+    """Минимальный HTTP/1.1 клиент: пул keep-alive соединений к одному хосту."""
+
+    def __init__(self, host: str, pool_size: int, timeout: float):
+        url = urlsplit(host)
+        self.scheme = url.scheme or "http"
+        self.hostname = url.hostname or "localhost"
+        self.port = url.port or (443 if self.scheme == "https" else 80)
+        self.timeout = timeout
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _open(self):
+        ctx = ssl.create_default_context() if self.scheme == "https" else None
+        return await asyncio.open_connection(self.hostname, self.port, ssl=ctx)
+
+    @staticmethod
+    def _close(conn):
+        conn[1].close()
+
+    async def _roundtrip(self, conn, method: str, path: str, headers: dict[str, str], body: bytes):
+        reader, writer = conn
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.hostname}:{self.port}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status = status_line.split(None, 2)[:2]
+
+        resp_headers: dict[str, str] = {}
+        cookies: list[str] = []
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                cookies.append(value)
+            resp_headers[name] = value
+
+        keep_alive = resp_headers.get("connection", "").lower() != "close" and (
+            version == b"HTTP/1.1" or resp_headers.get("connection", "").lower() == "keep-alive"
+        )
+        if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in resp_headers:
+            data = await reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), cookies, data, keep_alive
+
+    async def request(self, method: str, path: str, headers: dict[str, str], body: bytes):
+        async with self._slots:
+            reused = bool(self._idle)
+            # Подключение — под тем же таймаутом: недоступный хост не задерживает опрос
+            conn = self._idle.pop() if reused else await asyncio.wait_for(self._open(), self.timeout)
+            try:
+                result = await asyncio.wait_for(self._roundtrip(conn, method, path, headers, body), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                self._close(conn)
+                if not reused:
+                    raise ConnectionError(str(e)) from e
+                # Сервер закрыл простаивавшее соединение — одна попытка на новом
+                conn = await asyncio.wait_for(self._open(), self.timeout)
+                try:
+                    result = await asyncio.wait_for(self._roundtrip(conn, method, path, headers, body), self.timeout)
+                except BaseException:
+                    self._close(conn)
+                    raise
+            except BaseException:
+                self._close(conn)
+                raise
+            status, cookies, data, keep_alive = result
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                self._close(conn)
+            return status, cookies, data
+
+    async def close(self):
+        while self._idle:
+            self._close(self._idle.pop())
+
+
+class _AiohttpTransport:
+    """Транспорт на aiohttp (пул соединений — TCPConnector)."""
+
+    def __init__(self, host: str, pool_size: int, timeout: float):
+        self.host = host.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+
+    async def request(self, method: str, path: str, headers: dict[str, str], body: bytes):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                cookie_jar=aiohttp.DummyCookieJar(),  # SID передаём сами
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        async with self._session.request(method, self.host + path, headers=headers, data=body) as resp:
+            return resp.status, resp.headers.getall("Set-Cookie", []), await resp.read()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# КЛИЕНТ
+# ═══════════════════════════════════════════════════════════════════════════════
+class AsyncQBittorrentClient:
+    """Асинхронный аналог ``BenchmarkManager`` для одного экземпляра.
+
+    ``transport``: ``"auto"`` (aiohttp, если есть), ``"aiohttp"`` или ``"stdlib"``.
+    """
+
+    def __init__(
+        self,
+        host: str = "http://localhost:8080",
+        username: str = "admin",
+        password: str = "adminadmin",
+        pool_size: int = 4,
+        timeout: float = 5.0,
+        transport: str = "auto",
+    ):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self.timeout = timeout
+        if transport == "auto":
+            transport = "aiohttp" if aiohttp is not None else "stdlib"
+        if transport == "aiohttp" and aiohttp is None:
+            raise ImportError("aiohttp is not installed: pip install aiohttp")
+        self.transport = transport
+        self.is_connected = False
+        self._sid: Optional[str] = None
+        self._http = None
+
+    def _transport(self):
+        # Создаём в работающем цикле событий (Semaphore/ClientSession привязаны к нему)
+        if self._http is None:
+            cls = _AiohttpTransport if self.transport == "aiohttp" else _StreamTransport
+            self._http = cls(self.host, self.pool_size, self.timeout)
+        return self._http
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[dict[str, Any]] = None,
+        form: Optional[dict[str, Any]] = None,
+    ) -> tuple[int, bytes]:
+        path = urlsplit(self.host).path.rstrip("/") + f"/api/v2/{endpoint}"
+        if params:
+            path += "?" + urlencode(params)
+        headers = {"Accept": "application/json"}
+        body = b""
+        if form is not None:
+            body = urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self._sid:
+            headers["Cookie"] = f"SID={self._sid}"
+
+        status, cookies, data = await self._transport().request(method, path, headers, body)
+        for cookie in cookies:
+            name, _, value = cookie.split(";", 1)[0].partition("=")
+            if name.strip() == "SID":
+                self._sid = value.strip()
+        if status == 403:
+            self.is_connected = False
+        return status, data
+
+    async def _get_json(self, endpoint: str, params: Optional[dict[str, Any]] = None) -> Any:
+        if not self.is_connected:
+            return None
+        try:
+            status, data = await self._request("GET", endpoint, params=params)
+            if status == 200:
+                return json.loads(data)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            pass
+        return None
+
+    async def connect(self) -> bool:
+        """Авторизация в qBittorrent WebUI."""
+        self._sid = None
+        try:
+            status, data = await self._request(
+                "POST", "auth/login", form={"username": self.username, "password": self.password}
+            )
+            self.is_connected = status == 200 and b"Ok" in data
+        except (OSError, asyncio.TimeoutError) as e:
+            print(f"Login error ({self.host}): {e}")
+            self.is_connected = False
+        return self.is_connected
+
+    async def get_transfer_info(self) -> Optional[dict[str, Any]]:
+        return await self._get_json("transfer/info")
+
+    async def get_main_stats(self) -> dict[str, Any]:
+        """То же, что ``BenchmarkManager.get_main_stats``."""
+        return BenchmarkManager.main_stats_from_info(await self.get_transfer_info())
+
+    async def get_torrent_stats(self, torrent_hash: str) -> Optional[dict[str, Any]]:
+        """То же, что ``BenchmarkManager.get_torrent_stats``."""
+        torrents = await self._get_json("torrents/info", {"hashes": torrent_hash})
+        if torrents:
+            return BenchmarkManager.torrent_stats_from_record(torrents[0])
+        return None
+
+    async def get_maindata(self, rid: int = 0) -> Optional[dict[str, Any]]:
+        """То же, что ``BenchmarkManager.get_maindata``."""
+        return await self._get_json("sync/maindata", {"rid": rid})
+
+    async def get_preferences(self) -> Optional[dict[str, Any]]:
+        return await self._get_json("app/preferences")
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ОПРОС МНОГИХ ЭКЗЕМПЛЯРОВ
+# ═══════════════════════════════════════════════════════════════════════════════
+class InstanceMonitor:
+    """Параллельный опрос экземпляров с общим лимитом конкурентности.
+
+    ``torrent_hashes`` — необязательный торрент на экземпляр (host → hash),
+    статистика по нему попадает в снимок как ``torrent``.
+    """
+
+    def __init__(
+        self,
+        clients: list[AsyncQBittorrentClient],
+        max_concurrency: int = 16,
+        torrent_hashes: Optional[dict[str, str]] = None,
+    ):
+        self.clients = clients
+        self.max_concurrency = max_concurrency
+        self.torrent_hashes = torrent_hashes or {}
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._rates = {c.host: CounterRates() for c in clients}
+
+    async def _poll_one(self, client: AsyncQBittorrentClient) -> dict[str, Any]:
+        async with self._limit:
+            start = time.monotonic()
+            if not client.is_connected and not await client.connect():
+                return {"ok": False, "error": "login failed"}
+            info = await client.get_transfer_info()
+            if info is None:
+                # Таймаут или ошибка: нули не должны попасть в сумму парка
+                return {"ok": False, "error": "transfer/info failed"}
+            main = self._rates[client.host].apply(BenchmarkManager.main_stats_from_info(info))
+            torrent = None
+            torrent_hash = self.torrent_hashes.get(client.host)
+            if torrent_hash:
+                torrent = await client.get_torrent_stats(torrent_hash)
+            return {
+                "ok": True,
+                "main": main,
+                "torrent": torrent,
+                "latency_ms": round((time.monotonic() - start) * 1000, 1),
+            }
+
+    async def poll(self) -> dict[str, Any]:
+        """Один проход по всем экземплярам → агрегированный снимок."""
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        timestamp = time.time()
+        results = await asyncio.gather(
+            *(self._poll_one(c) for c in self.clients), return_exceptions=True
+        )
+
+        instances = {}
+        total = {"dl_speed": 0, "ul_speed": 0, "dht_nodes": 0, "online": 0}
+        for client, result in zip(self.clients, results):
+            if isinstance(result, BaseException):
+                result = {"ok": False, "error": f"{type(result).__name__}: {result}"}
+            instances[client.host] = result
+            if result["ok"]:
+                total["online"] += 1
+                for key in ("dl_speed", "ul_speed", "dht_nodes"):
+                    total[key] += result["main"].get(key, 0)
+        return {"timestamp": timestamp, "instances": instances, "total": total}
+
+    async def stream(self, interval: float = 1.0, count: Optional[int] = None) -> AsyncIterator[dict[str, Any]]:
+        """Снимки с периодом ``interval`` (``count`` — ограничить число)."""
+        n = 0
+        next_tick = time.monotonic()
+        while count is None or n < count:
+            yield await self.poll()
+            n += 1
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.clients))
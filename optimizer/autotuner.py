@@ -0,0 +1,243 @@
+"""Автоподбор настроек по живой пропускной способности qBittorrent.
+
+Кандидаты применяются через ``/api/v2/app/setPreferences``, каждый
+замеряется обычной выборкой ``BenchmarkManager`` (``get_main_stats`` +
+``analyze_results``). Поиск — покоординатный hill-climbing: на каждой
+итерации текущая точка и её соседи проходят successive halving
+(половина худших отсеивается, длительность замера удваивается).
+
+Исходные настройки восстанавливаются всегда — и по завершении,
+и при прерывании (``abort()``, KeyboardInterrupt, ошибка).
+
+Параметры, ключей которых нет в ``app/preferences`` (например,
+``disk_cache`` в сборках с libtorrent 2.0), не перебираются: сервер
+молча игнорирует такие ключи, и их кандидаты различались бы только шумом.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .benchmark_manager import BenchmarkManager
+from .models import OptimizedSettings
+from .timeseries import CounterRates
+
+
+@dataclass(frozen=True)
+class TuningParameter:
+    """Настраиваемый параметр: ключ WebAPI и упорядоченная лестница значений."""
+    name: str
+    pref_key: str
+    candidates: tuple[int, ...]
+
+    def nearest_index(self, value: int) -> int:
+        """Индекс ближайшего к ``value`` кандидата."""
+        return min(range(len(self.candidates)), key=lambda i: abs(self.candidates[i] - value))
+
+
+# Имена совпадают с полями OptimizedSettings
+DEFAULT_PARAMETERS: tuple[TuningParameter, ...] = (
+    TuningParameter("max_connections_global", "max_connec",
+                    (100, 200, 300, 500, 750, 1000, 1500, 2000)),
+    TuningParameter("upload_slots_global", "max_uploads",
+                    (10, 20, 50, 100, 200, 400, 800)),
+    TuningParameter("async_io_threads", "async_io_threads",
+                    (4, 8, 16, 32, 64, 128)),
+    TuningParameter("send_buffer_watermark_kb", "send_buffer_watermark",
+                    (500, 1000, 2000, 5000, 8000, 16000, 32000)),
+    TuningParameter("disk_cache_mb", "disk_cache",
+                    (-1, 128, 256, 512, 1024, 2048, 4096)),
+)
+
+
+@dataclass
+class Trial:
+    """Один замер кандидата."""
+    values: dict[str, int]
+    duration_sec: float
+    score: float
+    analysis: dict[str, Any]
+
+
+@dataclass
+class AutoTuneResult:
+    """Итог автоподбора."""
+    best_values: dict[str, int]
+    best_score: float
+    start_values: dict[str, int]
+    start_score: Optional[float]
+    trials: list[Trial] = field(default_factory=list)
+    iterations: int = 0
+    skipped: list[str] = field(default_factory=list)  # параметры, неизвестные серверу
+    aborted: bool = False
+    restored: bool = False
+
+
+class _Aborted(Exception):
+    pass
+
+
+OBJECTIVES: dict[str, Callable[[dict[str, Any]], float]] = {
+    "total": lambda a: a.get("avg_dl_mbps", 0) + a.get("avg_ul_mbps", 0),
+    "download": lambda a: a.get("avg_dl_mbps", 0),
+    "upload": lambda a: a.get("avg_ul_mbps", 0),
+}
+
+
+class AutoTuner:
+    """Замкнутый цикл подбора настроек на живом qBittorrent."""
+
+    def __init__(
+        self,
+        manager: BenchmarkManager,
+        parameters: tuple[TuningParameter, ...] = DEFAULT_PARAMETERS,
+        objective: str = "total",
+        time_budget_sec: float = 900,
+        min_duration_sec: float = 10,
+        sample_interval_sec: float = 1,
+        settle_sec: float = 5,
+        on_trial: Optional[Callable[[Trial], None]] = None,
+    ):
+        self.manager = manager
+        self.parameters = parameters
+        self.objective = OBJECTIVES[objective]
+        self.time_budget_sec = time_budget_sec
+        self.min_duration_sec = min_duration_sec
+        self.sample_interval_sec = sample_interval_sec
+        self.settle_sec = settle_sec
+        self.on_trial = on_trial
+        self._stop = threading.Event()
+        self._deadline = 0.0
+        self._active = parameters  # параметры, известные серверу (уточняется в run)
+
+    def abort(self):
+        """Прервать поиск (безопасно из другого потока)."""
+        self._stop.set()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Замеры
+    # ─────────────────────────────────────────────────────────────────────────
+    def _sleep(self, seconds: float):
+        if self._stop.wait(seconds):
+            raise _Aborted()
+
+    def _values(self, point: tuple[int, ...]) -> dict[str, int]:
+        return {p.name: p.candidates[i] for p, i in zip(self._active, point)}
+
+    def _apply(self, point: tuple[int, ...]):
+        prefs = {p.pref_key: p.candidates[i] for p, i in zip(self._active, point)}
+        if not self.manager.set_preferences(prefs):
+            raise RuntimeError("setPreferences failed")
+
+    def _measure(self, point: tuple[int, ...], duration: float) -> Trial:
+        self._apply(point)
+        self._sleep(self.settle_sec)
+
+        history = []
+        rates = CounterRates()
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            history.append(rates.apply(self.manager.get_main_stats()))
+            self._sleep(self.sample_interval_sec)
+
+        analysis = self.manager.analyze_results(history)
+        trial = Trial(self._values(point), duration, self.objective(analysis), analysis)
+        if self.on_trial:
+            self.on_trial(trial)
+        return trial
+
+    def _fits(self, duration: float) -> bool:
+        return time.monotonic() + self.settle_sec + duration <= self._deadline
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Поиск
+    # ─────────────────────────────────────────────────────────────────────────
+    def _neighbors(self, point: tuple[int, ...]) -> list[tuple[int, ...]]:
+        result = []
+        for k, p in enumerate(self._active):
+            for step in (-1, 1):
+                i = point[k] + step
+                if 0 <= i < len(p.candidates):
+                    result.append(point[:k] + (i,) + point[k + 1:])
+        return result
+
+    def _successive_halving(
+        self,
+        points: list[tuple[int, ...]],
+        result: AutoTuneResult,
+    ) -> Optional[tuple[tuple[int, ...], float]]:
+        """Отсеять кандидатов; вернуть победителя и его оценку на последнем круге."""
+        duration = self.min_duration_sec
+        scores: dict[tuple[int, ...], float] = {}
+        while True:
+            rung: dict[tuple[int, ...], float] = {}
+            for point in points:
+                if not self._fits(duration):
+                    break
+                trial = self._measure(point, duration)
+                result.trials.append(trial)
+                rung[point] = trial.score
+            if not rung:
+                break
+            scores = rung
+            if len(rung) == 1:
+                break
+            ranked = sorted(rung, key=rung.get, reverse=True)
+            points = ranked[: (len(ranked) + 1) // 2]
+            duration *= 2
+
+        if not scores:
+            return None
+        winner = max(scores, key=scores.get)
+        return winner, scores[winner]
+
+    def run(self, start: Optional[OptimizedSettings] = None) -> AutoTuneResult:
+        """Запустить поиск в пределах бюджета времени.
+
+        ``start`` — начальная точка (обычно результат калькулятора);
+        без неё поиск стартует с текущих настроек qBittorrent.
+        """
+        self._stop.clear()
+        self._deadline = time.monotonic() + self.time_budget_sec
+
+        original = self.manager.get_preferences()
+        if original is None:
+            raise RuntimeError("Cannot read preferences: not connected to qBittorrent WebAPI")
+        self._active = tuple(p for p in self.parameters if p.pref_key in original)
+        if not self._active:
+            raise RuntimeError("None of the tuning parameters is supported by this qBittorrent")
+        saved = {p.pref_key: original[p.pref_key] for p in self._active}
+
+        if start is not None:
+            point = tuple(p.nearest_index(getattr(start, p.name)) for p in self._active)
+        else:
+            point = tuple(p.nearest_index(int(original[p.pref_key])) for p in self._active)
+
+        result = AutoTuneResult(
+            best_values=self._values(point),
+            best_score=0.0,
+            start_values=self._values(point),
+            start_score=None,
+            skipped=[p.name for p in self.parameters if p not in self._active],
+        )
+        try:
+            while not self._stop.is_set():
+                result.iterations += 1
+                outcome = self._successive_halving([point] + self._neighbors(point), result)
+                if outcome is None:
+                    break
+                winner, score = outcome
+                if result.start_score is None:
+                    first = [t for t in result.trials if t.values == result.start_values]
+                    result.start_score = first[0].score if first else None
+                result.best_values = self._values(winner)
+                result.best_score = score
+                if winner == point:
+                    break  # локальный максимум
+                point = winner
+        except (_Aborted, KeyboardInterrupt):
+            result.aborted = True
+        finally:
+            result.restored = self.manager.set_preferences(saved)
+        return result
@@ -0,0 +1,537 @@
+"""Пакетный (векторный) расчёт настроек для большого парка машин.
+
+Повторяет логику ``calculate_optimal_settings`` на колонках NumPy:
+каждая ветка if/elif превращается в маску, а значения выбираются
+через ``np.select``; ступенчатые разделы читаются из ``TierTable``. Категориальные поля (тип накопителя, среда и т.д.)
+передаются целочисленными кодами — индексом члена в своём Enum.
+"""
+
+from typing import Any, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .models import (
+    NetworkSettings,
+    HardwareSettings,
+    UsageSettings,
+    ConnectionType,
+    StorageType,
+    EnvironmentProfile,
+    TrackerType,
+    UserRole,
+    ProtocolMode,
+    EncryptionMode,
+)
+from .calculator import (
+    MAX_CONNECTIONS_GLOBAL,
+    MAX_CONNECTIONS_PER_TORRENT,
+    MAX_UPLOAD_SLOTS_GLOBAL,
+    MAX_UPLOAD_SLOTS_PER_TORRENT,
+    SEND_BUFFER_MIN_KB,
+    SEND_BUFFER_MAX_KB,
+    SEND_BUFFER_LOW_MIN_KB,
+    MIN_CONNECTIONS_PER_ACTIVE_TORRENT,
+    ACTIVE_TORRENTS_DISK_CAP,
+    FILE_POOL_DEFAULT,
+    FILE_POOL_MAX,
+    LARGE_TORRENT_GB,
+    HASHING_THREADS_MAX,
+    port_seed_for,
+    stable_port,
+)
+from . import memory_model as mm
+from .tiers import DIMENSIONS, ENUM_FIELDS, Section, TierTable, DEFAULT_TIER_TABLE
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# КОДЫ КАТЕГОРИЙ (индекс члена Enum)
+# ═══════════════════════════════════════════════════════════════════════════════
+CONNECTION_CODES = list(ConnectionType)
+STORAGE_CODES = list(StorageType)
+ENVIRONMENT_CODES = list(EnvironmentProfile)
+TRACKER_CODES = list(TrackerType)
+ROLE_CODES = list(UserRole)
+PROTOCOL_CODES = list(ProtocolMode)
+ENCRYPTION_CODES = list(EncryptionMode)
+
+# Колонки результата в порядке полей OptimizedSettings (без warnings/explanations)
+RESULT_FIELDS = (
+    "global_upload_limit_kbps",
+    "global_download_limit_kbps",
+    "upload_slots_global",
+    "upload_slots_per_torrent",
+    "max_connections_global",
+    "max_connections_per_torrent",
+    "max_active_downloads",
+    "max_active_uploads",
+    "max_active_torrents",
+    "disk_cache_mb",
+    "enable_os_cache",
+    "pre_allocate_disk",
+    "async_io_threads",
+    "coalesce_reads_writes",
+    "protocol_mode",
+    "send_buffer_watermark_kb",
+    "send_buffer_low_watermark_kb",
+    "send_buffer_factor",
+    "socket_backlog_size",
+    "outgoing_connections_per_second",
+    "listening_port",
+    "encryption_mode",
+    "anonymous_mode",
+    "enable_dht",
+    "enable_pex",
+    "enable_lsd",
+    "network_interface",
+    "super_seeding",
+    "file_pool_size",
+    "hashing_threads",
+)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for batch calculation: pip install numpy")
+
+
+def _code(codes: list, member) -> int:
+    return codes.index(member)
+
+
+def _section_columns(
+    section: Section,
+    dims: dict[str, Any],
+    metrics: dict[str, Any],
+    shape: tuple,
+) -> dict[str, Any]:
+    """Векторный аналог ``Section.select``.
+
+    Строки группируются по лестницам раздела, номер ступени ищется
+    ``np.searchsorted`` по тем же порогам, что и ``bisect`` в скалярном
+    расчёте. Enum-поля возвращаются кодами.
+    """
+    combo = np.zeros(shape, dtype=np.int64)
+    for d in section.dims:
+        combo = combo * len(DIMENSIONS[d][0]) + dims[d]
+
+    out: dict[str, Any] = {}
+    for ladder, keys in section.ladders().values():
+        codes = []
+        for key in keys:
+            code = 0
+            for d, member in zip(section.dims, key):
+                code = code * len(DIMENSIONS[d][0]) + list(DIMENSIONS[d][0]).index(member)
+            codes.append(code)
+        mask = np.isin(combo, codes)
+        if not mask.any():
+            continue
+
+        if ladder.bounds:
+            side = "left" if ladder.inclusive else "right"
+            idx = np.searchsorted(ladder.bounds, metrics[ladder.metric][mask], side=side)
+        else:
+            idx = np.zeros(int(mask.sum()), dtype=np.int64)
+
+        for name in ladder.tiers[0].values:
+            values = [t.values[name] for t in ladder.tiers]
+            if name in ENUM_FIELDS:
+                values = [list(ENUM_FIELDS[name]).index(v) for v in values]
+            column = np.asarray(values)
+            if name not in out:
+                out[name] = np.zeros(shape, dtype=column.dtype)
+            out[name][mask] = column[idx]
+    return out
+
+
+def _row_port(dl, up, conn, vpn, vpn_iface, seed) -> int:
+    network = NetworkSettings(
+        download_speed_mbps=float(dl),
+        upload_speed_mbps=float(up),
+        connection_type=CONNECTION_CODES[conn],
+        use_vpn=bool(vpn),
+        vpn_interface=vpn_iface,
+        isp_throttling=True,
+        port_seed=seed,
+    )
+    return stable_port(port_seed_for(network))
+
+
+def profiles_to_columns(
+    profiles: Sequence[tuple[NetworkSettings, HardwareSettings, UsageSettings]],
+) -> dict[str, Any]:
+    """Преобразовать список профилей (network, hardware, usage) в колонки."""
+    _require_numpy()
+    cols: dict[str, list] = {
+        "download_speed_mbps": [],
+        "upload_speed_mbps": [],
+        "connection_type": [],
+        "use_vpn": [],
+        "vpn_interface": [],
+        "isp_throttling": [],
+        "port_seed": [],
+        "rtt_ms": [],
+        "storage_type": [],
+        "ram_gb": [],
+        "cpu_cores": [],
+        "is_hybrid_cpu": [],
+        "p_cores": [],
+        "ram_share": [],
+        "tracker_type": [],
+        "user_role": [],
+        "environment": [],
+        "torrent_count": [],
+        "library_size_gb": [],
+    }
+    for n, h, u in profiles:
+        if h.disk is not None:
+            raise ValueError("Measured disk profiles are not supported by the batch engine; use calculate_optimal_settings")
+        cols["download_speed_mbps"].append(n.download_speed_mbps)
+        cols["upload_speed_mbps"].append(n.upload_speed_mbps)
+        cols["connection_type"].append(_code(CONNECTION_CODES, n.connection_type))
+        cols["use_vpn"].append(n.use_vpn)
+        cols["vpn_interface"].append(n.vpn_interface)
+        cols["isp_throttling"].append(n.isp_throttling)
+        cols["port_seed"].append(n.port_seed)
+        cols["rtt_ms"].append(np.nan if n.rtt_ms is None else n.rtt_ms)
+        cols["storage_type"].append(_code(STORAGE_CODES, h.storage_type))
+        cols["ram_gb"].append(h.ram_gb)
+        cols["cpu_cores"].append(h.cpu_cores)
+        cols["is_hybrid_cpu"].append(h.is_hybrid_cpu)
+        cols["p_cores"].append(h.p_cores)
+        cols["ram_share"].append(h.ram_share)
+        cols["tracker_type"].append(_code(TRACKER_CODES, u.tracker_type))
+        cols["user_role"].append(_code(ROLE_CODES, u.user_role))
+        cols["environment"].append(_code(ENVIRONMENT_CODES, u.environment))
+        cols["torrent_count"].append(u.torrent_count)
+        cols["library_size_gb"].append(u.library_size_gb)
+
+    return {
+        "download_speed_mbps": np.asarray(cols["download_speed_mbps"], dtype=np.float64),
+        "upload_speed_mbps": np.asarray(cols["upload_speed_mbps"], dtype=np.float64),
+        "connection_type": np.asarray(cols["connection_type"], dtype=np.int8),
+        "use_vpn": np.asarray(cols["use_vpn"], dtype=bool),
+        "vpn_interface": np.asarray(cols["vpn_interface"], dtype=object),
+        "isp_throttling": np.asarray(cols["isp_throttling"], dtype=bool),
+        "port_seed": np.asarray(cols["port_seed"], dtype=object),
+        "rtt_ms": np.asarray(cols["rtt_ms"], dtype=np.float64),
+        "storage_type": np.asarray(cols["storage_type"], dtype=np.int8),
+        "ram_gb": np.asarray(cols["ram_gb"], dtype=np.float64),
+        "cpu_cores": np.asarray(cols["cpu_cores"], dtype=np.int64),
+        "is_hybrid_cpu": np.asarray(cols["is_hybrid_cpu"], dtype=bool),
+        "p_cores": np.asarray(cols["p_cores"], dtype=np.int64),
+        "ram_share": np.asarray(cols["ram_share"], dtype=np.float64),
+        "tracker_type": np.asarray(cols["tracker_type"], dtype=np.int8),
+        "user_role": np.asarray(cols["user_role"], dtype=np.int8),
+        "environment": np.asarray(cols["environment"], dtype=np.int8),
+        "torrent_count": np.asarray(cols["torrent_count"], dtype=np.int64),
+        "library_size_gb": np.asarray(cols["library_size_gb"], dtype=np.float64),
+    }
+
+
+def calculate_optimal_settings_batch(
+    download_speed_mbps,
+    upload_speed_mbps,
+    connection_type,
+    storage_type,
+    ram_gb,
+    cpu_cores,
+    tracker_type,
+    user_role=None,
+    environment=None,
+    use_vpn=None,
+    vpn_interface=None,
+    isp_throttling=None,
+    port_seed=None,
+    rtt_ms=None,
+    is_hybrid_cpu=None,
+    p_cores=None,
+    ram_share=None,
+    torrent_count=None,
+    library_size_gb=None,
+    tiers: Optional[TierTable] = None,
+) -> dict[str, Any]:
+    """Рассчитать настройки для массива профилей.
+
+    Все аргументы — одномерные массивы одинаковой длины (или скаляры).
+    Возвращает словарь колонок с именами полей ``OptimizedSettings``;
+    ``protocol_mode`` и ``encryption_mode`` возвращаются кодами
+    (см. ``PROTOCOL_CODES`` / ``ENCRYPTION_CODES``). Ступенчатые разделы
+    берутся из той же таблицы ``tiers``, что и в скалярном расчёте.
+    ``rtt_ms`` — NaN там, где RTT не измерен.
+    """
+    _require_numpy()
+    if tiers is None:
+        tiers = DEFAULT_TIER_TABLE
+
+    dl = np.asarray(download_speed_mbps, dtype=np.float64)
+    up = np.asarray(upload_speed_mbps, dtype=np.float64)
+    n = np.broadcast(dl, up).shape
+    dl = np.broadcast_to(dl, n)
+    up = np.broadcast_to(up, n)
+
+    def col(value, default, dtype):
+        if value is None:
+            value = default
+        return np.broadcast_to(np.asarray(value, dtype=dtype), n)
+
+    conn = col(connection_type, 0, np.int8)
+    storage = col(storage_type, 0, np.int8)
+    ram = col(ram_gb, 0, np.float64)
+    cores = col(cpu_cores, 0, np.int64)
+    tracker = col(tracker_type, 0, np.int8)
+    role = col(user_role, _code(ROLE_CODES, UserRole.LEECHER), np.int8)
+    env = col(environment, _code(ENVIRONMENT_CODES, EnvironmentProfile.SYSTEM), np.int8)
+    vpn = col(use_vpn, False, bool)
+    vpn_iface = col(vpn_interface, "", object)
+    throttling = col(isp_throttling, False, bool)
+    seeds = col(port_seed, "", object)
+    rtt = col(rtt_ms, np.nan, np.float64)
+    hybrid = col(is_hybrid_cpu, False, bool)
+    pcores = col(p_cores, 0, np.int64)
+    share = col(ram_share, 0.5, np.float64)
+    count = col(torrent_count, 0, np.int64)
+    library = col(library_size_gb, 0.0, np.float64)
+
+    is_private = tracker == _code(TRACKER_CODES, TrackerType.PRIVATE)
+    is_seedbox = env == _code(ENVIRONMENT_CODES, EnvironmentProfile.SEEDBOX)
+    is_docker = env == _code(ENVIRONMENT_CODES, EnvironmentProfile.DOCKER)
+    is_fiber = conn == _code(CONNECTION_CODES, ConnectionType.FIBER)
+    is_seeder = role == _code(ROLE_CODES, UserRole.SEEDER)
+    is_uploader = role == _code(ROLE_CODES, UserRole.UPLOADER)
+    is_leecher = role == _code(ROLE_CODES, UserRole.LEECHER)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # CONNECTION LIMITS
+    # ═══════════════════════════════════════════════════════════════════════════
+    upload_speed_kbps = (up * 1000 / 8).astype(np.int64)
+    global_upload_limit = (upload_speed_kbps * 0.8).astype(np.int64)
+    global_download_limit = np.zeros(n, dtype=np.int64)
+
+    upload_slots_global = np.select(
+        [is_private, is_seedbox, is_seeder, is_uploader],
+        [50, 200, np.maximum(50, global_upload_limit // 8), np.maximum(50, global_upload_limit // 5)],
+        np.maximum(30, global_upload_limit // 10),
+    )
+    upload_slots_per_torrent = np.select(
+        [is_private, is_seedbox, is_seeder, is_uploader],
+        [6, 50, np.maximum(10, global_upload_limit // 20), np.maximum(15, global_upload_limit // 15)],
+        np.maximum(5, global_upload_limit // 30),
+    )
+    upload_slots_global = np.clip(upload_slots_global, 1, MAX_UPLOAD_SLOTS_GLOBAL)
+    upload_slots_per_torrent = np.clip(upload_slots_per_torrent, 1, MAX_UPLOAD_SLOTS_PER_TORRENT)
+
+    dims = {
+        "tracker": tracker,
+        "role": role,
+        "environment": env,
+        "storage": storage,
+        "connection": conn,
+    }
+    metrics = {
+        "download_speed_mbps": dl,
+        "upload_speed_mbps": up,
+        "ram_gb": ram,
+    }
+
+    connections = _section_columns(tiers.sections["connections"], dims, metrics, n)
+    max_connections = np.clip(connections["max_connections_global"], 1, MAX_CONNECTIONS_GLOBAL)
+    max_connections_per_torrent = np.clip(
+        connections["max_connections_per_torrent"], 1, MAX_CONNECTIONS_PER_TORRENT
+    )
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # TORRENT QUEUEING
+    # ═══════════════════════════════════════════════════════════════════════════
+    queue = _section_columns(tiers.sections["queue"], dims, metrics, n)
+    max_active_downloads = queue["max_active_downloads"]
+    max_active_uploads = queue["max_active_uploads"]
+    max_active_torrents = max_active_downloads + max_active_uploads
+
+    # Размер библиотеки
+    has_library = count > 0
+    disk_cap = np.asarray([ACTIVE_TORRENTS_DISK_CAP[s] for s in STORAGE_CODES])[storage]
+    active_cap = np.minimum(disk_cap, MAX_CONNECTIONS_GLOBAL // MIN_CONNECTIONS_PER_ACTIVE_TORRENT)
+    max_active_uploads = np.where(
+        has_library & ~is_leecher,
+        np.maximum(max_active_uploads, np.minimum(count, active_cap)),
+        max_active_uploads,
+    )
+    max_active_torrents = max_active_downloads + max_active_uploads
+    max_connections = np.where(
+        has_library,
+        np.clip(
+            np.maximum(max_connections, max_active_torrents * MIN_CONNECTIONS_PER_ACTIVE_TORRENT),
+            1, MAX_CONNECTIONS_GLOBAL,
+        ),
+        max_connections,
+    )
+    avg_torrent_gb = library / np.where(has_library, count, 1)
+    handles = np.where(avg_torrent_gb >= LARGE_TORRENT_GB, 4, 2)
+    file_pool_size = np.where(
+        has_library,
+        np.clip(max_active_torrents * handles, FILE_POOL_DEFAULT, FILE_POOL_MAX),
+        FILE_POOL_DEFAULT,
+    )
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # DISK I/O
+    # ═══════════════════════════════════════════════════════════════════════════
+    disk = _section_columns(tiers.sections["disk_io"], dims, metrics, n)
+    disk_cache = disk["disk_cache_mb"]
+    enable_os_cache = disk["enable_os_cache"]
+    pre_allocate_disk = disk["pre_allocate_disk"]
+
+    async_io = np.where(hybrid & (pcores > 0), 4 * pcores, 4 * cores)
+    hash_cores = np.where(hybrid & (pcores > 0), pcores, cores)
+    hashing_threads = np.where(
+        storage == _code(STORAGE_CODES, StorageType.HDD),
+        1, np.clip(hash_cores // 2, 1, HASHING_THREADS_MAX),
+    )
+    coalesce = np.ones(n, dtype=bool)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # NETWORK TUNING
+    # ═══════════════════════════════════════════════════════════════════════════
+    net = _section_columns(tiers.sections["network"], dims, metrics, n)
+    send_buffer = net["send_buffer_watermark_kb"]
+    send_buffer_low = net["send_buffer_low_watermark_kb"]
+    send_buffer_factor = net["send_buffer_factor"]
+
+    # Send buffer по BDP там, где измерен RTT (см. calculator.bdp_send_buffer)
+    has_rtt = rtt > 0  # NaN → False
+    rtt_or_zero = np.where(has_rtt, rtt, 0.0)
+    bdp_high = np.clip(
+        np.ceil(2 * upload_speed_kbps * rtt_or_zero / 1000), SEND_BUFFER_MIN_KB, SEND_BUFFER_MAX_KB
+    ).astype(np.int64)
+    bdp_low = np.clip(
+        np.ceil(2 * upload_speed_kbps * rtt_or_zero / 1000 / upload_slots_global), SEND_BUFFER_LOW_MIN_KB, bdp_high
+    ).astype(np.int64)
+    bdp_factor = np.clip(np.ceil(rtt_or_zero / 5), 50, 200).astype(np.int64)
+    send_buffer = np.where(has_rtt, bdp_high, send_buffer)
+    send_buffer_low = np.where(has_rtt, bdp_low, send_buffer_low)
+    send_buffer_factor = np.where(has_rtt, bdp_factor, send_buffer_factor)
+    socket_backlog = net["socket_backlog_size"]
+    outgoing_per_sec = net["outgoing_connections_per_second"]
+    tcp = _code(PROTOCOL_CODES, ProtocolMode.TCP_ONLY)
+    protocol = np.where(is_fiber & ~is_docker, tcp, net["protocol_mode"]).astype(np.int8)
+
+    # Порт детерминирован (CRC32 зерна) — считаем только для строк с обходом DPI
+    listening_port = np.full(n, "Стандартный", dtype=object)
+    throttled = np.flatnonzero(throttling)
+    if throttled.size:
+        flat = [a.reshape(-1) for a in (dl, up, conn, vpn, vpn_iface, seeds)]
+        listening_port.reshape(-1)[throttled] = [
+            f"Random ({_row_port(*(column[i] for column in flat))})"
+            for i in throttled
+        ]
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # PRIVACY
+    # ═══════════════════════════════════════════════════════════════════════════
+    encryption = np.where(
+        throttling,
+        _code(ENCRYPTION_CODES, EncryptionMode.REQUIRE),
+        _code(ENCRYPTION_CODES, EncryptionMode.PREFER),
+    ).astype(np.int8)
+    anonymous = ~is_private
+    enable_dht = ~is_private
+    enable_pex = ~is_private
+    enable_lsd = ~is_private
+
+    has_iface = vpn_iface != ""
+    network_interface = np.where(
+        vpn | is_docker,
+        np.where(has_iface, vpn_iface, np.where(is_docker, "tun0", "")),
+        "",
+    ).astype(object)
+
+    super_seeding = is_uploader.copy()
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # БЮДЖЕТ ПАМЯТИ (см. memory_model.fit_memory_budget)
+    # ═══════════════════════════════════════════════════════════════════════════
+    def memory(cache_mb, connections, watermark, low):
+        per_peer_rate_kb = global_upload_limit / upload_slots_global
+        per_peer_kb = np.minimum(watermark, np.maximum(low, per_peer_rate_kb * send_buffer_factor / 100))
+        torrents = np.where(count > 0, count, max_active_torrents)
+        cache = np.where(cache_mb < 0, ram * 1024 / mm.AUTO_CACHE_DIVISOR, cache_mb.astype(np.float64))
+        send = upload_slots_global * per_peer_kb / 1024
+        total = (
+            0.0 + mm.BASE_MB + cache + send
+            + connections * mm.PEER_CONNECTION_KB / 1024
+            + (torrents * mm.TORRENT_OVERHEAD_KB / 1024
+               + library * 1024 ** 3 / mm.AVG_PIECE_BYTES * mm.PIECE_HASH_BYTES / 1024 ** 2)
+            + max_active_downloads * mm.PIECE_PICKER_KB / 1024
+        )
+        return cache, send, total
+
+    limit = ram * 1024 * share
+    cache, send, total = memory(disk_cache, max_connections, send_buffer, send_buffer_low)
+    excess = total - limit
+
+    new_cache = np.maximum(mm.DISK_CACHE_FLOOR_MB, np.floor(cache - excess))
+    shrink = (excess > 0) & (disk_cache != 0) & (new_cache < cache)
+    disk_cache = np.where(shrink, new_cache, disk_cache).astype(np.int64)
+    excess = np.where(shrink, excess - (cache - new_cache), excess)
+
+    new_conns = np.maximum(
+        np.minimum(max_connections, mm.CONNECTIONS_FLOOR),
+        max_connections - np.ceil(excess * 1024 / mm.PEER_CONNECTION_KB),
+    ).astype(np.int64)
+    shrink = (excess > 0) & (new_conns < max_connections)
+    excess = np.where(shrink, excess - (max_connections - new_conns) * mm.PEER_CONNECTION_KB / 1024, excess)
+    max_connections = np.where(shrink, new_conns, max_connections)
+    max_connections_per_torrent = np.where(
+        shrink, np.minimum(max_connections_per_torrent, new_conns), max_connections_per_torrent
+    )
+
+    new_watermark = np.maximum(
+        mm.SEND_BUFFER_FLOOR_KB, np.floor((send - excess) * 1024 / upload_slots_global)
+    ).astype(np.int64)
+    shrink = (excess > 0) & (new_watermark < send_buffer)
+    send_buffer = np.where(shrink, new_watermark, send_buffer)
+    send_buffer_low = np.where(shrink, np.minimum(send_buffer_low, new_watermark), send_buffer_low)
+
+    return {
+        "global_upload_limit_kbps": global_upload_limit,
+        "global_download_limit_kbps": global_download_limit,
+        "upload_slots_global": upload_slots_global,
+        "upload_slots_per_torrent": upload_slots_per_torrent,
+        "max_connections_global": max_connections,
+        "max_connections_per_torrent": max_connections_per_torrent,
+        "max_active_downloads": max_active_downloads,
+        "max_active_uploads": max_active_uploads,
+        "max_active_torrents": max_active_torrents,
+        "disk_cache_mb": disk_cache,
+        "enable_os_cache": enable_os_cache,
+        "pre_allocate_disk": pre_allocate_disk,
+        "async_io_threads": async_io,
+        "coalesce_reads_writes": coalesce,
+        "protocol_mode": protocol,
+        "send_buffer_watermark_kb": send_buffer,
+        "send_buffer_low_watermark_kb": send_buffer_low,
+        "send_buffer_factor": send_buffer_factor,
+        "socket_backlog_size": socket_backlog,
+        "outgoing_connections_per_second": outgoing_per_sec,
+        "listening_port": listening_port,
+        "encryption_mode": encryption,
+        "anonymous_mode": anonymous,
+        "enable_dht": enable_dht,
+        "enable_pex": enable_pex,
+        "enable_lsd": enable_lsd,
+        "network_interface": network_interface,
+        "super_seeding": super_seeding,
+        "file_pool_size": file_pool_size,
+        "hashing_threads": hashing_threads,
+    }
+
+
+def calculate_columns(
+    columns: dict[str, Any],
+    tiers: Optional[TierTable] = None,
+) -> dict[str, Any]:
+    """Рассчитать настройки по словарю колонок (см. ``profiles_to_columns``)."""
+    return calculate_optimal_settings_batch(**columns, tiers=tiers)
@@ -3,10 +3,19 @@
 Взаимодействует с qBittorrent WebAPI для сбора метрик производительности.
 """
 
+import json
+import math
+import statistics
 import time
 import requests
 from typing import Optional, Dict, Any, List
 
+from .comparison import ComparisonResult, compare_runs
+from .timeseries import DISK_FIELDS, TimeSeries
+
+MODES = ("baseline", "optimized")
+COMPARED_FIELDS = {"dl_speed": "Загрузка", "ul_speed": "Отдача"}
+
 class BenchmarkManager:
     """Управление замерами производительности."""
 
@@ -16,6 +25,9 @@ class BenchmarkManager:
         self.is_connected = False
         self.baseline_results: Optional[Dict[str, Any]] = None
         self.optimized_results: Optional[Dict[str, Any]] = None
+        # Повторные прогоны: режим → список прогонов (списки образцов)
+        self.runs: Dict[str, List[List[Dict[str, Any]]]] = {mode: [] for mode in MODES}
+        self.comparison: Dict[str, ComparisonResult] = {}
 
     def connect(self, username: str = "admin", password: str = "adminadmin") -> bool:
         """Авторизация в qBittorrent WebUI."""
@@ -45,18 +57,120 @@ class BenchmarkManager:
             pass
         return None
 
+    def get_version(self) -> str:
+        """Версия qBittorrent (app/version), например "v4.6.2"; "" — неизвестна."""
+        if not self.is_connected:
+            return ""
+        try:
+            resp = self.session.get(f"{self.host}/api/v2/app/version", timeout=2)
+            if resp.status_code == 200:
+                return resp.text.strip()
+        except Exception:
+            pass
+        return ""
+
     def get_main_stats(self) -> Dict[str, Any]:
         """Собрать основные показатели для отчета."""
-        info = self.get_transfer_info()
+        return self.main_stats_from_info(self.get_transfer_info())
+
+    @staticmethod
+    def main_stats_from_info(info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Ответ transfer/info → формат get_main_stats."""
         if not info:
             return {"dl_speed": 0, "ul_speed": 0, "dht_nodes": 0}
             
-        return {
+        stats = {
             "dl_speed": info.get("dl_info_speed", 0),  # bytes/s
             "ul_speed": info.get("up_info_speed", 0),  # bytes/s
             "dht_nodes": info.get("dht_nodes", 0),
-            "connection_status": info.get("connection_status", "unknown")
+            "connection_status": info.get("connection_status", "unknown"),
+            "monotonic": time.monotonic(),
+        }
+        # Счётчики байт за сессию: скорость по их приросту (см. CounterRates)
+        if "dl_info_data" in info:
+            stats["dl_data"] = info["dl_info_data"]
+            stats["ul_data"] = info.get("up_info_data", 0)
+        return stats
+
+    @staticmethod
+    def disk_stats_from_state(state: Dict[str, Any]) -> Dict[str, float]:
+        """Дисковая очередь из server_state (sync/maindata); в transfer/info её нет."""
+        stats = {}
+        for key in DISK_FIELDS:
+            try:
+                stats[key] = float(state[key])  # часть полей приходит строкой
+            except (KeyError, TypeError, ValueError):
+                pass
+        return stats
+
+    @staticmethod
+    def torrent_stats_from_record(t: Dict[str, Any]) -> Dict[str, Any]:
+        """Запись torrents/info → формат get_torrent_stats."""
+        stats = {
+            "dl_speed": t.get("dlspeed", 0),
+            "ul_speed": t.get("upspeed", 0),
+            "progress": t.get("progress", 0),
+            "state": t.get("state", "unknown"),
+            "num_seeds": t.get("num_seeds", 0),
+            "num_leechs": t.get("num_leechs", 0),
+            "peers": t.get("num_seeds", 0) + t.get("num_leechs", 0),
+            "monotonic": time.monotonic(),
         }
+        if "downloaded" in t:
+            stats["dl_data"] = t["downloaded"]
+            stats["ul_data"] = t.get("uploaded", 0)
+        return stats
+
+    def get_preferences(self) -> Optional[Dict[str, Any]]:
+        """Получить текущие настройки qBittorrent (app/preferences)."""
+        if not self.is_connected:
+            return None
+        try:
+            url = f"{self.host}/api/v2/app/preferences"
+            resp = self.session.get(url, timeout=5)
+            if resp.status_code == 200:
+                return resp.json()
+        except Exception:
+            pass
+        return None
+
+    def set_preferences(self, prefs: Dict[str, Any]) -> bool:
+        """Изменить настройки qBittorrent на лету (app/setPreferences)."""
+        if not self.is_connected:
+            return False
+        try:
+            url = f"{self.host}/api/v2/app/setPreferences"
+            data = {"json": json.dumps(prefs)}
+            resp = self.session.post(url, data=data, timeout=5)
+            return resp.status_code == 200
+        except Exception:
+            return False
+
+    def get_torrents(self) -> Optional[List[Dict[str, Any]]]:
+        """Список всех торрентов (torrents/info)."""
+        if not self.is_connected:
+            return None
+        try:
+            url = f"{self.host}/api/v2/torrents/info"
+            resp = self.session.get(url, timeout=10)
+            if resp.status_code == 200:
+                return resp.json()
+        except Exception:
+            pass
+        return None
+
+    def get_maindata(self, rid: int = 0) -> Optional[Dict[str, Any]]:
+        """Изменения состояния с момента ``rid`` (sync/maindata)."""
+        if not self.is_connected:
+            return None
+        try:
+            url = f"{self.host}/api/v2/sync/maindata"
+            resp = self.session.get(url, params={"rid": rid}, timeout=5)
+            if resp.status_code == 200:
+                return resp.json()
+        except Exception:
+            pass
+        return None
 
     def add_torrent(self, magnet_url: str, save_path: str = "") -> bool:
         """Добавить торрент в qBittorrent."""
@@ -95,15 +209,7 @@ class BenchmarkManager:
             if resp.status_code == 200:
                 torrents = resp.json()
                 if torrents:
-                    t = torrents[0]
-                    return {
-                        "dl_speed": t.get("dlspeed", 0),
-                        "ul_speed": t.get("upspeed", 0),
-                        "progress": t.get("progress", 0),
-                        "state": t.get("state", "unknown"),
-                        "num_seeds": t.get("num_seeds", 0),
-                        "num_leechs": t.get("num_leechs", 0)
-                    }
+                    return self.torrent_stats_from_record(torrents[0])
         except Exception:
             pass
         return None
@@ -124,29 +230,108 @@ class BenchmarkManager:
         """Проанализировать стабильность и средние показатели."""
         if not history:
             return {}
-            
-        dl_speeds = [h["dl_speed"] for h in history]
-        ul_speeds = [h["ul_speed"] for h in history]
-        dht_nodes = [h["dht_nodes"] for h in history]
-        
-        avg_dl = sum(dl_speeds) / len(dl_speeds)
-        avg_ul = sum(ul_speeds) / len(ul_speeds)
-        avg_dht = sum(dht_nodes) / len(dht_nodes)
-        
-        # Коэффициент вариации (стабильность)
-        if avg_dl > 0:
-            std_dl = (sum((s - avg_dl)**2 for s in dl_speeds) / len(dl_speeds))**0.5
-            stability = 100 - (min(100, (std_dl / avg_dl * 100)))
-        else:
-            stability = 0
-        
-        return {
-            "avg_dl_mbps": round(avg_dl / (1024*1024), 2),
-            "avg_ul_mbps": round(avg_ul / (1024*1024), 2),
-            "avg_dht": int(avg_dht),
-            "stability_score": round(stability, 1),
-            "samples": len(history)
+        return TimeSeries.from_samples(history).analysis()
+
+    def add_run(self, mode: str, samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Добавить прогон; сводка режима — по всем его прогонам."""
+        self.runs[mode].append(list(samples))
+        analysis = self.analyze_results([s for run in self.runs[mode] for s in run])
+        analysis["runs"] = len(self.runs[mode])
+        setattr(self, f"{mode}_results", analysis)
+        return analysis
+
+    def reset_runs(self):
+        self.runs = {mode: [] for mode in MODES}
+        self.baseline_results = self.optimized_results = None
+        self.comparison = {}
+
+    def sample_interval(self) -> float:
+        """Медианный интервал между образцами, сек (1.0 — если не определить)."""
+        gaps = [
+            b["timestamp"] - a["timestamp"]
+            for runs in self.runs.values() for run in runs
+            for a, b in zip(run, run[1:])
+            if "timestamp" in a and "timestamp" in b
+        ]
+        return statistics.median(gaps) if gaps else 1.0
+
+    def snapshot_runs(self) -> Dict[str, List[List[Dict[str, Any]]]]:
+        """Копия прогонов для расчёта в другом потоке (``add_run`` меняет списки)."""
+        return {mode: list(runs) for mode, runs in self.runs.items()}
+
+    @staticmethod
+    def compute_comparison(runs: Dict[str, List[List[Dict[str, Any]]]]) -> Dict[str, ComparisonResult]:
+        """Статистическое сравнение прогонов (бутстрап — заметная нагрузка на CPU).
+
+        Не трогает состояние менеджера — можно вызывать из фонового потока
+        со снимком ``snapshot_runs``.
+        """
+        comparison = {}
+        for field in COMPARED_FIELDS:
+            result = compare_runs(
+                [[s.get(field, 0) for s in run] for run in runs["baseline"]],
+                [[s.get(field, 0) for s in run] for run in runs["optimized"]],
+            )
+            if result is not None:
+                comparison[field] = result
+        return comparison
+
+    def update_comparison(self) -> Dict[str, ComparisonResult]:
+        """Сравнить текущие прогоны и запомнить результат."""
+        self.comparison = self.compute_comparison(self.snapshot_runs())
+        return self.comparison
+
+    def _significance_report(self) -> str:
+        """HTML-блок со значимостью, интервалами и нужной длиной прогона."""
+        if not self.comparison:
+            return ""
+        mb = 1024 * 1024
+        interval = self.sample_interval()
+        verdicts = {
+            "improved": ("#28a745", "✅ реальное улучшение"),
+            "regressed": ("#dc3545", "❌ реальное ухудшение"),
+            "inconclusive": ("#ffc107", "≈ разница не доказана"),
         }
+        rows = []
+        for field, label in COMPARED_FIELDS.items():
+            r = self.comparison.get(field)
+            if r is None:
+                continue
+            color, verdict = verdicts[r.verdict]
+            lo, hi = (v / mb for v in r.diff_ci)
+            need = ""
+            if r.min_samples is not None:
+                need_sec = math.ceil(r.min_samples * interval)
+                done_sec = math.ceil(r.optimized_n * interval)
+                need = f"{need_sec} сек" + (" ✓" if done_sec >= need_sec else f" (есть {done_sec})")
+            rows.append(f"""
+                <tr>
+                    <td style='padding: 6px;'>{label}</td>
+                    <td style='text-align: center; color: {color};'>{verdict}</td>
+                    <td style='text-align: center;'>{lo:+.2f} … {hi:+.2f} МБ/с</td>
+                    <td style='text-align: center;'>{r.p_value:.3g}</td>
+                    <td style='text-align: center;'>{r.cliffs_delta:+.2f} ({r.magnitude})</td>
+                    <td style='text-align: center;'>{need or "—"}</td>
+                </tr>""")
+        runs = f"{len(self.runs['baseline'])} / {len(self.runs['optimized'])}"
+        trimmed = sum(r.trimmed for r in self.comparison.values()) // max(1, len(self.comparison))
+        block = max(r.block for r in self.comparison.values())
+        return f"""
+            <h4 style='color: #6ea8fe; margin-bottom: 4px;'>🔬 Значимость (Манн–Уитни, бутстрап 95% ДИ)</h4>
+            <table style='width: 100%; border-collapse: collapse; color: #e0e0e0; font-size: 0.9em;'>
+                <tr style='border-bottom: 1px solid #444;'>
+                    <th style='text-align: left; padding: 6px;'>Показатель</th>
+                    <th>Вывод</th>
+                    <th>Δ (95% ДИ)</th>
+                    <th>p</th>
+                    <th>δ Клиффа</th>
+                    <th>Нужно на профиль</th>
+                </tr>{"".join(rows)}
+            </table>
+            <p style='color: #888; font-size: 0.8em; font-style: italic;'>
+                * Прогонов baseline / optimized: {runs}; отрезано на разгон: {trimmed} точек;
+                критерий и ДИ — по средним блоков до {block} точек (автокорреляция).
+            </p>"""
 
     def get_comparison_report(self) -> str:
         """Сгенерировать HTML отчет сравнения."""
@@ -194,8 +379,8 @@ class BenchmarkManager:
                 </tr>
             </table>
             <p style='color: #888; font-size: 0.8em; margin-top: 15px; font-style: italic;'>
-                * Замеры проводились по {o['samples']} точкам (1 сек интервал).
-            </p>
+                * Optimized: {o['samples']} точек, прогонов по 30 сек: {o.get('runs', 1)}.
+            </p>{self._significance_report()}
         </div>
         """
         return report
@@ -0,0 +1,308 @@
+"""История замеров в SQLite.
+
+Каждый прогон хранится целиком: образцы, снимок настроек
+(``OptimizedSettings`` и/или живые ``app/preferences``), хост, версия
+qBittorrent, среда и профиль (baseline/optimized/...).
+
+Запросы трендов не сканируют образцы: у прогона сохраняются точные
+суммы байт и секунд (см. ``TimeSeries.counted_bytes``), а таблица
+``runs`` проиндексирована по (host, started_at), (environment, profile)
+и (profile, started_at). Образцы лежат в ``WITHOUT ROWID``-таблице с
+ключом (run_id, seq) — выборка прогона читает один непрерывный диапазон.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from enum import Enum
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+
+from .models import OptimizedSettings
+from .timeseries import MB, TimeSeries
+
+
+SCHEMA_VERSION = 1
+DAY_SEC = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY,
+    host          TEXT    NOT NULL,
+    profile       TEXT    NOT NULL,
+    environment   TEXT    NOT NULL DEFAULT '',
+    qbt_version   TEXT    NOT NULL DEFAULT '',
+    started_at    REAL    NOT NULL,
+    duration_sec  REAL    NOT NULL,
+    sample_count  INTEGER NOT NULL,
+    dl_bytes      REAL    NOT NULL,
+    ul_bytes      REAL    NOT NULL,
+    counted_sec   REAL    NOT NULL,
+    avg_dl        REAL    NOT NULL,
+    avg_ul        REAL    NOT NULL,
+    stability     REAL    NOT NULL,
+    settings_key  TEXT    NOT NULL DEFAULT '',
+    settings_json TEXT,
+    prefs_json    TEXT,
+    analysis_json TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_host_time ON runs (host, started_at);
+CREATE INDEX IF NOT EXISTS runs_env_profile ON runs (environment, profile, settings_key);
+CREATE INDEX IF NOT EXISTS runs_profile_time ON runs (profile, started_at);
+
+CREATE TABLE IF NOT EXISTS samples (
+    run_id    INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    seq       INTEGER NOT NULL,
+    ts        REAL    NOT NULL,
+    dl_speed  REAL    NOT NULL,
+    ul_speed  REAL    NOT NULL,
+    dht_nodes INTEGER NOT NULL,
+    peers     INTEGER NOT NULL,
+    dl_data   REAL,
+    ul_data   REAL,
+    dt        REAL    NOT NULL,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+"""
+
+SAMPLE_COLUMNS = ("ts", "dl_speed", "ul_speed", "dht_nodes", "peers", "dl_data", "ul_data", "dt")
+
+
+def settings_to_dict(settings: OptimizedSettings) -> dict[str, Any]:
+    """Снимок настроек без производных текстов (warnings/explanations)."""
+    data = asdict(settings)
+    data.pop("warnings", None)
+    data.pop("explanations", None)
+    return {k: (v.name if isinstance(v, Enum) else v) for k, v in data.items()}
+
+
+def settings_key(snapshot: Optional[dict[str, Any]]) -> str:
+    """Стабильный ключ набора настроек (одинаковые настройки — один профиль)."""
+    if not snapshot:
+        return ""
+    snapshot = {k: v for k, v in snapshot.items() if k not in ("memory_budget", "listening_port")}
+    canonical = json.dumps(snapshot, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+class BenchmarkStore:
+    """Репозиторий прогонов. Соединение общее для потоков (под блокировкой)."""
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+        with self._db:
+            self._db.executescript(SCHEMA)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Запись
+    # ─────────────────────────────────────────────────────────────────────────
+    def record_run(
+        self,
+        host: str,
+        profile: str,
+        samples: Iterable[dict[str, Any]],
+        settings: Optional[OptimizedSettings] = None,
+        preferences: Optional[dict[str, Any]] = None,
+        environment: str = "",
+        qbt_version: str = "",
+        started_at: Optional[float] = None,
+    ) -> int:
+        """Сохранить прогон со всеми образцами; возвращает id прогона."""
+        samples = list(samples)
+        if not samples:
+            raise ValueError("Cannot record a run without samples")
+        series = TimeSeries.from_samples(samples)
+        analysis = series.analysis()
+        timestamps = [s.get("timestamp", 0.0) for s in samples]
+        if started_at is None:
+            started_at = timestamps[0] or time.time()
+        snapshot = settings_to_dict(settings) if settings is not None else None
+
+        row = {
+            "host": host,
+            "profile": profile,
+            "environment": environment,
+            "qbt_version": qbt_version,
+            "started_at": started_at,
+            "duration_sec": max(timestamps) - min(timestamps),
+            "sample_count": len(samples),
+            "dl_bytes": series.counted_bytes["dl_speed"],
+            "ul_bytes": series.counted_bytes["ul_speed"],
+            "counted_sec": series.counted_sec,
+            "avg_dl": series.mean_rate("dl_speed"),
+            "avg_ul": series.mean_rate("ul_speed"),
+            "stability": series.stability(),
+            "settings_key": settings_key(snapshot or preferences),
+            "settings_json": json.dumps(snapshot) if snapshot is not None else None,
+            "prefs_json": json.dumps(preferences) if preferences is not None else None,
+            "analysis_json": json.dumps(analysis),
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{k}" for k in row)
+        with self._lock, self._db:
+            run_id = self._db.execute(f"INSERT INTO runs ({columns}) VALUES ({placeholders})", row).lastrowid
+            self._db.executemany(
+                f"INSERT INTO samples (run_id, seq, {', '.join(SAMPLE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(SAMPLE_COLUMNS) + 2))})",
+                (
+                    (
+                        run_id, i, s.get("timestamp", 0.0), s.get("dl_speed", 0), s.get("ul_speed", 0),
+                        s.get("dht_nodes", 0), s.get("peers", 0), s.get("dl_data"), s.get("ul_data"),
+                        s.get("dt", 0.0),
+                    )
+                    for i, s in enumerate(samples)
+                ),
+            )
+        return run_id
+
+    def delete_before(self, timestamp: float) -> int:
+        """Удалить прогоны старше ``timestamp`` (вместе с образцами)."""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM runs WHERE started_at < ?", (timestamp,)).rowcount
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Чтение
+    # ─────────────────────────────────────────────────────────────────────────
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, tuple(params)).fetchall()
+
+    def runs(self, host: Optional[str] = None, profile: Optional[str] = None, limit: int = 100) -> list[dict[str, Any]]:
+        """Последние прогоны (без образцов)."""
+        where, params = [], []
+        if host is not None:
+            where.append("host = ?")
+            params.append(host)
+        if profile is not None:
+            where.append("profile = ?")
+            params.append(profile)
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        result = []
+        for row in self._query(sql, params + [limit]):
+            run = dict(row)
+            for key in ("settings_json", "prefs_json", "analysis_json"):
+                raw = run.pop(key)
+                run[key[:-5]] = json.loads(raw) if raw is not None else None
+            result.append(run)
+        return result
+
+    def samples(self, run_id: int) -> list[dict[str, Any]]:
+        """Образцы прогона в исходном порядке."""
+        rows = self._query(
+            f"SELECT {', '.join(SAMPLE_COLUMNS)} FROM samples WHERE run_id = ? ORDER BY seq", (run_id,)
+        )
+        return [{("timestamp" if k == "ts" else k): row[k] for k in SAMPLE_COLUMNS} for row in rows]
+
+    def throughput_trend(
+        self,
+        host: str,
+        days: int = 90,
+        bucket_sec: int = DAY_SEC,
+        profile: Optional[str] = None,
+        now: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """Средняя скорость по интервалам (по умолчанию — по дням), МБ/с.
+
+        Считается по суммам байт/секунд прогонов — по индексу (host, started_at),
+        без чтения образцов.
+        """
+        since = (now if now is not None else time.time()) - days * DAY_SEC
+        sql = """
+            SELECT CAST(started_at / :bucket AS INTEGER) * :bucket AS bucket,
+                   COUNT(*) AS runs,
+                   SUM(sample_count) AS samples,
+                   SUM(dl_bytes) AS dl_bytes, SUM(ul_bytes) AS ul_bytes,
+                   SUM(counted_sec) AS counted_sec,
+                   AVG(avg_dl) AS mean_dl, AVG(avg_ul) AS mean_ul,
+                   AVG(stability) AS stability
+            FROM runs
+            WHERE host = :host AND started_at >= :since {profile}
+            GROUP BY bucket ORDER BY bucket
+        """.format(profile="AND profile = :profile" if profile is not None else "")
+        params = {"host": host, "since": since, "bucket": bucket_sec, "profile": profile}
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        trend = []
+        for r in rows:
+            if r["counted_sec"]:
+                dl, ul = r["dl_bytes"] / r["counted_sec"], r["ul_bytes"] / r["counted_sec"]
+            else:
+                dl, ul = r["mean_dl"], r["mean_ul"]
+            trend.append({
+                "start": r["bucket"],
+                "runs": r["runs"],
+                "samples": r["samples"],
+                "avg_dl_mbps": round(dl / MB, 2),
+                "avg_ul_mbps": round(ul / MB, 2),
+                "stability": round(r["stability"], 1),
+            })
+        return trend
+
+    def best_profiles(self, profile: Optional[str] = None, metric: str = "total") -> dict[str, dict[str, Any]]:
+        """Лучший набор настроек в каждой среде по средней скорости прогонов.
+
+        Учитываются только прогоны с точными счётчиками (``counted_sec > 0``):
+        у прочих есть лишь среднее по образцам — другая оценка, и в одном
+        рейтинге она смещала бы сравнение. ``metric``: ``"total"`` (загрузка + отдача), ``"download"`` или ``"upload"``.
+        """
+        score = {
+            "total": "(dl + ul)",
+            "download": "dl",
+            "upload": "ul",
+        }[metric]
+        sql = f"""
+            WITH grouped AS (
+                SELECT environment, settings_key,
+                       COUNT(*) AS runs,
+                       SUM(dl_bytes) / SUM(counted_sec) AS dl,
+                       SUM(ul_bytes) / SUM(counted_sec) AS ul,
+                       MAX(id) AS last_run
+                FROM runs
+                WHERE settings_key != '' AND counted_sec > 0 {"AND profile = ?" if profile is not None else ""}
+                GROUP BY environment, settings_key
+            ), ranked AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY environment ORDER BY {score} DESC) AS place
+                FROM grouped
+            )
+            SELECT ranked.*, runs_t.settings_json, runs_t.prefs_json
+            FROM ranked JOIN runs AS runs_t ON runs_t.id = ranked.last_run
+            WHERE place = 1
+        """
+        result = {}
+        for r in self._query(sql, [profile] if profile is not None else []):
+            result[r["environment"]] = {
+                "settings_key": r["settings_key"],
+                "runs": r["runs"],
+                "avg_dl_mbps": round(r["dl"] / MB, 2),
+                "avg_ul_mbps": round(r["ul"] / MB, 2),
+                "settings": json.loads(r["settings_json"]) if r["settings_json"] else None,
+                "preferences": json.loads(r["prefs_json"]) if r["prefs_json"] else None,
+            }
+        return result
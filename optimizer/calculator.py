@@ -1,6 +1,11 @@
 """Логика расчёта оптимальных настроек qBittorrent."""
 
-import random
+import math
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Optional
 
 from .models import (
     NetworkSettings,
@@ -15,6 +20,8 @@ from .models import (
     ProtocolMode,
     EncryptionMode,
 )
+from .memory_model import fit_memory_budget
+from .tiers import Tier, TierTable, DEFAULT_TIER_TABLE
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -25,26 +32,105 @@ MAX_CONNECTIONS_PER_TORRENT = 2000
 MAX_UPLOAD_SLOTS_GLOBAL = 2000
 MAX_UPLOAD_SLOTS_PER_TORRENT = 500
 
+# Пределы send buffer при расчёте по BDP, КБ
+SEND_BUFFER_MIN_KB = 256
+SEND_BUFFER_MAX_KB = 65536
+SEND_BUFFER_LOW_MIN_KB = 16
+
+# Большие библиотеки раздач
+MIN_CONNECTIONS_PER_ACTIVE_TORRENT = 4
+ACTIVE_TORRENTS_DISK_CAP = {
+    StorageType.HDD: 300,       # случайное чтение — узкое место
+    StorageType.SSD_SATA: 1500,
+    StorageType.NVME: 3000,
+}
+FILE_POOL_DEFAULT = 100
+FILE_POOL_MAX = 5000
+LARGE_TORRENT_GB = 4  # средняя раздача крупнее — многофайловые паки
+
+# Подбор по замеру диска (см. disk_benchmark)
+ASYNC_IO_MIN = 4
+HASHING_THREADS_MAX = 4     # больше потоков проверки упирается в чтение, а не в CPU
+IOPS_KNEE_GAIN = 0.1        # прирост IOPS < 10% при удвоении очереди — насыщение
+DISK_CACHE_BURST_SEC = 10   # сколько секунд разрыва «канал − диск» держит кэш
+DISK_CACHE_MIN_MB = 64
+
+# Динамический диапазон портов (IANA)
+PORT_RANGE_MIN = 49152
+PORT_RANGE_MAX = 65535
+
 
 def clamp(value: int, min_val: int, max_val: int) -> int:
     """Ограничить значение в диапазоне."""
     return max(min_val, min(value, max_val))
 
 
+def port_seed_for(network: NetworkSettings) -> str:
+    """Зерно порта: явное ``port_seed`` или сам сетевой профиль."""
+    if network.port_seed:
+        return network.port_seed
+    return (
+        f"{float(network.download_speed_mbps)!r}|{float(network.upload_speed_mbps)!r}|"
+        f"{network.connection_type.name}|{network.use_vpn}|{network.vpn_interface}"
+    )
+
+
+def stable_port(seed: str) -> int:
+    """Детерминированный «случайный» порт из динамического диапазона.
+
+    Одинаковое зерно всегда даёт одинаковый порт, поэтому результат
+    расчёта можно кэшировать.
+    """
+    span = PORT_RANGE_MAX - PORT_RANGE_MIN + 1
+    return PORT_RANGE_MIN + zlib.crc32(seed.encode("utf-8")) % span
+
+
+def bdp_send_buffer(upload_speed_kbps: int, rtt_ms: float, upload_slots: int) -> tuple[int, int, int]:
+    """Send buffer по bandwidth-delay product.
+
+    Возвращает (watermark, low watermark, factor). Watermark — два BDP
+    канала отдачи, low watermark — два BDP одного слота, factor — доля
+    секундной скорости пира, покрывающая 2 × RTT.
+    """
+    high = clamp(math.ceil(2 * upload_speed_kbps * rtt_ms / 1000), SEND_BUFFER_MIN_KB, SEND_BUFFER_MAX_KB)
+    low = clamp(math.ceil(2 * upload_speed_kbps * rtt_ms / 1000 / upload_slots), SEND_BUFFER_LOW_MIN_KB, high)
+    factor = clamp(math.ceil(rtt_ms / 5), 50, 200)
+    return high, low, factor
+
+
+def iops_knee(queue_depths: tuple[int, ...], iops: tuple[float, ...]) -> int:
+    """Глубина очереди, после которой рост IOPS практически прекращается."""
+    for i in range(1, len(queue_depths)):
+        if iops[i - 1] > 0 and (iops[i] - iops[i - 1]) / iops[i - 1] < IOPS_KNEE_GAIN:
+            return queue_depths[i - 1]
+    return queue_depths[-1]
+
+
+def _apply_notes(tier: Tier, warnings: list[str], explanations: dict[str, str]):
+    """Перенести пояснения и предупреждения ступени в результат."""
+    explanations.update(tier.explanations)
+    warnings.extend(tier.warnings)
+
+
 def calculate_optimal_settings(
     network: NetworkSettings,
     hardware: HardwareSettings,
     usage: UsageSettings,
+    tiers: Optional[TierTable] = None,
 ) -> OptimizedSettings:
-    """Рассчитать оптимальные настройки qBittorrent."""
+    """Рассчитать оптимальные настройки qBittorrent.
+
+    Ступенчатые разделы (соединения, очереди, диск, сеть) берутся
+    из таблицы ``tiers`` (по умолчанию — ``DEFAULT_TIER_TABLE``).
+    """
+    if tiers is None:
+        tiers = DEFAULT_TIER_TABLE
     warnings: list[str] = []
     explanations: dict[str, str] = {}
     
     env = usage.environment
     is_private = usage.tracker_type == TrackerType.PRIVATE
     is_seedbox = env == EnvironmentProfile.SEEDBOX
-    is_truenas = env == EnvironmentProfile.TRUENAS
-    is_nas = env == EnvironmentProfile.NAS
     is_docker = env == EnvironmentProfile.DOCKER
     
     # ═══════════════════════════════════════════════════════════════════════════
@@ -95,27 +181,10 @@ def calculate_optimal_settings(
     # ─────────────────────────────────────────────────────────────────────────────
     # Max Connections
     # ─────────────────────────────────────────────────────────────────────────────
-    if is_private:
-        max_connections = 200
-        max_connections_per_torrent = 50
-        explanations["max_connections"] = "100-300 для приватных трекеров."
-    elif is_seedbox:
-        max_connections = 2000
-        max_connections_per_torrent = 500
-        explanations["max_connections"] = "Максимум для Seedbox."
-        warnings.append("⚡ Seedbox: максимальные соединения для высоких скоростей.")
-    elif network.download_speed_mbps < 100:
-        max_connections = 200
-        max_connections_per_torrent = 50
-        explanations["max_connections"] = "200 для скоростей до 100 Мбит/с."
-    elif network.download_speed_mbps < 500:
-        max_connections = 500
-        max_connections_per_torrent = 125
-        explanations["max_connections"] = "500 для средних скоростей."
-    else:
-        max_connections = 1000
-        max_connections_per_torrent = 250
-        explanations["max_connections"] = "1000 для быстрых каналов."
+    tier = tiers.select("connections", network, hardware, usage)
+    max_connections = tier["max_connections_global"]
+    max_connections_per_torrent = tier["max_connections_per_torrent"]
+    _apply_notes(tier, warnings, explanations)
     
     max_connections = clamp(max_connections, 1, MAX_CONNECTIONS_GLOBAL)
     max_connections_per_torrent = clamp(max_connections_per_torrent, 1, MAX_CONNECTIONS_PER_TORRENT)
@@ -123,82 +192,55 @@ def calculate_optimal_settings(
     # ═══════════════════════════════════════════════════════════════════════════
     # TORRENT QUEUEING
     # ═══════════════════════════════════════════════════════════════════════════
-    if network.download_speed_mbps < 50:
-        max_active_downloads = 2
-        max_active_uploads = 3
-    elif network.download_speed_mbps < 300:
-        max_active_downloads = 5
-        max_active_uploads = 8
-    else:
-        max_active_downloads = 10
-        max_active_uploads = 15
-    
-    if usage.user_role == UserRole.SEEDER:
-        max_active_uploads = int(max_active_uploads * 1.5)
-    
+    tier = tiers.select("queue", network, hardware, usage)
+    max_active_downloads = tier["max_active_downloads"]
+    max_active_uploads = tier["max_active_uploads"]
     max_active_torrents = max_active_downloads + max_active_uploads
-    explanations["queue"] = f"Downloads: {max_active_downloads}, Uploads: {max_active_uploads}"
+    _apply_notes(tier, warnings, explanations)
+    
+    # ─────────────────────────────────────────────────────────────────────────────
+    # Размер библиотеки
+    # ─────────────────────────────────────────────────────────────────────────────
+    file_pool_size = FILE_POOL_DEFAULT
+    if usage.torrent_count > 0:
+        # Каждой активной раздаче — хотя бы 4 соединения в пределах лимита UI,
+        # и не больше, чем накопитель выдержит на случайном чтении
+        active_cap = min(
+            ACTIVE_TORRENTS_DISK_CAP[hardware.storage_type],
+            MAX_CONNECTIONS_GLOBAL // MIN_CONNECTIONS_PER_ACTIVE_TORRENT,
+        )
+        if usage.user_role != UserRole.LEECHER:
+            max_active_uploads = max(max_active_uploads, min(usage.torrent_count, active_cap))
+        max_active_torrents = max_active_downloads + max_active_uploads
+        
+        max_connections = clamp(
+            max(max_connections, max_active_torrents * MIN_CONNECTIONS_PER_ACTIVE_TORRENT),
+            1, MAX_CONNECTIONS_GLOBAL,
+        )
+        
+        avg_torrent_gb = usage.library_size_gb / usage.torrent_count
+        handles = 4 if avg_torrent_gb >= LARGE_TORRENT_GB else 2
+        file_pool_size = clamp(max_active_torrents * handles, FILE_POOL_DEFAULT, FILE_POOL_MAX)
+        explanations["library"] = (
+            f"{usage.torrent_count} раздач ({usage.library_size_gb:g} ГБ): активных до "
+            f"{max_active_torrents} (предел {active_cap} для накопителя и сокетов), "
+            f"file pool {file_pool_size} ({handles} файла на раздачу)."
+        )
+        if usage.torrent_count > max_active_torrents:
+            warnings.append(
+                f"📚 {usage.torrent_count} раздач > {max_active_torrents} активных: "
+                "остальные ждут в очереди, чтобы не перегружать диск и сокеты."
+            )
     
     # ═══════════════════════════════════════════════════════════════════════════
     # DISK I/O — зависит от СРЕДЫ
     # ═══════════════════════════════════════════════════════════════════════════
     
-    if is_truenas:
-        # ZFS: отключаем кэш, пусть работает ARC
-        disk_cache = 0
-        enable_os_cache = True
-        pre_allocate_disk = False
-        explanations["disk_cache"] = (
-            "Disk Cache = 0 для ZFS. Позвольте ZFS ARC управлять памятью."
-        )
-        explanations["pre_allocate"] = (
-            "Pre-allocate выключен. ZFS использует Copy-on-Write."
-        )
-        warnings.append(
-            "🗄️ TrueNAS/ZFS: Disk Cache отключён, OS Cache включён, Pre-allocate выключен."
-        )
-    elif is_nas:
-        # Synology/QNAP: буфер для сетевых задержек
-        disk_cache = 512
-        enable_os_cache = False
-        pre_allocate_disk = True
-        explanations["disk_cache"] = "512 МБ буфер для сетевых задержек NAS."
-        warnings.append("📦 NAS: OS Cache выключен для стабильности.")
-    elif is_docker:
-        disk_cache = -1  # Auto
-        enable_os_cache = True
-        pre_allocate_disk = True
-        explanations["disk_cache"] = "Auto для Docker контейнера."
-    elif is_seedbox:
-        if hardware.ram_gb >= 32:
-            disk_cache = 4096
-        elif hardware.ram_gb >= 16:
-            disk_cache = 2048
-        else:
-            disk_cache = 1024
-        enable_os_cache = True
-        pre_allocate_disk = True
-        explanations["disk_cache"] = f"{disk_cache} МБ для Seedbox (высокая нагрузка)."
-    elif hardware.storage_type == StorageType.HDD:
-        if hardware.ram_gb >= 16:
-            disk_cache = 2048
-        elif hardware.ram_gb >= 8:
-            disk_cache = 1024
-        else:
-            disk_cache = 512
-        enable_os_cache = True
-        pre_allocate_disk = True
-        explanations["disk_cache"] = f"{disk_cache} МБ для HDD."
-    elif hardware.storage_type == StorageType.SSD_SATA:
-        disk_cache = 512 if hardware.ram_gb >= 8 else 256
-        enable_os_cache = True
-        pre_allocate_disk = True
-        explanations["disk_cache"] = f"{disk_cache} МБ для SATA SSD."
-    else:  # NVMe
-        disk_cache = -1
-        enable_os_cache = True
-        pre_allocate_disk = True
-        explanations["disk_cache"] = "Auto (-1) для NVMe."
+    tier = tiers.select("disk_io", network, hardware, usage)
+    disk_cache = tier["disk_cache_mb"]
+    enable_os_cache = tier["enable_os_cache"]
+    pre_allocate_disk = tier["pre_allocate_disk"]
+    _apply_notes(tier, warnings, explanations)
     
     # Async I/O threads
     if hardware.is_hybrid_cpu and hardware.p_cores > 0:
@@ -208,6 +250,44 @@ def calculate_optimal_settings(
         async_io = 4 * hardware.cpu_cores
         explanations["async_io"] = f"4 × {hardware.cpu_cores} ядер = {async_io}"
     
+    # Потоки хеширования (проверка раздач): на HDD параллельная проверка
+    # превращает последовательное чтение в случайное
+    if hardware.storage_type == StorageType.HDD:
+        hashing_threads = 1
+    else:
+        hash_cores = hardware.p_cores if hardware.is_hybrid_cpu and hardware.p_cores > 0 else hardware.cpu_cores
+        hashing_threads = clamp(hash_cores // 2, 1, HASHING_THREADS_MAX)
+    explanations["hashing"] = f"Потоков хеширования: {hashing_threads} ({hardware.storage_type.value})"
+    
+    if hardware.disk is not None:
+        disk = hardware.disk
+        read_knee = iops_knee(disk.queue_depths, disk.read_iops)
+        write_knee = iops_knee(disk.queue_depths, disk.write_iops)
+        async_io = max(ASYNC_IO_MIN, read_knee, write_knee)
+        explanations["async_io"] = (
+            f"Насыщение диска: чтение на QD{read_knee}, запись на QD{write_knee} → {async_io} потоков."
+        )
+        
+        # Кэш нужен, только если случайная запись не успевает за каналом.
+        # Для ZFS (disk_cache = 0) память оставляем ARC.
+        random_write_mb_s = max(disk.write_iops) * disk.block_size_kb / 1024
+        download_mb_s = network.download_speed_mbps / 8
+        deficit = download_mb_s - random_write_mb_s
+        if disk_cache != 0 and deficit > 0:
+            disk_cache = clamp(
+                math.ceil(deficit * DISK_CACHE_BURST_SEC), DISK_CACHE_MIN_MB, max(DISK_CACHE_MIN_MB, hardware.ram_gb * 1024 // 4)
+            )
+            explanations["disk_cache"] = (
+                f"Случайная запись {random_write_mb_s:.0f} МБ/с < загрузка {download_mb_s:.0f} МБ/с: "
+                f"кэш {disk_cache} МБ сглаживает {DISK_CACHE_BURST_SEC} с разрыва."
+            )
+            warnings.append("💽 Диск медленнее канала на случайной записи — загрузка будет упираться в диск.")
+        elif disk_cache != 0:
+            explanations["disk_cache"] = (
+                f"{explanations.get('disk_cache', '')} Замер: диск успевает за каналом "
+                f"({random_write_mb_s:.0f} МБ/с случайной записи)."
+            ).strip()
+    
     coalesce = True
     explanations["coalesce"] = "Объединяет мелкие I/O операции."
     
@@ -215,48 +295,25 @@ def calculate_optimal_settings(
     # NETWORK TUNING — зависит от СРЕДЫ
     # ═══════════════════════════════════════════════════════════════════════════
     
-    if is_seedbox:
-        send_buffer = 16000
-        send_buffer_low = 160
-        send_buffer_factor = 150
-        socket_backlog = 1024
-        outgoing_per_sec = 1000
-        protocol = ProtocolMode.TCP_ONLY
-        explanations["send_buffer"] = "16 МБ буфер для Seedbox (1+ Гбит/с)."
-        explanations["socket_backlog"] = "Socket backlog 1024 для массовых подключений."
-        explanations["protocol"] = "TCP only — μTP не нужен на сидбоксе."
-    elif is_docker:
-        send_buffer = 500
-        send_buffer_low = 16
-        send_buffer_factor = 100
-        socket_backlog = 30
-        outgoing_per_sec = 100
-        protocol = ProtocolMode.TCP_ONLY
-        explanations["protocol"] = "TCP only внутри VPN-туннеля."
-    elif network.upload_speed_mbps > 500:
-        send_buffer = 8000
-        send_buffer_low = 160
-        send_buffer_factor = 120
-        socket_backlog = 200
-        outgoing_per_sec = 500
-        protocol = ProtocolMode.TCP_ONLY if network.connection_type == ConnectionType.FIBER else ProtocolMode.UTP_TCP
-        explanations["send_buffer"] = "8 МБ буфер для высоких скоростей."
-    elif network.upload_speed_mbps > 100:
-        send_buffer = 5000
-        send_buffer_low = 160
-        send_buffer_factor = 120
-        socket_backlog = 100
-        outgoing_per_sec = 200
-        protocol = ProtocolMode.UTP_TCP
-        explanations["send_buffer"] = "5 МБ буфер."
-    else:
-        send_buffer = 500
-        send_buffer_low = 16
-        send_buffer_factor = 100
-        socket_backlog = 30
-        outgoing_per_sec = 100
-        protocol = ProtocolMode.UTP_TCP
-        explanations["send_buffer"] = "Стандартное значение."
+    tier = tiers.select("network", network, hardware, usage)
+    send_buffer = tier["send_buffer_watermark_kb"]
+    send_buffer_low = tier["send_buffer_low_watermark_kb"]
+    send_buffer_factor = tier["send_buffer_factor"]
+    socket_backlog = tier["socket_backlog_size"]
+    outgoing_per_sec = tier["outgoing_connections_per_second"]
+    protocol = tier["protocol_mode"]
+    _apply_notes(tier, warnings, explanations)
+    
+    if network.rtt_ms is not None and network.rtt_ms > 0:
+        send_buffer, send_buffer_low, send_buffer_factor = bdp_send_buffer(
+            upload_speed_kbps, network.rtt_ms, upload_slots_global
+        )
+        bdp_kb = upload_speed_kbps * network.rtt_ms / 1000
+        explanations["send_buffer"] = (
+            f"BDP = {upload_speed_kbps} КБ/с × {network.rtt_ms:g} мс ≈ {bdp_kb:.0f} КБ. "
+            f"Watermark {send_buffer} КБ (2 × BDP), low {send_buffer_low} КБ "
+            f"(2 × BDP слота), factor {send_buffer_factor}%."
+        )
     
     if network.connection_type == ConnectionType.FIBER and not is_docker:
         protocol = ProtocolMode.TCP_ONLY
@@ -264,7 +321,7 @@ def calculate_optimal_settings(
     
     # Listening port
     if network.isp_throttling:
-        listening_port = f"Random ({random.randint(49152, 65535)})"
+        listening_port = f"Random ({stable_port(port_seed_for(network))})"
         warnings.append("Случайный порт для обхода DPI.")
         explanations["port"] = "Случайный высокий порт для обхода блокировок."
     else:
@@ -327,7 +384,7 @@ def calculate_optimal_settings(
     else:
         explanations["super_seeding"] = "Выключен."
     
-    return OptimizedSettings(
+    result = OptimizedSettings(
         global_upload_limit_kbps=global_upload_limit,
         global_download_limit_kbps=global_download_limit,
         upload_slots_global=upload_slots_global,
@@ -356,6 +413,106 @@ def calculate_optimal_settings(
         enable_lsd=enable_lsd,
         network_interface=network_interface,
         super_seeding=super_seeding,
+        file_pool_size=file_pool_size,
+        hashing_threads=hashing_threads,
         warnings=warnings,
         explanations=explanations,
     )
+    
+    # ═══════════════════════════════════════════════════════════════════════════
+    # БЮДЖЕТ ПАМЯТИ
+    # ═══════════════════════════════════════════════════════════════════════════
+    changes = fit_memory_budget(result, hardware, usage)
+    budget = result.memory_budget
+    if changes:
+        warnings.append(
+            f"🧠 Оценка памяти превышала {hardware.ram_share:.0%} RAM — снижено: {', '.join(changes)}."
+        )
+    if budget["total"] > budget["limit"]:
+        warnings.append(
+            f"🧠 Даже после снижения qBittorrent займёт ~{budget['total']:.0f} МБ "
+            f"при бюджете {budget['limit']:.0f} МБ. Уменьшите библиотеку или добавьте RAM."
+        )
+    explanations["memory"] = (
+        f"Оценка ~{budget['total']:.0f} МБ из {budget['limit']:.0f} МБ "
+        f"({hardware.ram_share:.0%} от {hardware.ram_gb} ГБ RAM)."
+    )
+    return result
+
+
+class CalculatorCache:
+    """LRU-кэш перед ``calculate_optimal_settings``.
+
+    Инвентари парков машин повторяют одни и те же профили, поэтому
+    результат для одинаковой тройки (network, hardware, usage) берётся
+    из кэша. ``maxsize=0`` отключает кэширование.
+    """
+
+    def __init__(self, maxsize: int = 1024, tiers: Optional[TierTable] = None):
+        self.maxsize = maxsize
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(
+        self,
+        network: NetworkSettings,
+        hardware: HardwareSettings,
+        usage: UsageSettings,
+    ) -> OptimizedSettings:
+        key = (network, hardware, usage)
+        with self._lock:
+            result = self._data.get(key)
+            if result is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._copy(result)
+            self.misses += 1
+
+        result = calculate_optimal_settings(network, hardware, usage, self.tiers)
+        if self.maxsize > 0:
+            with self._lock:
+                self._data[key] = result
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return self._copy(result)
+
+    @staticmethod
+    def _copy(result: OptimizedSettings) -> OptimizedSettings:
+        # warnings/explanations изменяемы — не отдаём наружу объект из кэша
+        return replace(
+            result,
+            warnings=list(result.warnings),
+            explanations=dict(result.explanations),
+        )
+
+    def resize(self, maxsize: int):
+        """Изменить размер кэша (лишние записи вытесняются)."""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > max(maxsize, 0):
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Очистить кэш и счётчики."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict[str, int]:
+        """Статистика кэша."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+# Общий кэш по умолчанию
+calculate_optimal_settings_cached = CalculatorCache()
@@ -0,0 +1,394 @@
+"""Командная строка headless-режима (без PyQt).
+
+Запуск: ``python -m optimizer <команда> ...``.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+
+def _cmd_fleet(args: argparse.Namespace) -> int:
+    from .fleet import run_fleet
+
+    summary = run_fleet(
+        args.inventory, args.output, args.workers, args.template, args.cache_size
+    )
+    print(
+        f"{summary['ok']}/{summary['total']} hosts written to {args.output} "
+        f"in {summary['duration_sec']}s"
+    )
+    for r in summary["hosts"]:
+        if not r["ok"]:
+            print(f"  {r['host']}: {r['error']}", file=sys.stderr)
+    return 0 if summary["failed"] == 0 else 1
+
+
+def _cmd_autotune(args: argparse.Namespace) -> int:
+    from .autotuner import AutoTuner
+    from .benchmark_manager import BenchmarkManager
+
+    manager = BenchmarkManager(args.host)
+    if not manager.connect(args.username, args.password):
+        print(f"Cannot log in to {args.host}", file=sys.stderr)
+        return 2
+
+    def report(trial):
+        values = ", ".join(f"{k}={v}" for k, v in trial.values.items())
+        print(f"  {trial.duration_sec:>6.0f}s  {trial.score:8.2f} MB/s  {values}")
+
+    tuner = AutoTuner(
+        manager,
+        objective=args.objective,
+        time_budget_sec=args.budget,
+        min_duration_sec=args.min_duration,
+        on_trial=report,
+    )
+    result = tuner.run()
+    print(f"Best ({result.best_score:.2f} MB/s, start {result.start_score or 0:.2f} MB/s):")
+    for name, value in result.best_values.items():
+        print(f"  {name} = {value}")
+    if result.skipped:
+        print(f"Skipped (not supported by this qBittorrent): {', '.join(result.skipped)}")
+    if not result.restored:
+        print("WARNING: original preferences were NOT restored", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _cmd_diskbench(args: argparse.Namespace) -> int:
+    import json
+    from .disk_benchmark import DiskBenchmark, profile_to_dict
+
+    bench = DiskBenchmark(
+        args.directory,
+        file_size_mb=args.size,
+        queue_depths=tuple(args.queue_depths),
+        duration_sec=args.duration,
+        direct=not args.buffered,
+    )
+    try:
+        profile = bench.run()
+    except OSError as e:
+        print(f"Disk benchmark failed: {e}", file=sys.stderr)
+        return 2
+
+    print(f"Sequential write: {profile.seq_write_mb_s:.1f} MB/s (direct I/O: {profile.direct_io})")
+    print("   QD   read IOPS   read ms   write IOPS   write ms")
+    for i, qd in enumerate(profile.queue_depths):
+        print(f"  {qd:>3} {profile.read_iops[i]:>11.0f} {profile.read_latency_ms[i]:>9.3f} "
+              f"{profile.write_iops[i]:>12.0f} {profile.write_latency_ms[i]:>10.3f}")
+    if args.output:
+        args.output.write_text(json.dumps(profile_to_dict(profile), indent=2), encoding="utf-8")
+    return 0
+
+
+def _cmd_monitor(args: argparse.Namespace) -> int:
+    import asyncio
+    import time
+    from .async_client import AsyncQBittorrentClient, InstanceMonitor
+    from .rrd import RoundRobinStore, archive_name
+
+    mb = 1024 * 1024
+    archives = {}
+    if args.archive:
+        archives = {host: RoundRobinStore(args.archive / archive_name(host)) for host in args.hosts}
+
+    async def run():
+        clients = [
+            AsyncQBittorrentClient(host, args.username, args.password, timeout=args.timeout)
+            for host in args.hosts
+        ]
+        monitor = InstanceMonitor(clients, max_concurrency=args.concurrency)
+        try:
+            async for snap in monitor.stream(args.interval, args.count):
+                for host, result in snap["instances"].items():
+                    if result["ok"] and host in archives:
+                        archives[host].update(result["main"], snap["timestamp"])
+                total = snap["total"]
+                print(
+                    f"{time.strftime('%H:%M:%S', time.localtime(snap['timestamp']))}  "
+                    f"{total['online']}/{len(clients)} online  "
+                    f"DL {total['dl_speed'] / mb:8.2f} MB/s  UL {total['ul_speed'] / mb:8.2f} MB/s",
+                    flush=True,
+                )
+        finally:
+            await monitor.close()
+            for archive in archives.values():
+                archive.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _cmd_advise(args: argparse.Namespace) -> int:
+    import json
+    import signal
+    import time
+    from .advisor import TuningAdvisor
+    from .benchmark_manager import BenchmarkManager
+    from .calculator import calculate_optimal_settings
+    from .diagnostics import RunContext
+    from .fleet import profile_from_record
+
+    record = json.loads(args.profile.read_text(encoding="utf-8"))
+    record.setdefault("host", args.host)
+    _, network, hardware, usage = profile_from_record(record)
+    settings = calculate_optimal_settings(network, hardware, usage)
+
+    manager = BenchmarkManager(args.host)
+    if not manager.connect(args.username, args.password):
+        print(f"Cannot log in to {args.host}", file=sys.stderr)
+        return 2
+    context = RunContext.from_preferences(
+        manager.get_preferences(),
+        link_dl=network.download_speed_mbps * 1e6 / 8,
+        link_ul=network.upload_speed_mbps * 1e6 / 8,
+    )
+
+    def report(change):
+        print(f"{time.strftime('%H:%M:%S')}  {change.pref_key}: {change.old} -> {change.new}  "
+              f"[{change.verdict}] {change.reason}", flush=True)
+
+    advisor = TuningAdvisor(
+        manager, settings, context,
+        window=args.window, confirm=args.confirm, cooldown_sec=args.cooldown,
+        log_path=args.log, on_change=report,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: advisor.stop())
+    try:
+        advisor.run(args.interval, restore=args.restore)
+    except KeyboardInterrupt:
+        advisor.stop()
+        if args.restore:
+            advisor.restore()
+    return 0
+
+
+def _cmd_apply(args: argparse.Namespace) -> int:
+    import json
+    from .benchmark_manager import BenchmarkManager
+    from .calculator import calculate_optimal_settings
+    from .fleet import profile_from_record
+    from .live_apply import apply_live
+
+    record = json.loads(args.profile.read_text(encoding="utf-8"))
+    record.setdefault("host", args.host)
+    _, network, hardware, usage = profile_from_record(record)
+    settings = calculate_optimal_settings(network, hardware, usage)
+
+    manager = BenchmarkManager(args.host)
+    if not manager.connect(args.username, args.password):
+        print(f"Cannot log in to {args.host}", file=sys.stderr)
+        return 2
+    result = apply_live(manager, settings, dry_run=args.dry_run)
+    for key, value in result.changed.items():
+        print(f"{key}: {result.previous[key]} -> {value}")
+    print(result.summary())
+    return 0 if result.ok else 1
+
+
+def _cmd_diagnose(args: argparse.Namespace) -> int:
+    import time
+    from .benchmark_manager import BenchmarkManager
+    from .diagnostics import RunContext, cpu_load, diagnose_run
+    from .sync_client import MaindataSync
+    from .timeseries import CounterRates
+
+    manager = BenchmarkManager(args.host)
+    if not manager.connect(args.username, args.password):
+        print(f"Cannot log in to {args.host}", file=sys.stderr)
+        return 2
+    sync, rates, samples = MaindataSync(manager), CounterRates(), []
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        if sync.update():
+            samples.append(rates.apply(sync.main_stats()))
+        time.sleep(1)
+    if not samples:
+        print("No samples collected", file=sys.stderr)
+        return 1
+
+    local = any(h in args.host for h in ("localhost", "127.0.0.1", "[::1]"))
+    context = RunContext.from_preferences(
+        manager.get_preferences(),
+        link_dl=args.link_down * 1e6 / 8,
+        link_ul=args.link_up * 1e6 / 8,
+        cpu_load=cpu_load() if local else None,
+    )
+    diagnosis = diagnose_run(samples, context)
+    print(f"Verdict: {diagnosis.verdict}  scores: "
+          + ", ".join(f"{k} {v:.2f}" for k, v in diagnosis.scores.items()))
+    for rec in diagnosis.recommendations:
+        print(f"  {rec.direction:<8} {rec.field}: {rec.reason}")
+    return 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    import asyncio
+    from .async_client import AsyncQBittorrentClient
+    from .exporter import MetricsExporter, serve_metrics
+
+    clients = [
+        AsyncQBittorrentClient(host, args.username, args.password, timeout=args.timeout)
+        for host in args.hosts
+    ]
+    exporter = MetricsExporter(clients, max_concurrency=args.concurrency)
+    server = serve_metrics(exporter, args.listen)
+    print(f"Serving /metrics for {len(clients)} instance(s) on port {server.server_address[1]}", flush=True)
+
+    async def run():
+        try:
+            await exporter.run(args.interval)
+        finally:
+            await exporter.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+def _cmd_history(args: argparse.Namespace) -> int:
+    import time
+    from .benchmark_store import BenchmarkStore
+
+    with BenchmarkStore(args.db) as store:
+        if args.host:
+            trend = store.throughput_trend(args.host, days=args.days, profile=args.profile)
+            if not trend:
+                print(f"No runs for {args.host} in the last {args.days} days")
+            for row in trend:
+                print(f"{time.strftime('%Y-%m-%d', time.localtime(row['start']))}  "
+                      f"{row['runs']:>3} runs  DL {row['avg_dl_mbps']:8.2f} MB/s  "
+                      f"UL {row['avg_ul_mbps']:8.2f} MB/s  stability {row['stability']:5.1f}%")
+        else:
+            best = store.best_profiles(profile=args.profile, metric=args.objective)
+            if not best:
+                print("No runs with settings snapshots")
+            for environment, row in sorted(best.items()):
+                print(f"{environment or '-':<12} {row['settings_key']}  {row['runs']:>3} runs  "
+                      f"DL {row['avg_dl_mbps']:8.2f} MB/s  UL {row['avg_ul_mbps']:8.2f} MB/s")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m optimizer",
+        description="qFrey-Tuner без GUI: расчёт и применение настроек qBittorrent.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fleet = sub.add_parser("fleet", help="Рассчитать и записать конфиги для парка машин")
+    fleet.add_argument("inventory", type=Path, help="Инвентарь хостов (.jsonl или .csv)")
+    fleet.add_argument("-o", "--output", type=Path, default=Path("fleet-configs"),
+                       help="Каталог для конфигов (по умолчанию: fleet-configs)")
+    fleet.add_argument("-j", "--workers", type=int, default=0,
+                       help="Число процессов (0 = по числу CPU)")
+    fleet.add_argument("--template", type=Path, default=None,
+                       help="Базовый qBittorrent.conf для новых хостов")
+    fleet.add_argument("--cache-size", type=int, default=1024,
+                       help="Размер LRU-кэша профилей на процесс (0 = выкл)")
+    fleet.set_defaults(func=_cmd_fleet)
+
+    tune = sub.add_parser("autotune", help="Подобрать настройки по живой скорости qBittorrent")
+    tune.add_argument("--host", default="http://localhost:8080", help="Адрес Web UI")
+    tune.add_argument("-u", "--username", default="admin")
+    tune.add_argument("-p", "--password", default="adminadmin")
+    tune.add_argument("--budget", type=float, default=900,
+                      help="Бюджет времени, сек (по умолчанию: 900)")
+    tune.add_argument("--min-duration", type=float, default=10,
+                      help="Длительность первого круга замера, сек")
+    tune.add_argument("--objective", choices=["total", "download", "upload"], default="total")
+    tune.set_defaults(func=_cmd_autotune)
+
+    disk = sub.add_parser("diskbench", help="Замерить IOPS накопителя в каталоге загрузок")
+    disk.add_argument("directory", type=Path, help="Каталог загрузок")
+    disk.add_argument("-o", "--output", type=Path, default=None,
+                      help="Сохранить профиль в JSON (для fleet: disk_profile)")
+    disk.add_argument("--size", type=int, default=256,
+                      help="Размер временного файла, МБ (не больше 10%% свободного места)")
+    disk.add_argument("--duration", type=float, default=1.0,
+                      help="Длительность замера на каждую глубину очереди, сек")
+    disk.add_argument("--queue-depths", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    disk.add_argument("--buffered", action="store_true",
+                      help="Не использовать O_DIRECT (замер через кэш ОС)")
+    disk.set_defaults(func=_cmd_diskbench)
+
+    mon = sub.add_parser("monitor", help="Параллельный опрос многих экземпляров qBittorrent")
+    mon.add_argument("hosts", nargs="+", help="Адреса Web UI (http://host:port)")
+    mon.add_argument("-u", "--username", default="admin")
+    mon.add_argument("-p", "--password", default="adminadmin")
+    mon.add_argument("--interval", type=float, default=1.0, help="Период опроса, сек")
+    mon.add_argument("--count", type=int, default=None, help="Число проходов (по умолчанию: бесконечно)")
+    mon.add_argument("--concurrency", type=int, default=16, help="Одновременных запросов всего")
+    mon.add_argument("--timeout", type=float, default=2.0, help="Таймаут запроса, сек")
+    mon.add_argument("--archive", type=Path, default=None,
+                     help="Каталог RRD-архивов (1 с/час, 1 мин/неделя, 1 ч/год на хост)")
+    mon.set_defaults(func=_cmd_monitor)
+
+    adv = sub.add_parser("advise", help="Фоновая подстройка настроек под нагрузку")
+    adv.add_argument("profile", type=Path,
+                     help="Профиль хоста в JSON (ключи как в инвентаре fleet)")
+    adv.add_argument("--host", default="http://localhost:8080", help="Адрес Web UI")
+    adv.add_argument("-u", "--username", default="admin")
+    adv.add_argument("-p", "--password", default="adminadmin")
+    adv.add_argument("--interval", type=float, default=1.0, help="Период опроса, сек")
+    adv.add_argument("--window", type=int, default=60, help="Образцов в окне диагностики")
+    adv.add_argument("--confirm", type=int, default=3, help="Окон подряд до изменения (гистерезис)")
+    adv.add_argument("--cooldown", type=float, default=300, help="Не чаще одного изменения за N сек")
+    adv.add_argument("--log", type=Path, default=Path("advisor.jsonl"), help="Журнал изменений (JSONL)")
+    adv.add_argument("--restore", action="store_true", help="Вернуть расчётные значения при выходе")
+    adv.set_defaults(func=_cmd_advise)
+
+    app = sub.add_parser("apply", help="Применить настройки через WebAPI без перезапуска")
+    app.add_argument("profile", type=Path,
+                     help="Профиль хоста в JSON (ключи как в инвентаре fleet)")
+    app.add_argument("--host", default="http://localhost:8080", help="Адрес Web UI")
+    app.add_argument("-u", "--username", default="admin")
+    app.add_argument("-p", "--password", default="adminadmin")
+    app.add_argument("--dry-run", action="store_true", help="Только показать разницу, ничего не менять")
+    app.set_defaults(func=_cmd_apply)
+
+    diag = sub.add_parser("diagnose", help="Определить узкое место: диск, сеть, пиры или CPU")
+    diag.add_argument("--host", default="http://localhost:8080", help="Адрес Web UI")
+    diag.add_argument("-u", "--username", default="admin")
+    diag.add_argument("-p", "--password", default="adminadmin")
+    diag.add_argument("--duration", type=float, default=30, help="Длительность замера, сек")
+    diag.add_argument("--link-down", type=float, default=0, help="Скорость канала на загрузку, Мбит/с")
+    diag.add_argument("--link-up", type=float, default=0, help="Скорость канала на отдачу, Мбит/с")
+    diag.set_defaults(func=_cmd_diagnose)
+
+    exp = sub.add_parser("export", help="Экспортёр метрик OpenMetrics/Prometheus")
+    exp.add_argument("hosts", nargs="+", help="Адреса Web UI (http://host:port)")
+    exp.add_argument("-u", "--username", default="admin")
+    exp.add_argument("-p", "--password", default="adminadmin")
+    exp.add_argument("--listen", default=":9877", help="Адрес HTTP-сервера [host]:port (по умолчанию: :9877)")
+    exp.add_argument("--interval", type=float, default=5.0, help="Период опроса qBittorrent, сек")
+    exp.add_argument("--concurrency", type=int, default=16, help="Одновременных запросов всего")
+    exp.add_argument("--timeout", type=float, default=2.0, help="Таймаут запроса, сек")
+    exp.set_defaults(func=_cmd_export)
+
+    hist = sub.add_parser("history", help="Тренды и лучшие профили из истории замеров")
+    hist.add_argument("--db", type=Path, default=Path("benchmarks.db"), help="Файл истории (SQLite)")
+    hist.add_argument("--host", default=None,
+                      help="Тренд скорости хоста по дням (без --host — лучший профиль по средам)")
+    hist.add_argument("--days", type=int, default=90, help="Глубина тренда, дней")
+    hist.add_argument("--profile", default=None, help="Только прогоны профиля (baseline/optimized)")
+    hist.add_argument("--objective", choices=["total", "download", "upload"], default="total")
+    hist.set_defaults(func=_cmd_history)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Точка входа CLI."""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,287 @@
+"""Статистическое сравнение замеров Baseline и Optimized.
+
+Скорость в живом рое шумит сильнее, чем меняется от настроек, поэтому
+разница двух средних ничего не доказывает. Здесь:
+
+- несколько прогонов на профиль, у каждого отрезается разгон (MSER-5:
+  точка усечения, минимизирующая стандартную ошибку оставшейся части);
+- посекундные замеры автокоррелированы, поэтому бутстрап и критерий
+  работают со средними по блокам: длина блока — во сколько раз
+  автокорреляция уменьшает эффективный объём выборки;
+- доверительные интервалы — бутстрап (перцентильный, по блокам);
+- значимость — U-критерий Манна–Уитни (нормальное приближение с
+  поправкой на связи), без предположений о распределении;
+- величина эффекта — δ Клиффа;
+- минимальная длительность прогона — по формуле мощности для
+  наблюдаемого эффекта с поправкой на автокорреляцию посекундных замеров.
+
+Только стандартная библиотека: ``random``, ``statistics``, ``math``.
+"""
+
+import math
+import random
+import statistics
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+ALPHA = 0.05
+POWER = 0.8
+BOOTSTRAP_RESAMPLES = 2000
+MSER_BATCH = 5
+# Средние соседних блоков почти независимы, когда блок в несколько раз
+# длиннее интервала корреляции
+BLOCK_FACTOR = 3
+# Асимптотическая эффективность Манна–Уитни относительно t-критерия
+MANN_WHITNEY_ARE = 3 / math.pi
+
+# Пороги |δ| Клиффа (Romano et al., 2006)
+CLIFF_THRESHOLDS = ((0.147, "пренебрежимый"), (0.33, "малый"), (0.474, "средний"))
+CLIFF_LARGE = "большой"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ПОДГОТОВКА ДАННЫХ
+# ═══════════════════════════════════════════════════════════════════════════════
+def trim_warmup(values: Sequence[float], batch: int = MSER_BATCH) -> list[float]:
+    """Отрезать разгон по правилу MSER-m (усечение — не дальше середины)."""
+    n_batches = len(values) // batch
+    if n_batches < 4:
+        return list(values)
+    means = [statistics.fmean(values[i * batch:(i + 1) * batch]) for i in range(n_batches)]
+
+    best_d, best_score = 0, math.inf
+    for d in range(n_batches // 2 + 1):
+        tail = means[d:]
+        score = statistics.pvariance(tail) / len(tail)
+        if score < best_score:
+            best_d, best_score = d, score
+    return list(values[best_d * batch:])
+
+
+def lag1_autocorrelation(values: Sequence[float]) -> float:
+    n = len(values)
+    if n < 3:
+        return 0.0
+    mean = statistics.fmean(values)
+    denom = sum((x - mean) ** 2 for x in values)
+    if denom == 0:
+        return 0.0
+    return sum((values[i] - mean) * (values[i + 1] - mean) for i in range(n - 1)) / denom
+
+
+def _rho(runs: Sequence[Sequence[float]]) -> float:
+    """Средняя автокорреляция lag-1 по прогонам (в пределах 0…0.95).
+
+    На коротком прогоне оценка занижена примерно на (1 + 4ρ)/n
+    (Kendall) — поправляем.
+    """
+    values = []
+    for run in runs:
+        if len(run) >= 3:
+            rho = lag1_autocorrelation(run)
+            values.append(rho + (1 + 4 * rho) / len(run))
+    if not values:
+        return 0.0
+    return min(0.95, max(0.0, statistics.fmean(values)))
+
+
+def _inflation(rho: float) -> float:
+    """Во сколько раз автокорреляция AR(1) уменьшает эффективный объём выборки."""
+    return (1 + rho) / (1 - rho)
+
+
+def block_size(runs: Sequence[Sequence[float]]) -> int:
+    """Длина блока: ``BLOCK_FACTOR`` × число замеров на одно независимое."""
+    return max(1, math.ceil(BLOCK_FACTOR * _inflation(_rho(runs))))
+
+
+def block_means(runs: Sequence[Sequence[float]], size: int) -> list[float]:
+    """Средние непересекающихся блоков внутри каждого прогона.
+
+    Неполный хвост отбрасывается; прогон короче блока даёт одно среднее.
+    """
+    means = []
+    for run in runs:
+        if len(run) < size:
+            if run:
+                means.append(statistics.fmean(run))
+            continue
+        for i in range(0, len(run) - size + 1, size):
+            means.append(statistics.fmean(run[i:i + size]))
+    return means
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ОЦЕНКИ И КРИТЕРИИ
+# ═══════════════════════════════════════════════════════════════════════════════
+def bootstrap_ci(
+    a: Sequence[float],
+    b: Optional[Sequence[float]] = None,
+    statistic: Callable[[Sequence[float]], float] = statistics.fmean,
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    alpha: float = ALPHA,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """Перцентильный бутстрап-интервал для ``statistic(a)``
+    или для разности ``statistic(b) - statistic(a)``."""
+    rng = random.Random(seed)
+    estimates = []
+    for _ in range(resamples):
+        value = statistic(rng.choices(a, k=len(a)))
+        if b is not None:
+            value = statistic(rng.choices(b, k=len(b))) - value
+        estimates.append(value)
+    estimates.sort()
+    lo = estimates[int(alpha / 2 * resamples)]
+    hi = estimates[min(resamples - 1, int((1 - alpha / 2) * resamples))]
+    return lo, hi
+
+
+def _ranks(values: list[float]) -> tuple[list[float], float]:
+    """Средние ранги и поправка на связи Σ(t³ − t)."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    ties = 0.0
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    return ranks, ties
+
+
+def mann_whitney_u(a: Sequence[float], b: Sequence[float]) -> tuple[float, float]:
+    """U-критерий Манна–Уитни: (U для ``b``, двусторонний p)."""
+    n1, n2 = len(a), len(b)
+    ranks, ties = _ranks(list(a) + list(b))
+    u = sum(ranks[n1:]) - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    sigma2 = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if sigma2 <= 0:
+        return u, 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(sigma2)  # поправка на непрерывность
+    return u, min(1.0, math.erfc(max(0.0, z) / math.sqrt(2)))
+
+
+def cliffs_delta(a: Sequence[float], b: Sequence[float]) -> float:
+    """δ Клиффа: P(b > a) − P(b < a), через U без перебора пар."""
+    u, _ = mann_whitney_u(a, b)
+    return 2 * u / (len(a) * len(b)) - 1
+
+
+def cliffs_magnitude(delta: float) -> str:
+    for limit, label in CLIFF_THRESHOLDS:
+        if abs(delta) < limit:
+            return label
+    return CLIFF_LARGE
+
+
+def required_samples(
+    a: Sequence[float],
+    b: Sequence[float],
+    alpha: float = ALPHA,
+    power: float = POWER,
+) -> Optional[int]:
+    """Образцов на профиль, чтобы различить наблюдаемую разницу средних.
+
+    Учитывает эффективность Манна–Уитни и автокорреляцию (эффективный
+    объём выборки меньше числа секунд). ``None`` — разницы нет.
+    """
+    delta = statistics.fmean(b) - statistics.fmean(a)
+    sd = math.sqrt((statistics.variance(a) + statistics.variance(b)) / 2)
+    if delta == 0:
+        return None
+    if sd == 0:
+        return 2
+    normal = statistics.NormalDist()
+    z = normal.inv_cdf(1 - alpha / 2) + normal.inv_cdf(power)
+    n = 2 * (z * sd / delta) ** 2 / MANN_WHITNEY_ARE
+    rho = min(0.95, max(0.0, (lag1_autocorrelation(a) + lag1_autocorrelation(b)) / 2))
+    return max(2, math.ceil(n * _inflation(rho)))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# СРАВНЕНИЕ ПРОФИЛЕЙ
+# ═══════════════════════════════════════════════════════════════════════════════
+@dataclass
+class ComparisonResult:
+    """Итог сравнения одного показателя (значения — в единицах образцов)."""
+    baseline_n: int
+    optimized_n: int
+    baseline_mean: float
+    optimized_mean: float
+    baseline_ci: tuple[float, float]
+    optimized_ci: tuple[float, float]
+    diff_ci: tuple[float, float]
+    p_value: float
+    cliffs_delta: float
+    magnitude: str
+    significant: bool
+    min_samples: Optional[int]
+    trimmed: int  # отрезано образцов разгона (всего)
+    block: int = 1  # замеров в блоке для критерия и бутстрапа
+
+    @property
+    def diff_pct(self) -> float:
+        if self.baseline_mean == 0:
+            return 0.0
+        return (self.optimized_mean - self.baseline_mean) / self.baseline_mean * 100
+
+    @property
+    def verdict(self) -> str:
+        """"improved", "regressed" или "inconclusive"."""
+        if not self.significant or self.magnitude == CLIFF_THRESHOLDS[0][1]:
+            return "inconclusive"
+        return "improved" if self.cliffs_delta > 0 else "regressed"
+
+
+def compare_runs(
+    baseline_runs: Sequence[Sequence[float]],
+    optimized_runs: Sequence[Sequence[float]],
+    alpha: float = ALPHA,
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: int = 0,
+) -> Optional[ComparisonResult]:
+    """Сравнить прогоны двух профилей (у каждого прогона отрезается разгон).
+
+    Критерий и интервалы считаются по средним блоков (``block_size``),
+    δ Клиффа — описательная величина по всем замерам.
+    """
+    kept_runs: tuple[list, list] = ([], [])
+    trimmed = 0
+    for runs, kept in zip((baseline_runs, optimized_runs), kept_runs):
+        for run in runs:
+            cut = trim_warmup(run)
+            trimmed += len(run) - len(cut)
+            kept.append(cut)
+    base = [x for run in kept_runs[0] for x in run]
+    opt = [x for run in kept_runs[1] for x in run]
+    if len(base) < 2 or len(opt) < 2:
+        return None
+
+    block = block_size(kept_runs[0] + kept_runs[1])
+    base_blocks = block_means(kept_runs[0], block)
+    opt_blocks = block_means(kept_runs[1], block)
+    _, p_value = mann_whitney_u(base_blocks, opt_blocks)
+    delta = cliffs_delta(base, opt)
+    return ComparisonResult(
+        baseline_n=len(base),
+        optimized_n=len(opt),
+        baseline_mean=statistics.fmean(base),
+        optimized_mean=statistics.fmean(opt),
+        baseline_ci=bootstrap_ci(base_blocks, resamples=resamples, alpha=alpha, seed=seed),
+        optimized_ci=bootstrap_ci(opt_blocks, resamples=resamples, alpha=alpha, seed=seed + 1),
+        diff_ci=bootstrap_ci(base_blocks, opt_blocks, resamples=resamples, alpha=alpha, seed=seed + 2),
+        p_value=p_value,
+        cliffs_delta=delta,
+        magnitude=cliffs_magnitude(delta),
+        significant=p_value < alpha,
+        min_samples=required_samples(base, opt, alpha=alpha),
+        trimmed=trimmed,
+        block=block,
+    )
@@ -6,9 +6,11 @@
 import os
 import configparser
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-from .models import OptimizedSettings, ProtocolMode, EncryptionMode
+from .ini_keys import keys_for, parse_version
+from .ini_patch import ConfigLockedError, held_lock, patch_file
+from .models import OptimizedSettings
 
 
 class ConfigManager:
@@ -17,8 +19,6 @@ class ConfigManager:
     def __init__(self):
         self.installation_type = "Unknown"
         self.config_path: Optional[Path] = self._find_config()
-        self.config = configparser.ConfigParser(interpolation=None)
-        self.config.optionxform = str
 
     def _find_config(self, env_profile=None) -> Optional[Path]:
         """Поиск файла qBittorrent.ini / qBittorrent.conf."""
@@ -65,76 +65,74 @@ class ConfigManager:
                 pass
         return False
 
-    def apply_settings(self, settings: OptimizedSettings) -> bool:
-        """Применить настройки к файлу."""
-        if not self.config_path:
-            return False
+    def locked_by(self) -> Optional[Path]:
+        """Занятый lockfile, если qBittorrent с этим конфигом запущен."""
+        return held_lock(self.config_path) if self.config_path else None
 
-        try:
-            self.config.read(self.config_path, encoding="utf-8")
+    def apply_settings(
+        self, settings: OptimizedSettings, version: Optional[str] = None, force: bool = False
+    ) -> bool:
+        """Применить настройки к файлу.
 
-            # ═══════════════════════════════════════════════════════════════════
-            # Секция BitTorrent
-            # ═══════════════════════════════════════════════════════════════════
-            if "BitTorrent" not in self.config:
-                self.config.add_section("BitTorrent")
-            
-            bt = self.config["BitTorrent"]
-            bt["MaxConnections"] = str(settings.max_connections_global)
-            bt["MaxConnectionsPerTorrent"] = str(settings.max_connections_per_torrent)
-            bt["MaxUploadSlots"] = str(settings.upload_slots_global)
-            bt["MaxUploadSlotsPerTorrent"] = str(settings.upload_slots_per_torrent)
-            bt["uTP_rate_limited"] = "true"
-            
-            # Лимиты скорости (kbps -> bytes/sec)
-            bt["UploadLimit"] = str(settings.global_upload_limit_kbps * 1024)
-            bt["DownloadLimit"] = str(settings.global_download_limit_kbps * 1024)
-
-            # ═══════════════════════════════════════════════════════════════════
-            # Секция Connection
-            # ═══════════════════════════════════════════════════════════════════
-            if "Connection" not in self.config:
-                self.config.add_section("Connection")
-            
-            conn = self.config["Connection"]
-            if settings.listening_port != "Стандартный" and "Random" in settings.listening_port:
-                import re
-                port = re.findall(r'\d+', settings.listening_port)[0]
-                conn["PortRangeMin"] = port
-            
-            if settings.network_interface:
-                conn["Interface"] = settings.network_interface
-
-            # ═══════════════════════════════════════════════════════════════════
-            # Секция Downloads
-            # ═══════════════════════════════════════════════════════════════════
-            if "Downloads" not in self.config:
-                self.config.add_section("Downloads")
-            
-            dl = self.config["Downloads"]
-            dl["MaxActiveDownloads"] = str(settings.max_active_downloads)
-            dl["MaxActiveUploads"] = str(settings.max_active_uploads)
-            dl["MaxActiveTorrents"] = str(settings.max_active_torrents)
-            dl["PreAllocation"] = "true" if settings.pre_allocate_disk else "false"
-
-            # ═══════════════════════════════════════════════════════════════════
-            # Секция Advanced
-            # ═══════════════════════════════════════════════════════════════════
-            if "Advanced" not in self.config:
-                self.config.add_section("Advanced")
-            
-            adv = self.config["Advanced"]
-            adv["DiskCache"] = str(settings.disk_cache_mb)
-            adv["EnableOSCache"] = "true" if settings.enable_os_cache else "false"
-            adv["AsyncIOThreads"] = str(settings.async_io_threads)
-            adv["SocketBacklogSize"] = str(settings.socket_backlog_size)
-            adv["OutgoingConnectionsPerSecond"] = str(settings.outgoing_connections_per_second)
+        ``version`` — версия qBittorrent (``"v4.6.2"``): пишутся только её
+        ключи. Без версии — все раскладки (см. ``ini_keys``). Файл правится
+        на месте (``ini_patch``); пока qBittorrent держит lockfile, запись
+        запрещена, если не указан ``force``.
+        """
+        if not self.config_path:
+            return False
 
-            # Сохраняем файл
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                self.config.write(f)
+        updates = {}
+        for key in keys_for(parse_version(version) if version else None):
+            value = key.encode(settings)
+            if value is not None:
+                updates[(key.section, key.key)] = value
 
+        try:
+            patch_file(self.config_path, updates, force=force)
             return True
+        except ConfigLockedError as e:
+            print(f"Refusing to write config: {e}")
+            return False
         except Exception as e:
             print(f"Error applying settings: {e}")
             return False
+
+    def read_settings(self, version: Optional[str] = None) -> dict[str, Any]:
+        """Значения полей ``OptimizedSettings``, записанные в файле.
+
+        Для поля с несколькими ключами берётся первый найденный; раскладка
+        ``Session\\`` читается раньше прежних секций.
+        """
+        config = configparser.ConfigParser(interpolation=None)
+        config.optionxform = str
+        if self.config_path:
+            config.read(self.config_path, encoding="utf-8")
+
+        values: dict[str, Any] = {}
+        for key in keys_for(parse_version(version) if version else None):
+            if key.field is None or key.field in values:
+                continue
+            raw = config.get(key.section, key.key, fallback=None)
+            if raw is None:
+                continue
+            try:
+                values[key.field] = key.codec.decode(raw)
+            except (KeyError, ValueError):
+                print(f"Unexpected value for {key.section}/{key.key}: {raw!r}")
+        return values
+
+    def apply_instances(
+        self, instances: list[OptimizedSettings], paths: list, version: Optional[str] = None
+    ) -> list[bool]:
+        """Записать настройки N экземпляров — каждый в свой конфиг."""
+        if len(instances) != len(paths):
+            raise ValueError(f"Expected {len(instances)} config paths, got {len(paths)}")
+        results = []
+        for settings, path in zip(instances, paths):
+            # Отдельный менеджер на путь: config_path — его состояние
+            manager = ConfigManager()
+            manager.config_path = Path(path)
+            manager.config_path.parent.mkdir(parents=True, exist_ok=True)
+            results.append(manager.apply_settings(settings, version))
+        return results
@@ -0,0 +1,270 @@
+"""Диагностика узкого места прогона: диск, сеть, пиры или CPU.
+
+qBittorrent отдаёт в ``server_state`` (``sync/maindata``) состояние
+дисковой очереди libtorrent: ``queued_io_jobs``, ``average_time_queue``
+(мс), ``read_cache_overload``/``write_cache_overload`` (%),
+``total_buffers_size`` и ``total_queued_size`` (байт). Вместе со
+скоростью и числом пиров этого достаточно, чтобы отличить:
+
+- disk-bound — очередь диска растёт, задания ждут, кэш переполнен;
+- network-bound — скорость упёрлась в канал или в лимит скорости;
+- peer-bound — упёрлись в лимит соединений или рой слишком мал;
+- CPU-bound — загрузка CPU хоста (если известна) у предела.
+
+Каждый признак нормирован к своему порогу (1.0 — порог достигнут),
+вердикт — признак с наибольшим счётом не ниже 1. Вердикт переводится в
+конкретные поля ``OptimizedSettings``, которые стоит изменить.
+"""
+
+import os
+import statistics
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+from .calculator import (
+    ASYNC_IO_MIN,
+    MAX_CONNECTIONS_GLOBAL,
+    MAX_CONNECTIONS_PER_TORRENT,
+    SEND_BUFFER_MIN_KB,
+    clamp,
+)
+from .models import OptimizedSettings
+
+VERDICTS = ("disk", "network", "peers", "cpu")
+INCONCLUSIVE = "inconclusive"
+
+# Пороги признаков (счёт 1.0)
+QUEUED_JOBS_LIMIT = 16          # заданий в дисковой очереди
+QUEUE_TIME_LIMIT_MS = 50        # среднее ожидание в очереди
+CACHE_OVERLOAD_LIMIT = 10       # % переполнения кэша чтения/записи
+LINK_SATURATION = 0.85          # доля канала / лимита скорости
+CONNECTION_SATURATION = 0.9     # доля лимита соединений
+MIN_SWARM_PEERS = 10            # меньше — рой не даёт скорости
+CPU_LOAD_LIMIT = 0.9            # загрузка на ядро
+
+ASYNC_IO_MAX = 128
+DISK_CACHE_MAX_MB = 8192
+
+
+def cpu_load() -> Optional[float]:
+    """Загрузка CPU локального хоста на ядро (load average за минуту); ``None`` на Windows."""
+    if not hasattr(os, "getloadavg"):
+        return None
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """Что известно о среде прогона кроме образцов.
+
+    Канал — байт/с (0 — неизвестен). Лимиты берутся из ``app/preferences``
+    (``dl_limit``/``up_limit`` — байт/с, 0 — без лимита; ``max_connec``).
+    """
+    link_dl: float = 0
+    link_ul: float = 0
+    dl_limit: float = 0
+    ul_limit: float = 0
+    max_connections: int = 0
+    cpu_load: Optional[float] = None
+
+    @classmethod
+    def from_preferences(
+        cls,
+        prefs: Optional[dict[str, Any]],
+        link_dl: float = 0,
+        link_ul: float = 0,
+        cpu_load: Optional[float] = None,
+    ) -> "RunContext":
+        prefs = prefs or {}
+        max_connec = prefs.get("max_connec", 0) or 0
+        return cls(
+            link_dl=link_dl,
+            link_ul=link_ul,
+            dl_limit=max(0, prefs.get("dl_limit", 0) or 0),
+            ul_limit=max(0, prefs.get("up_limit", 0) or 0),
+            max_connections=max(0, max_connec),  # -1 — без лимита
+            cpu_load=cpu_load,
+        )
+
+
+@dataclass
+class Recommendation:
+    """Изменение одного поля ``OptimizedSettings``."""
+    field: str
+    direction: str  # "increase", "decrease", "enable"
+    reason: str
+    current: Any = None
+    suggested: Any = None
+
+
+@dataclass
+class Diagnosis:
+    verdict: str
+    scores: dict[str, float]
+    evidence: dict[str, float]
+    recommendations: list[Recommendation] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """Одна строка для отчёта."""
+        labels = {
+            "disk": "💽 упор в диск",
+            "network": "🌐 упор в канал / лимит скорости",
+            "peers": "👥 упор в пиров / лимит соединений",
+            "cpu": "🧮 упор в CPU",
+            INCONCLUSIVE: "узкое место не выявлено",
+        }
+        fields = ", ".join(r.field for r in self.recommendations)
+        return labels[self.verdict] + (f" → {fields}" if fields else "")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ПРИЗНАКИ
+# ═══════════════════════════════════════════════════════════════════════════════
+def _mean(samples: Sequence[dict[str, Any]], name: str) -> float:
+    values = [float(s.get(name) or 0) for s in samples]
+    return statistics.fmean(values) if values else 0.0
+
+
+def _ratio(value: float, limit: float) -> float:
+    return value / limit if limit > 0 else 0.0
+
+
+def run_evidence(samples: Sequence[dict[str, Any]]) -> dict[str, float]:
+    """Средние показатели прогона (скорость — байт/с, очередь — мс)."""
+    return {
+        "dl_speed": _mean(samples, "dl_speed"),
+        "ul_speed": _mean(samples, "ul_speed"),
+        "peers": _mean(samples, "peers"),
+        "queued_io_jobs": _mean(samples, "queued_io_jobs"),
+        "average_time_queue": _mean(samples, "average_time_queue"),
+        "read_cache_overload": _mean(samples, "read_cache_overload"),
+        "write_cache_overload": _mean(samples, "write_cache_overload"),
+        "total_queued_size": _mean(samples, "total_queued_size"),
+        "total_buffers_size": _mean(samples, "total_buffers_size"),
+    }
+
+
+def score_run(evidence: dict[str, float], context: RunContext) -> dict[str, float]:
+    """Счёт каждого вердикта (1.0 — порог признака достигнут)."""
+    dl, ul = evidence["dl_speed"], evidence["ul_speed"]
+    disk = max(
+        _ratio(evidence["queued_io_jobs"], QUEUED_JOBS_LIMIT),
+        _ratio(evidence["average_time_queue"], QUEUE_TIME_LIMIT_MS),
+        _ratio(max(evidence["read_cache_overload"], evidence["write_cache_overload"]), CACHE_OVERLOAD_LIMIT),
+    )
+    network = max(
+        _ratio(dl, LINK_SATURATION * context.link_dl),
+        _ratio(ul, LINK_SATURATION * context.link_ul),
+        _ratio(dl, LINK_SATURATION * context.dl_limit),
+        _ratio(ul, LINK_SATURATION * context.ul_limit),
+    )
+    peers = _ratio(evidence["peers"], CONNECTION_SATURATION * context.max_connections)
+    if (dl or ul) and evidence["peers"] < MIN_SWARM_PEERS:
+        # Трафик есть, а пиров почти нет — скорость ограничивает рой
+        peers = max(peers, 1 + (MIN_SWARM_PEERS - evidence["peers"]) / MIN_SWARM_PEERS)
+    cpu = _ratio(context.cpu_load or 0, CPU_LOAD_LIMIT)
+    return {"disk": disk, "network": network, "peers": peers, "cpu": cpu}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# РЕКОМЕНДАЦИИ
+# ═══════════════════════════════════════════════════════════════════════════════
+def _scaled(settings: Optional[OptimizedSettings], name: str, factor: float, low: int, high: int):
+    if settings is None:
+        return None, None
+    current = getattr(settings, name)
+    if current <= 0:
+        # -1 — «авто», 0 — выключено намеренно (ZFS): величину не предлагаем
+        return current, None
+    return current, clamp(int(current * factor), low, high)
+
+
+def recommend(
+    verdict: str,
+    evidence: dict[str, float],
+    context: RunContext,
+    settings: Optional[OptimizedSettings] = None,
+) -> list[Recommendation]:
+    """Поля ``OptimizedSettings`` для вердикта (значения — если известны текущие)."""
+    recs: list[Recommendation] = []
+
+    def add(name, direction, reason, factor=None, low=0, high=0):
+        current = suggested = None
+        if factor is not None:
+            current, suggested = _scaled(settings, name, factor, low, high)
+        elif settings is not None:
+            current = getattr(settings, name)
+        recs.append(Recommendation(name, direction, reason, current, suggested))
+
+    if verdict == "disk":
+        if evidence["write_cache_overload"] or evidence["read_cache_overload"]:
+            add("disk_cache_mb", "increase",
+                "Кэш переполнен: запись/чтение ждут освобождения буферов.", 2, 64, DISK_CACHE_MAX_MB)
+        if evidence["queued_io_jobs"] >= QUEUED_JOBS_LIMIT or evidence["average_time_queue"] >= QUEUE_TIME_LIMIT_MS:
+            add("async_io_threads", "increase",
+                f"Очередь диска {evidence['queued_io_jobs']:.0f} заданий, "
+                f"ожидание {evidence['average_time_queue']:.0f} мс — мало потоков I/O.", 2, ASYNC_IO_MIN, ASYNC_IO_MAX)
+        if settings is None or not settings.coalesce_reads_writes:
+            add("coalesce_reads_writes", "enable", "Объединение мелких операций снижает нагрузку на диск.")
+            recs[-1].suggested = True
+        if not recs:
+            add("disk_cache_mb", "increase", "Диск не успевает за сетью.", 2, 64, DISK_CACHE_MAX_MB)
+
+    elif verdict == "network":
+        limited_dl = context.dl_limit and evidence["dl_speed"] >= LINK_SATURATION * context.dl_limit
+        limited_ul = context.ul_limit and evidence["ul_speed"] >= LINK_SATURATION * context.ul_limit
+        if limited_dl and (not context.link_dl or context.dl_limit < LINK_SATURATION * context.link_dl):
+            add("global_download_limit_kbps", "increase", "Скорость упирается в лимит загрузки, канал свободен.")
+        if limited_ul and (not context.link_ul or context.ul_limit < LINK_SATURATION * context.link_ul):
+            add("global_upload_limit_kbps", "increase", "Скорость упирается в лимит отдачи, канал свободен.")
+        if context.link_ul and evidence["ul_speed"] >= LINK_SATURATION * context.link_ul:
+            add("global_upload_limit_kbps", "decrease",
+                "Отдача забивает канал: ACK загрузки застревают в очереди аплинка.")
+            if settings is not None:
+                recs[-1].suggested = int(context.link_ul * 0.8 / 1000)
+            add("send_buffer_watermark_kb", "decrease",
+                "Канал отдачи полон: буфер сверх BDP только добавляет задержку.",
+                0.5, SEND_BUFFER_MIN_KB, max(SEND_BUFFER_MIN_KB, getattr(settings, "send_buffer_watermark_kb", 0)))
+
+    elif verdict == "peers":
+        if context.max_connections and evidence["peers"] >= CONNECTION_SATURATION * context.max_connections:
+            add("max_connections_global", "increase",
+                f"Подключено {evidence['peers']:.0f} пиров при лимите {context.max_connections}.",
+                1.5, 1, MAX_CONNECTIONS_GLOBAL)
+            add("max_connections_per_torrent", "increase", "Лимит соединений на раздачу ограничивает рой.",
+                1.5, 1, MAX_CONNECTIONS_PER_TORRENT)
+        else:
+            add("max_connections_per_torrent", "increase",
+                f"Всего {evidence['peers']:.0f} пиров: рой мал, нужен каждый доступный пир.",
+                1.5, 1, MAX_CONNECTIONS_PER_TORRENT)
+            add("outgoing_connections_per_second", "increase", "Быстрее находить новых пиров.", 2, 1, 200)
+
+    elif verdict == "cpu":
+        add("max_connections_global", "decrease",
+            "CPU у предела: каждое соединение стоит шифрования и обработки сообщений.",
+            0.75, 1, MAX_CONNECTIONS_GLOBAL)
+        add("async_io_threads", "decrease", "Лишние потоки I/O конкурируют за ядра.", 0.5, ASYNC_IO_MIN, ASYNC_IO_MAX)
+
+    return recs
+
+
+def diagnose_run(
+    samples: Sequence[dict[str, Any]],
+    context: RunContext = RunContext(),
+    settings: Optional[OptimizedSettings] = None,
+) -> Diagnosis:
+    """Классифицировать прогон и подобрать изменения настроек."""
+    evidence = run_evidence(samples)
+    scores = score_run(evidence, context)
+    verdict, best = max(scores.items(), key=lambda item: item[1])
+    if best < 1:
+        verdict = INCONCLUSIVE
+    return Diagnosis(
+        verdict=verdict,
+        scores={k: round(v, 2) for k, v in scores.items()},
+        evidence=evidence,
+        recommendations=recommend(verdict, evidence, context, settings) if verdict != INCONCLUSIVE else [],
+    )
@@ -0,0 +1,245 @@
+"""Микро-бенчмарк накопителя в каталоге загрузок.
+
+Замеряет последовательную запись и случайные чтение/запись блоками
+16 КиБ на нескольких глубинах очереди. Глубина очереди N — это N
+потоков, каждый со своим дескриптором и синхронным I/O (GIL на время
+системного вызова отпускается).
+
+Буферы выровнены по странице (анонимный ``mmap``), файл открывается
+с ``O_DIRECT`` там, где он есть (macOS — ``F_NOCACHE``), чтобы мерить
+диск, а не кэш ОС. Временный файл ограничен по размеру (не больше
+10% свободного места) и удаляется всегда.
+"""
+
+import errno
+import mmap
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Union
+
+from .models import DiskProfile
+
+
+BLOCK_SIZE = 16 * 1024
+SEQ_BLOCK_SIZE = 1024 * 1024
+DEFAULT_QUEUE_DEPTHS = (1, 2, 4, 8, 16, 32)
+
+# Доля свободного места, которую может занять временный файл
+MAX_FREE_SPACE_SHARE = 0.1
+
+
+def _aligned_buffer(size: int) -> mmap.mmap:
+    """Буфер, выровненный по странице, со случайным содержимым (против сжатия)."""
+    buf = mmap.mmap(-1, size)
+    buf.write(os.urandom(size))
+    return buf
+
+
+class DiskBenchmark:
+    """Замер накопителя во временном файле внутри ``directory``."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        file_size_mb: int = 256,
+        queue_depths: tuple[int, ...] = DEFAULT_QUEUE_DEPTHS,
+        duration_sec: float = 1.0,
+        direct: bool = True,
+    ):
+        self.directory = Path(directory)
+        self.file_size_mb = file_size_mb
+        self.queue_depths = tuple(queue_depths)
+        self.duration_sec = duration_sec
+        self.direct = direct
+        self.direct_io = False
+        self.size = 0
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Файл
+    # ─────────────────────────────────────────────────────────────────────────
+    def _bounded_size(self) -> int:
+        free = shutil.disk_usage(self.directory).free
+        size = min(self.file_size_mb * 1024 * 1024, int(free * MAX_FREE_SPACE_SHARE))
+        size -= size % SEQ_BLOCK_SIZE
+        if size < SEQ_BLOCK_SIZE:
+            raise OSError(errno.ENOSPC, f"Not enough free space for disk benchmark in {self.directory}")
+        return size
+
+    def _open(self, path: Path, create: bool = False):
+        flags = os.O_RDWR | getattr(os, "O_BINARY", 0)
+        if create:
+            flags |= os.O_CREAT | os.O_EXCL
+        if self.direct_io and hasattr(os, "O_DIRECT"):
+            fd = os.open(path, flags | os.O_DIRECT, 0o600)
+        else:
+            fd = os.open(path, flags, 0o600)
+            if self.direct_io and hasattr(os, "F_NOCACHE"):
+                import fcntl
+                try:
+                    fcntl.fcntl(fd, fcntl.F_NOCACHE, 1)
+                except OSError:
+                    os.close(fd)
+                    raise
+        return os.fdopen(fd, "r+b", buffering=0)
+
+    def _create(self, path: Path):
+        """Создать файл; если ФС не умеет O_DIRECT (tmpfs), работать через кэш."""
+        self.direct_io = self.direct and (hasattr(os, "O_DIRECT") or hasattr(os, "F_NOCACHE"))
+        try:
+            return self._open(path, create=True)
+        except OSError as e:
+            if not self.direct_io or e.errno != errno.EINVAL:
+                raise
+            self.direct_io = False
+            return self._open(path, create=True)
+
+    def _drop_cache(self, f):
+        """Сбросить страницы файла из кэша ОС (если замер идёт без O_DIRECT)."""
+        os.fsync(f.fileno())
+        if not self.direct_io and hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Замеры
+    # ─────────────────────────────────────────────────────────────────────────
+    def _sequential_write(self, f) -> float:
+        """Последовательная запись всего файла, МБ/с (с fsync)."""
+        buf = _aligned_buffer(SEQ_BLOCK_SIZE)
+        try:
+            start = time.perf_counter()
+            for _ in range(self.size // SEQ_BLOCK_SIZE):
+                f.write(buf)
+            os.fsync(f.fileno())
+            elapsed = time.perf_counter() - start
+        finally:
+            buf.close()
+        return self.size / (1024 * 1024) / max(elapsed, 1e-9)
+
+    def _random_io(self, path: Path, queue_depth: int, write: bool) -> tuple[float, float]:
+        """Случайный I/O на глубине очереди; возвращает (IOPS, средняя задержка мс)."""
+        blocks = self.size // BLOCK_SIZE
+        counts = [0] * queue_depth
+        busy = [0.0] * queue_depth
+        errors: list[BaseException] = []
+        files = []  # открываются в try ниже: при EMFILE/EINVAL уже открытые закрываются
+        barrier = threading.Barrier(queue_depth + 1)
+        deadline = 0.0
+
+        def worker(k: int):
+            rng = random.Random(k)
+            buf = _aligned_buffer(BLOCK_SIZE)
+            f = files[k]
+            try:
+                barrier.wait()
+                while time.perf_counter() < deadline:
+                    offset = rng.randrange(blocks) * BLOCK_SIZE
+                    t = time.perf_counter()
+                    f.seek(offset)
+                    if write:
+                        f.write(buf)
+                    else:
+                        f.readinto(buf)
+                    busy[k] += time.perf_counter() - t
+                    counts[k] += 1
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                buf.close()
+
+        threads = [threading.Thread(target=worker, args=(k,), daemon=True) for k in range(queue_depth)]
+        try:
+            for _ in range(queue_depth):
+                files.append(self._open(path))
+            for t in threads:
+                t.start()
+            start = time.perf_counter()
+            deadline = start + self.duration_sec
+            barrier.wait()
+            for t in threads:
+                t.join()
+            if write:
+                # Без O_DIRECT запись оседает в кэше — fsync входит в замер
+                os.fsync(files[0].fileno())
+            elapsed = time.perf_counter() - start
+        finally:
+            for f in files:
+                f.close()
+        if errors:
+            raise errors[0]
+
+        total = sum(counts)
+        iops = total / max(elapsed, 1e-9)
+        latency_ms = sum(busy) / total * 1000 if total else 0.0
+        return iops, latency_ms
+
+    def run(self) -> DiskProfile:
+        """Выполнить все замеры и вернуть профиль диска."""
+        self.size = self._bounded_size()
+        path = self.directory / f".qfrey-diskbench-{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with self._create(path) as f:
+                seq_write = self._sequential_write(f)
+                self._drop_cache(f)
+
+            read_iops, read_lat, write_iops, write_lat = [], [], [], []
+            for qd in self.queue_depths:
+                iops, lat = self._random_io(path, qd, write=False)
+                read_iops.append(round(iops, 1))
+                read_lat.append(round(lat, 3))
+                iops, lat = self._random_io(path, qd, write=True)
+                write_iops.append(round(iops, 1))
+                write_lat.append(round(lat, 3))
+                with self._open(path) as f:
+                    self._drop_cache(f)
+        finally:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+        return DiskProfile(
+            seq_write_mb_s=round(seq_write, 1),
+            queue_depths=self.queue_depths,
+            read_iops=tuple(read_iops),
+            write_iops=tuple(write_iops),
+            read_latency_ms=tuple(read_lat),
+            write_latency_ms=tuple(write_lat),
+            block_size_kb=BLOCK_SIZE // 1024,
+            direct_io=self.direct_io,
+        )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# СЕРИАЛИЗАЦИЯ (session.json, инвентарь fleet)
+# ═══════════════════════════════════════════════════════════════════════════════
+def profile_to_dict(profile: DiskProfile) -> dict[str, Any]:
+    """Профиль диска → JSON-совместимый словарь."""
+    return {
+        "seq_write_mb_s": profile.seq_write_mb_s,
+        "queue_depths": list(profile.queue_depths),
+        "read_iops": list(profile.read_iops),
+        "write_iops": list(profile.write_iops),
+        "read_latency_ms": list(profile.read_latency_ms),
+        "write_latency_ms": list(profile.write_latency_ms),
+        "block_size_kb": profile.block_size_kb,
+        "direct_io": profile.direct_io,
+    }
+
+
+def profile_from_dict(data: dict[str, Any]) -> DiskProfile:
+    """Словарь (см. ``profile_to_dict``) → профиль диска."""
+    return DiskProfile(
+        seq_write_mb_s=float(data["seq_write_mb_s"]),
+        queue_depths=tuple(int(v) for v in data["queue_depths"]),
+        read_iops=tuple(float(v) for v in data["read_iops"]),
+        write_iops=tuple(float(v) for v in data["write_iops"]),
+        read_latency_ms=tuple(float(v) for v in data["read_latency_ms"]),
+        write_latency_ms=tuple(float(v) for v in data["write_latency_ms"]),
+        block_size_kb=int(data.get("block_size_kb", BLOCK_SIZE // 1024)),
+        direct_io=bool(data.get("direct_io", True)),
+    )
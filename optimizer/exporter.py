@@ -0,0 +1,295 @@
+"""Экспорт метрик в формате OpenMetrics / Prometheus для headless-режима.
+
+Опрос и отдача разделены: цикл ``asyncio`` опрашивает экземпляры
+(``sync/maindata`` — только дельты, настройки — раз в
+``preferences_every`` проходов) и после каждого прохода собирает текст
+метрик заново. HTTP-сервер отдаёт готовые байты — запрос Prometheus
+никогда не обращается к WebAPI и стоит одинаково при любом числе
+экземпляров. Каждый экземпляр — метка ``instance``.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional, Union
+
+from .async_client import AsyncQBittorrentClient
+from .sync_client import MaindataMirror
+from .timeseries import CounterRates, TimeSeries
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+STABILITY_WINDOW = 30
+
+# Настройки, которые рассчитывает тюнер (числовые и флаги app/preferences)
+EXPORTED_PREFERENCES = (
+    "dl_limit", "up_limit",
+    "max_connec", "max_connec_per_torrent", "max_uploads", "max_uploads_per_torrent",
+    "max_active_downloads", "max_active_uploads", "max_active_torrents",
+    "disk_cache", "async_io_threads", "enable_coalesce_read_write",
+    "send_buffer_watermark", "send_buffer_low_watermark", "send_buffer_watermark_factor",
+    "socket_backlog_size", "connection_speed", "bittorrent_protocol", "encryption",
+    "anonymous_mode", "dht", "pex", "lsd", "file_pool_size",
+)
+
+# server_state → (метрика, множитель к единице метрики, справка)
+DISK_STATE = (
+    ("queued_io_jobs", "qbittorrent_disk_queued_io_jobs", 1, "Disk I/O jobs waiting in the queue."),
+    ("average_time_queue", "qbittorrent_disk_queue_time_seconds", 0.001, "Average time a job spends in the disk queue."),
+    ("total_queued_size", "qbittorrent_disk_queued_bytes", 1, "Bytes waiting in the disk queue."),
+    ("total_buffers_size", "qbittorrent_disk_buffers_bytes", 1, "Size of libtorrent disk buffers."),
+    ("read_cache_hits", "qbittorrent_disk_read_cache_hits_ratio", 0.01, "Read cache hit ratio."),
+    ("read_cache_overload", "qbittorrent_disk_read_cache_overload_ratio", 0.01, "Read cache overload ratio."),
+    ("write_cache_overload", "qbittorrent_disk_write_cache_overload_ratio", 0.01, "Write cache overload ratio."),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: Any) -> Optional[float]:
+    """Значение метрики: числа и флаги; строки-числа из server_state тоже."""
+    if isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ТЕКСТОВЫЙ ФОРМАТ
+# ═══════════════════════════════════════════════════════════════════════════════
+@dataclass
+class MetricFamily:
+    """Семейство метрик: ``samples`` — (метки, значение)."""
+    name: str
+    type: str
+    help: str
+    unit: str = ""
+    samples: list[tuple[dict[str, str], float]] = field(default_factory=list)
+
+    def add(self, labels: dict[str, str], value: Optional[float]):
+        if value is not None:
+            self.samples.append((labels, value))
+
+    def render(self, openmetrics: bool) -> list[str]:
+        if not self.samples:
+            return []
+        # В OpenMetrics семейство счётчика — без суффикса, в 0.0.4 — с ним
+        family = self.name if openmetrics or self.type != "counter" else self.name + "_total"
+        sample_name = self.name + "_total" if self.type == "counter" else self.name
+        lines = [f"# TYPE {family} {self.type}"]
+        if openmetrics and self.unit:
+            lines.append(f"# UNIT {family} {self.unit}")
+        lines.append(f"# HELP {family} {self.help}")
+        for labels, value in self.samples:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{sample_name}{{{label_text}}} {_format(value)}")
+        return lines
+
+
+def render(families: list[MetricFamily], openmetrics: bool = True) -> bytes:
+    lines = [line for family in families for line in family.render(openmetrics)]
+    if openmetrics:
+        lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ОПРОС
+# ═══════════════════════════════════════════════════════════════════════════════
+class InstanceState:
+    """Что известно об одном экземпляре после последнего прохода."""
+
+    def __init__(self, window: int):
+        self.mirror = MaindataMirror()
+        self.rates = CounterRates()
+        self.window = TimeSeries(capacity=window)
+        self.preferences: dict[str, Any] = {}
+        self.stats: dict[str, Any] = {}
+        self.up = False
+        self.poll_seconds = 0.0
+        self.polls = 0
+        self.errors = 0
+
+
+class MetricsExporter:
+    """Опрос экземпляров и кэш текста метрик для ``/metrics``."""
+
+    def __init__(
+        self,
+        clients: list[AsyncQBittorrentClient],
+        max_concurrency: int = 16,
+        preferences_every: int = 60,
+        window: int = STABILITY_WINDOW,
+    ):
+        self.clients = clients
+        self.max_concurrency = max_concurrency
+        self.preferences_every = preferences_every
+        self.states = {c.host: InstanceState(window) for c in clients}
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._snapshot = {True: render([], True), False: render([], False)}
+        self.last_poll = 0.0
+
+    def snapshot(self, openmetrics: bool = True) -> bytes:
+        """Готовый текст метрик (без обращений к WebAPI)."""
+        with self._lock:
+            return self._snapshot[openmetrics]
+
+    async def _poll_one(self, client: AsyncQBittorrentClient):
+        state = self.states[client.host]
+        async with self._limit:
+            start = time.monotonic()
+            if not client.is_connected and not await client.connect():
+                state.mirror.reset()
+                state.rates.reset()
+                state.up = False
+                state.errors += 1
+                return
+            data = await client.get_maindata(state.mirror.rid)
+            if data is None:
+                # Потеря связи: следующий запрос начнёт с полного состояния
+                state.mirror.reset()
+                state.rates.reset()
+                state.up = False
+                state.errors += 1
+                return
+            state.mirror.apply(data)
+            if not state.preferences or state.polls % self.preferences_every == 0:
+                state.preferences = await client.get_preferences() or state.preferences
+            stats = state.rates.apply(state.mirror.main_stats())
+            state.window.append(stats)
+            state.stats = stats
+            state.up = True
+            state.polls += 1
+            state.poll_seconds = time.monotonic() - start
+
+    async def poll(self):
+        """Один проход по всем экземплярам и обновление кэша."""
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self._poll_one(c) for c in self.clients), return_exceptions=True)
+        for client, result in zip(self.clients, results):
+            if isinstance(result, BaseException):
+                print(f"Exporter poll failed ({client.host}): {type(result).__name__}: {result}")
+                self.states[client.host].up = False
+                self.states[client.host].errors += 1
+        self.last_poll = time.time()
+        families = self.collect()
+        snapshot = {True: render(families, True), False: render(families, False)}
+        with self._lock:
+            self._snapshot = snapshot
+
+    async def run(self, interval: float = 5.0, count: Optional[int] = None):
+        """Опрос с периодом ``interval`` (``count`` — ограничить число проходов)."""
+        n = 0
+        next_tick = time.monotonic()
+        while count is None or n < count:
+            await self.poll()
+            n += 1
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.clients))
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Метрики
+    # ─────────────────────────────────────────────────────────────────────────
+    def collect(self) -> list[MetricFamily]:
+        up = MetricFamily("qbittorrent_up", "gauge", "Whether the last WebAPI poll succeeded.")
+        errors = MetricFamily("qbittorrent_poll_errors", "counter", "Failed WebAPI polls.")
+        poll = MetricFamily("qbittorrent_poll_duration_seconds", "gauge",
+                            "Duration of the last successful poll.", "seconds")
+        dl = MetricFamily("qbittorrent_download_rate_bytes_per_second", "gauge",
+                          "Download rate from byte counters.", "bytes_per_second")
+        ul = MetricFamily("qbittorrent_upload_rate_bytes_per_second", "gauge",
+                          "Upload rate from byte counters.", "bytes_per_second")
+        dl_total = MetricFamily("qbittorrent_downloaded_bytes", "counter",
+                                "Bytes downloaded in this session.", "bytes")
+        ul_total = MetricFamily("qbittorrent_uploaded_bytes", "counter",
+                                "Bytes uploaded in this session.", "bytes")
+        dht = MetricFamily("qbittorrent_dht_nodes", "gauge", "DHT nodes.")
+        peers = MetricFamily("qbittorrent_peers", "gauge", "Connected seeds and leechers over all torrents.")
+        torrents = MetricFamily("qbittorrent_torrents", "gauge", "Torrents in the client.")
+        stability = MetricFamily("qbittorrent_tuner_stability_ratio", "gauge",
+                                 "Download stability over the last samples (1 - coefficient of variation).", "ratio")
+        disk = {key: MetricFamily(name, "gauge", text) for key, name, _, text in DISK_STATE}
+        settings = MetricFamily("qbittorrent_setting", "gauge",
+                                "Applied qBittorrent preference (numbers and flags).")
+
+        for host, state in self.states.items():
+            labels = {"instance": host}
+            up.add(labels, float(state.up))
+            errors.add(labels, float(state.errors))
+            if not state.polls:
+                continue
+            stats, server = state.stats, state.mirror.server_state
+            poll.add(labels, state.poll_seconds)
+            dl.add(labels, stats.get("dl_speed", 0))
+            ul.add(labels, stats.get("ul_speed", 0))
+            dl_total.add(labels, _number(stats.get("dl_data")))
+            ul_total.add(labels, _number(stats.get("ul_data")))
+            dht.add(labels, stats.get("dht_nodes", 0))
+            peers.add(labels, stats.get("peers", 0))
+            torrents.add(labels, float(len(state.mirror.torrents)))
+            stability.add(labels, state.window.stability() / 100)
+            for key, _, scale, _ in DISK_STATE:
+                value = _number(server.get(key))
+                disk[key].add(labels, value * scale if value is not None else None)
+            for key in EXPORTED_PREFERENCES:
+                settings.add({**labels, "key": key}, _number(state.preferences.get(key)))
+
+        return [up, errors, poll, dl, ul, dl_total, ul_total, dht, peers, torrents, stability,
+                *disk.values(), settings]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# HTTP
+# ═══════════════════════════════════════════════════════════════════════════════
+def _make_handler(exporter: MetricsExporter):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                body = b'<html><body><a href="/metrics">/metrics</a></body></html>\n'
+                status = 200 if self.path == "/" else 404
+                content_type = "text/html; charset=utf-8"
+            else:
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                body = exporter.snapshot(openmetrics)
+                status = 200
+                content_type = OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve_metrics(exporter: MetricsExporter, address: Union[str, tuple[str, int]] = ("", 9877)) -> ThreadingHTTPServer:
+    """Запустить HTTP-сервер ``/metrics`` в фоновом потоке; остановка — ``shutdown()``."""
+    if isinstance(address, str):
+        host, _, port = address.rpartition(":")
+        address = (host, int(port))
+    server = ThreadingHTTPServer(address, _make_handler(exporter))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
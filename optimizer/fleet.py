@@ -0,0 +1,220 @@
+"""Headless-режим для парка машин.
+
+Читает инвентарь хостов (JSONL или CSV), рассчитывает настройки
+для каждого хоста в пуле процессов и записывает отдельный
+``qBittorrent.conf`` на хост плюс сводку ``summary.json``.
+
+Модуль не импортирует PyQt; CLI — ``python -m optimizer fleet``.
+"""
+
+import csv
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PureWindowsPath
+from typing import Any, Optional
+
+from .models import (
+    NetworkSettings,
+    HardwareSettings,
+    UsageSettings,
+    ConnectionType,
+    StorageType,
+    EnvironmentProfile,
+    TrackerType,
+    UserRole,
+)
+from .calculator import calculate_optimal_settings_cached
+from .disk_benchmark import profile_from_dict
+from .partition import partition_settings
+from .config_manager import ConfigManager
+
+
+CONFIG_FILENAME = "qBittorrent.conf"
+SUMMARY_FILENAME = "summary.json"
+
+_TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_VALUES
+    return bool(value)
+
+
+def load_inventory(path: Path) -> list[dict[str, Any]]:
+    """Загрузить инвентарь хостов из JSONL или CSV."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            return [dict(row) for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _load_disk_profile(path: Optional[str]):
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return profile_from_dict(json.load(f))
+
+
+def profile_from_record(
+    record: dict[str, Any],
+) -> tuple[str, NetworkSettings, HardwareSettings, UsageSettings]:
+    """Собрать профиль хоста из записи инвентаря.
+
+    Ключи совпадают с ``session.json`` (в плоском виде), перечисления
+    задаются именами членов: ``storage=NVME``, ``environment=SEEDBOX``.
+    Необязательный ``port_seed`` задаёт порт обхода DPI для хоста;
+    без него порт выводится из сетевого профиля. Необязательный
+    ``rtt_ms`` включает расчёт send buffer по BDP, ``disk_profile`` —
+    путь к JSON-замеру диска (``python -m optimizer diskbench``).
+    Ключ ``instances`` (N > 1) делит машину между N экземплярами
+    (см. ``partition``) — конфиги пишутся в ``<host>/instance-<i>/``.
+    """
+    host = str(record["host"])
+    network = NetworkSettings(
+        download_speed_mbps=float(record["download"]),
+        upload_speed_mbps=float(record["upload"]),
+        connection_type=ConnectionType[record.get("connection") or "FIBER"],
+        use_vpn=_as_bool(record.get("use_vpn", False)),
+        vpn_interface=record.get("vpn_interface") or "",
+        isp_throttling=_as_bool(record.get("isp_throttling", False)),
+        port_seed=str(record.get("port_seed") or ""),
+        rtt_ms=float(record["rtt_ms"]) if record.get("rtt_ms") not in (None, "") else None,
+    )
+    hardware = HardwareSettings(
+        storage_type=StorageType[record.get("storage") or "SSD_SATA"],
+        ram_gb=int(float(record["ram"])),
+        cpu_cores=int(record["cores"]),
+        is_hybrid_cpu=_as_bool(record.get("is_hybrid", False)),
+        p_cores=int(record.get("p_cores") or 0),
+        disk=_load_disk_profile(record.get("disk_profile")),
+        ram_share=float(record.get("ram_share") or 0.5),
+    )
+    usage = UsageSettings(
+        tracker_type=TrackerType[record.get("tracker") or "PUBLIC"],
+        user_role=UserRole[record.get("role") or "LEECHER"],
+        environment=EnvironmentProfile[record.get("environment") or "SYSTEM"],
+        torrent_count=int(record.get("torrent_count") or 0),
+        library_size_gb=float(record.get("library_size_gb") or 0),
+    )
+    return host, network, hardware, usage
+
+
+def host_dir(output_dir: str, host: str) -> Path:
+    """Каталог хоста внутри ``output_dir``.
+
+    Имя хоста приходит из инвентаря и становится именем каталога — значения
+    с разделителями пути, ``..`` или абсолютные пути отклоняются.
+    """
+    if host in ("", ".", "..") or "/" in host or "\\" in host or PureWindowsPath(host).drive:
+        raise ValueError(f"Invalid host name for output directory: {host!r}")
+    base = Path(output_dir).resolve()
+    path = (base / host).resolve()
+    if path.parent != base:
+        raise ValueError(f"Invalid host name for output directory: {host!r}")
+    return Path(output_dir) / host
+
+
+def process_host(
+    record: dict[str, Any],
+    output_dir: str,
+    template: Optional[str] = None,
+) -> dict[str, Any]:
+    """Рассчитать и записать конфиг одного хоста.
+
+    Выполняется в дочернем процессе, поэтому принимает и возвращает
+    только простые (pickle-совместимые) значения.
+    """
+    host = str(record.get("host", "?"))
+    try:
+        host, network, hardware, usage = profile_from_record(record)
+        directory = host_dir(output_dir, host)
+        instances = int(record.get("instances") or 1)
+        if instances > 1:
+            partitioned = partition_settings(network, hardware, usage, instances)
+            paths = [
+                directory / f"instance-{i + 1}" / CONFIG_FILENAME
+                for i in range(instances)
+            ]
+        else:
+            partitioned = [calculate_optimal_settings_cached(network, hardware, usage)]
+            paths = [directory / CONFIG_FILENAME]
+
+        for config_path in paths:
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            if template and not config_path.exists():
+                shutil.copyfile(template, config_path)
+
+        version = str(record.get("qbt_version") or "") or None
+        if not all(ConfigManager().apply_instances(partitioned, paths, version)):
+            return {"host": host, "ok": False, "error": "apply_settings failed"}
+
+        settings = partitioned[0]
+        return {
+            "host": host,
+            "ok": True,
+            "config": str(paths[0]),
+            "configs": [str(p) for p in paths],
+            "instances": instances,
+            "max_connections": settings.max_connections_global,
+            "upload_slots": settings.upload_slots_global,
+            "disk_cache_mb": settings.disk_cache_mb,
+            "async_io_threads": settings.async_io_threads,
+            "warnings": settings.warnings,
+        }
+    except Exception as e:
+        return {"host": host, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def _init_worker(cache_size: int):
+    calculate_optimal_settings_cached.resize(cache_size)
+
+
+def run_fleet(
+    inventory: Path,
+    output_dir: Path,
+    workers: int = 0,
+    template: Optional[Path] = None,
+    cache_size: int = 1024,
+) -> dict[str, Any]:
+    """Обработать весь инвентарь и записать ``summary.json``.
+
+    ``workers=0`` — по числу CPU, ``workers=1`` — без пула процессов.
+    Повторяющиеся профили берутся из LRU-кэша (в каждом процессе свой).
+    """
+    records = load_inventory(inventory)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    out = str(output_dir)
+    tpl = str(template) if template else None
+
+    start = time.monotonic()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(records) <= 1:
+        _init_worker(cache_size)
+        results = [process_host(r, out, tpl) for r in records]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(cache_size,)
+        ) as executor:
+            chunksize = max(1, len(records) // (workers * 4))
+            results = list(executor.map(
+                process_host, records, [out] * len(records), [tpl] * len(records),
+                chunksize=chunksize,
+            ))
+
+    summary = {
+        "inventory": str(inventory),
+        "total": len(results),
+        "ok": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "duration_sec": round(time.monotonic() - start, 3),
+        "hosts": results,
+    }
+    with open(output_dir / SUMMARY_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+    return summary
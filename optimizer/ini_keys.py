@@ -0,0 +1,174 @@
+"""Соответствие полей ``OptimizedSettings`` ключам ``qBittorrent.ini``.
+
+Основная раскладка — ``[BitTorrent] Session\\...`` (4.x и 5.x). Часть
+ключей зависит от версии: с 4.4 (libtorrent 2.0) ``Session\\UseOSCache``
+заменён на ``Session\\DiskIOReadMode``/``DiskIOWriteMode`` и появился
+``Session\\HashingThreadsCount``; 5.x читает ту же раскладку, что 4.4+.
+``Session\\DiskCacheSize`` пишется для всех версий: сборки 4.4–4.6 с
+libtorrent 1.2 его читают, а libtorrent 2.0 просто игнорирует.
+
+Прежние секции (``[BitTorrent] MaxConnections``, ``[Connection]``,
+``[Downloads]``, ``[Advanced]``), которые тюнер писал раньше, остаются в
+``LEGACY_KEYS`` — они пишутся, только если версия qBittorrent неизвестна.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, NamedTuple, Optional
+
+from .models import EncryptionMode, OptimizedSettings, ProtocolMode
+
+SESSION = "BitTorrent"
+Version = tuple[int, ...]
+
+
+def parse_version(text: str) -> Optional[Version]:
+    """``"v4.6.2"`` / ``"5.0.0beta1"`` → ``(4, 6, 2)``; ``None``, если не разобрать."""
+    match = re.match(r"v?(\d+)\.(\d+)(?:\.(\d+))?", text.strip())
+    if not match:
+        return None
+    return tuple(int(part) for part in match.groups() if part is not None)
+
+
+def listening_port(value: str) -> Optional[int]:
+    """Порт из подписи вида ``"Random (51234)"``; ``None``, если его нет."""
+    match = re.search(r"\((\d+)\)", value)
+    return int(match.group(1)) if match else None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# КОДЕКИ ЗНАЧЕНИЙ
+# ═══════════════════════════════════════════════════════════════════════════════
+class Codec(NamedTuple):
+    """Значение поля ↔ строка INI. ``encode`` → ``None`` — ключ не пишется."""
+    encode: Callable[[Any], Optional[str]]
+    decode: Callable[[str], Any]
+
+
+def _enum_codec(names: dict[Any, str]) -> Codec:
+    values = {name: member for member, name in names.items()}
+    return Codec(names.__getitem__, values.__getitem__)
+
+
+INT = Codec(str, int)
+BOOL = Codec(lambda v: "true" if v else "false", lambda s: s.strip().lower() == "true")
+KIB_TO_BYTES = Codec(lambda kb: str(kb * 1024), lambda s: int(s) // 1024)
+TEXT = Codec(lambda v: v or None, str)
+PORT = Codec(
+    lambda label: None if listening_port(label) is None else str(listening_port(label)),
+    int,
+)
+TRUE = Codec(lambda _: "true", BOOL.decode)  # ключ без поля: всегда включён
+
+PROTOCOL = _enum_codec({
+    ProtocolMode.UTP_TCP: "Both",
+    ProtocolMode.TCP_ONLY: "TCP",
+    ProtocolMode.UTP_ONLY: "UTP",
+})
+ENCRYPTION = _enum_codec({
+    EncryptionMode.PREFER: "0",
+    EncryptionMode.REQUIRE: "1",
+    EncryptionMode.DISABLED: "2",
+})
+OS_CACHE_MODE = _enum_codec({True: "EnableOSCache", False: "DisableOSCache"})
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ТАБЛИЦЫ КЛЮЧЕЙ
+# ═══════════════════════════════════════════════════════════════════════════════
+@dataclass(frozen=True)
+class IniKey:
+    """Ключ INI для поля настроек. ``since``/``until`` — версии qBittorrent
+    (``until`` не включительно); ``field=None`` — ключ без поля."""
+    field: Optional[str]
+    section: str
+    key: str
+    codec: Codec = INT
+    since: Version = (0,)
+    until: Optional[Version] = None
+
+    def supported(self, version: Optional[Version]) -> bool:
+        if version is None:
+            return True
+        return self.since <= version and (self.until is None or version < self.until)
+
+    def encode(self, settings: OptimizedSettings) -> Optional[str]:
+        value = getattr(settings, self.field) if self.field else None
+        return self.codec.encode(value)
+
+
+def _session(field: Optional[str], name: str, codec: Codec = INT, **kwargs) -> IniKey:
+    return IniKey(field, SESSION, f"Session\\{name}", codec, **kwargs)
+
+
+SESSION_KEYS: tuple[IniKey, ...] = (
+    # Скорость (КиБ/с) и слоты
+    _session("global_upload_limit_kbps", "GlobalUPSpeedLimit"),
+    _session("global_download_limit_kbps", "GlobalDLSpeedLimit"),
+    _session(None, "uTPRateLimited", TRUE),
+    _session("upload_slots_global", "MaxUploads"),
+    _session("upload_slots_per_torrent", "MaxUploadsPerTorrent"),
+    _session("max_connections_global", "MaxConnections"),
+    _session("max_connections_per_torrent", "MaxConnectionsPerTorrent"),
+    # Очередь
+    _session("max_active_downloads", "MaxActiveDownloads"),
+    _session("max_active_uploads", "MaxActiveUploads"),
+    _session("max_active_torrents", "MaxActiveTorrents"),
+    # Диск
+    _session("disk_cache_mb", "DiskCacheSize"),  # libtorrent 2.0 игнорирует, 1.2 — читает
+    _session("enable_os_cache", "UseOSCache", BOOL, until=(4, 4)),
+    _session("enable_os_cache", "DiskIOReadMode", OS_CACHE_MODE, since=(4, 4)),
+    _session("enable_os_cache", "DiskIOWriteMode", OS_CACHE_MODE, since=(4, 4)),
+    _session("pre_allocate_disk", "Preallocation", BOOL),
+    _session("async_io_threads", "AsyncIOThreadsCount"),
+    _session("coalesce_reads_writes", "CoalesceReadWrite", BOOL),
+    _session("file_pool_size", "FilePoolSize"),
+    _session("hashing_threads", "HashingThreadsCount", since=(4, 4)),
+    # Сеть
+    _session("protocol_mode", "BTProtocol", PROTOCOL),
+    _session("send_buffer_watermark_kb", "SendBufferWatermark"),
+    _session("send_buffer_low_watermark_kb", "SendBufferLowWatermark"),
+    _session("send_buffer_factor", "SendBufferWatermarkFactor"),
+    _session("socket_backlog_size", "SocketBacklogSize"),
+    _session("outgoing_connections_per_second", "ConnectionSpeed"),
+    _session("listening_port", "Port", PORT),
+    _session("network_interface", "Interface", TEXT),
+    _session("network_interface", "InterfaceName", TEXT),
+    # Приватность
+    _session("encryption_mode", "Encryption", ENCRYPTION),
+    _session("anonymous_mode", "AnonymousModeEnabled", BOOL),
+    _session("enable_dht", "DHTEnabled", BOOL),
+    _session("enable_pex", "PeXEnabled", BOOL),
+    _session("enable_lsd", "LSDEnabled", BOOL),
+)
+
+# Прежние секции тюнера; только для неизвестной версии
+LEGACY_KEYS: tuple[IniKey, ...] = (
+    IniKey("max_connections_global", "BitTorrent", "MaxConnections"),
+    IniKey("max_connections_per_torrent", "BitTorrent", "MaxConnectionsPerTorrent"),
+    IniKey("upload_slots_global", "BitTorrent", "MaxUploadSlots"),
+    IniKey("upload_slots_per_torrent", "BitTorrent", "MaxUploadSlotsPerTorrent"),
+    IniKey(None, "BitTorrent", "uTP_rate_limited", TRUE),
+    IniKey("global_upload_limit_kbps", "BitTorrent", "UploadLimit", KIB_TO_BYTES),
+    IniKey("global_download_limit_kbps", "BitTorrent", "DownloadLimit", KIB_TO_BYTES),
+    IniKey("listening_port", "Connection", "PortRangeMin", PORT),
+    IniKey("network_interface", "Connection", "Interface", TEXT),
+    IniKey("max_active_downloads", "Downloads", "MaxActiveDownloads"),
+    IniKey("max_active_uploads", "Downloads", "MaxActiveUploads"),
+    IniKey("max_active_torrents", "Downloads", "MaxActiveTorrents"),
+    IniKey("pre_allocate_disk", "Downloads", "PreAllocation", BOOL),
+    IniKey("disk_cache_mb", "Advanced", "DiskCache"),
+    IniKey("enable_os_cache", "Advanced", "EnableOSCache", BOOL),
+    IniKey("async_io_threads", "Advanced", "AsyncIOThreads"),
+    IniKey("file_pool_size", "Advanced", "FilePoolSize"),
+    IniKey("socket_backlog_size", "Advanced", "SocketBacklogSize"),
+    IniKey("outgoing_connections_per_second", "Advanced", "OutgoingConnectionsPerSecond"),
+)
+
+
+def keys_for(version: Optional[Version] = None) -> list[IniKey]:
+    """Ключи для версии qBittorrent; ``None`` — неизвестна: все раскладки."""
+    keys = [k for k in SESSION_KEYS if k.supported(version)]
+    if version is None:
+        keys.extend(LEGACY_KEYS)
+    return keys
@@ -0,0 +1,229 @@
+"""Точечная правка INI без перезаписи всего файла.
+
+``configparser`` при записи переупорядочивает ключи и теряет комментарии,
+а обрыв посреди записи оставляет усечённый конфиг — qBittorrent стартует
+с настройками по умолчанию и перепроверяет все раздачи. Здесь файл
+правится построчно: меняются только значения целевых ключей, остальные
+байты (порядок, комментарии, пустые строки, переводы строк, BOM)
+сохраняются. Недостающие ключи дописываются в конец своей секции,
+недостающие секции — в конец файла.
+
+Запись — через временный файл в том же каталоге: ``fsync``, атомарный
+``os.replace``, ``fsync`` каталога; права исходного файла сохраняются
+(новый — ``0644``). Пока qBittorrent держит lockfile,
+запись запрещена (``ConfigLockedError``), если не указан ``force``.
+"""
+
+import codecs
+import contextlib
+import os
+import re
+import stat
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+PathLike = Union[str, Path]
+Updates = dict[tuple[str, str], str]  # (секция, ключ) → значение
+
+SECTION_RE = re.compile(r"^\s*\[(.+)\]\s*$")
+LINE_RE = re.compile(r"[^\n]*\n|[^\n]+$")
+NEW_FILE_MODE = 0o644
+
+
+class ConfigLockedError(RuntimeError):
+    """qBittorrent запущен и держит lockfile конфига."""
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ПРАВКА ТЕКСТА
+# ═══════════════════════════════════════════════════════════════════════════════
+def _split_eol(line: str) -> tuple[str, str]:
+    body = line.rstrip("\r\n")
+    return body, line[len(body):]
+
+
+def patch_ini(text: str, updates: Updates) -> str:
+    """Вернуть ``text`` с новыми значениями ``updates``; прочие строки — как были."""
+    newline = "\r\n" if "\r\n" in text else "\n"
+    pending: dict[str, dict[str, str]] = {}
+    for (section, key), value in updates.items():
+        pending.setdefault(section, {})[key] = value
+
+    out: list[str] = []
+    found: set[tuple[str, str]] = set()
+    section_end: dict[str, int] = {}  # секция → позиция после её последнего ключа
+    section = None
+    for line in LINE_RE.findall(text):
+        body, eol = _split_eol(line)
+        match = SECTION_RE.match(body)
+        if match:
+            section = match.group(1)
+            out.append(line)
+            section_end[section] = len(out)
+            continue
+        stripped = body.lstrip()
+        if section is not None and "=" in body and not stripped.startswith((";", "#")):
+            eq = body.index("=")
+            key = body[:eq].strip()
+            if key in pending.get(section, {}):
+                rest = body[eq + 1:]
+                value_start = eq + 1 + len(rest) - len(rest.lstrip())
+                line = body[:value_start] + pending[section][key] + eol
+                found.add((section, key))
+            out.append(line)
+            section_end[section] = len(out)
+            continue
+        out.append(line)
+
+    def added_lines(section: str) -> list[str]:
+        return [
+            f"{key}={value}{newline}"
+            for key, value in pending[section].items()
+            if (section, key) not in found
+        ]
+
+    # Недостающие ключи — в конец существующих секций (с конца файла, чтобы
+    # позиции вставки не сдвигались)
+    for section, end in sorted(section_end.items(), key=lambda item: item[1], reverse=True):
+        lines = added_lines(section) if section in pending else []
+        if not lines:
+            continue
+        if not out[end - 1].endswith("\n"):
+            out[end - 1] += newline
+        out[end:end] = lines
+
+    # Недостающие секции — в конец файла
+    for section in pending:
+        if section in section_end:
+            continue
+        if out and not out[-1].endswith("\n"):
+            out[-1] += newline
+        if out and out[-1].strip():
+            out.append(newline)
+        out.append(f"[{section}]{newline}")
+        out.extend(added_lines(section))
+    return "".join(out)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LOCKFILE
+# ═══════════════════════════════════════════════════════════════════════════════
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # os.kill(pid, 0) на Windows завершает процесс — только запрос дескриптора
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_held(lock: Path) -> bool:
+    """Занят ли lockfile: блокировка fcntl/flock или живой PID в первой строке."""
+    if fcntl is not None:
+        try:
+            fd = os.open(lock, os.O_RDWR)
+        except OSError:
+            return True  # нет прав даже открыть — считаем занятым
+        try:
+            for probe in (fcntl.lockf, fcntl.flock):
+                try:
+                    probe(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return True
+                probe(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+    try:
+        first = lock.read_text(encoding="utf-8", errors="replace").split("\n", 1)[0].strip()
+    except OSError:
+        return True
+    return first.isdigit() and _pid_alive(int(first))
+
+
+def lock_files(config_path: PathLike) -> list[Path]:
+    """Где qBittorrent держит блокировки: lockfile профиля и QLockFile настроек."""
+    path = Path(config_path)
+    return [path.parent / "lockfile", path.with_name(path.name + ".lock")]
+
+
+def held_lock(config_path: PathLike) -> Optional[Path]:
+    """Занятый lockfile конфига или ``None``, если qBittorrent его не держит."""
+    for lock in lock_files(config_path):
+        if lock.exists() and _is_held(lock):
+            return lock
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ЗАПИСЬ
+# ═══════════════════════════════════════════════════════════════════════════════
+def _fsync_dir(directory: Path):
+    if os.name == "nt":
+        return  # каталог на Windows не открыть для fsync; os.replace там атомарен сам
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: PathLike, data: bytes):
+    """Записать файл целиком или не тронуть: временный файл, fsync, rename."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp создаёт файл с 0600 — иначе конфиг сменил бы права после rename
+        mode = stat.S_IMODE(path.stat().st_mode) if path.exists() else NEW_FILE_MODE
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    _fsync_dir(path.parent)
+
+
+def patch_file(path: PathLike, updates: Updates, force: bool = False) -> bool:
+    """Применить ``updates`` к файлу. ``False`` — значения уже были такими.
+
+    Бросает ``ConfigLockedError``, если qBittorrent держит lockfile
+    (``force=True`` — писать всё равно).
+    """
+    path = Path(path)
+    if not force:
+        lock = held_lock(path)
+        if lock is not None:
+            raise ConfigLockedError(f"{lock} is held by a running qBittorrent")
+
+    raw = path.read_bytes() if path.exists() else b""
+    bom = codecs.BOM_UTF8 if raw.startswith(codecs.BOM_UTF8) else b""
+    text = raw[len(bom):].decode("utf-8")
+    patched = bom + patch_ini(text, updates).encode("utf-8")
+    if patched == raw and path.exists():
+        return False
+    atomic_write(path, patched)
+    return True
@@ -0,0 +1,135 @@
+"""Размер библиотеки торрентов: число раздач и суммарный объём.
+
+Два источника:
+
+- живой qBittorrent — ``/api/v2/torrents/info`` через ``BenchmarkManager``;
+- каталог ``BT_backup`` (qBittorrent может быть остановлен): одна раздача
+  на ``*.fastresume``, размер — из соседнего ``<hash>.torrent``.
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from .benchmark_manager import BenchmarkManager
+
+
+GB = 1024 ** 3
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BENCODE
+# ═══════════════════════════════════════════════════════════════════════════════
+def _decode(data: bytes, i: int) -> tuple[Any, int]:
+    c = data[i:i + 1]
+    if c == b"i":
+        end = data.index(b"e", i)
+        return int(data[i + 1:end]), end + 1
+    if c == b"l":
+        i += 1
+        items = []
+        while data[i:i + 1] != b"e":
+            item, i = _decode(data, i)
+            items.append(item)
+        return items, i + 1
+    if c == b"d":
+        i += 1
+        result = {}
+        while data[i:i + 1] != b"e":
+            key, i = _decode(data, i)
+            result[key], i = _decode(data, i)
+        return result, i + 1
+    if c.isdigit():
+        colon = data.index(b":", i)
+        start = colon + 1
+        end = start + int(data[i:colon])
+        if end > len(data):
+            raise ValueError("Truncated bencode string")
+        return data[start:end], end
+    raise ValueError(f"Invalid bencode at offset {i}")
+
+
+def bdecode(data: bytes) -> Any:
+    """Разобрать bencode (.torrent / .fastresume)."""
+    value, end = _decode(data, 0)
+    if end != len(data):
+        raise ValueError("Trailing data after bencode value")
+    return value
+
+
+def _file_tree_size(tree: dict) -> int:
+    total = 0
+    for name, node in tree.items():
+        if name == b"" and isinstance(node, dict):
+            total += node.get(b"length", 0)
+        elif isinstance(node, dict):
+            total += _file_tree_size(node)
+    return total
+
+
+def torrent_size(meta: dict) -> int:
+    """Полный размер раздачи по метаданным (v1 и v2), байт."""
+    info = meta.get(b"info", meta)
+    if b"length" in info:
+        return info[b"length"]
+    if b"files" in info:
+        return sum(f.get(b"length", 0) for f in info[b"files"])
+    if b"file tree" in info:
+        return _file_tree_size(info[b"file tree"])
+    return 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ИСТОЧНИКИ
+# ═══════════════════════════════════════════════════════════════════════════════
+def default_bt_backup_dirs() -> list[Path]:
+    """Стандартные расположения ``BT_backup`` для текущей ОС."""
+    home = Path.home()
+    if sys.platform == "win32":
+        local = Path(os.environ.get("LOCALAPPDATA", home / "AppData" / "Local"))
+        return [local / "qBittorrent" / "BT_backup"]
+    if sys.platform == "darwin":
+        return [home / "Library" / "Application Support" / "qBittorrent" / "BT_backup"]
+    data = Path(os.environ.get("XDG_DATA_HOME", home / ".local" / "share"))
+    return [
+        data / "qBittorrent" / "BT_backup",
+        data / "data" / "qBittorrent" / "BT_backup",  # qBittorrent < 4.3
+        home / ".var" / "app" / "org.qbittorrent.qBittorrent" / "data" / "qBittorrent" / "BT_backup",
+    ]
+
+
+def scan_bt_backup(directory: Union[str, Path]) -> tuple[int, float]:
+    """Число раздач и объём библиотеки (ГБ) по каталогу ``BT_backup``.
+
+    Раздачи без ``.torrent`` (magnet без метаданных) и битые файлы
+    учитываются в количестве, но не в объёме.
+    """
+    directory = Path(directory)
+    count = 0
+    total = 0
+    for resume in directory.glob("*.fastresume"):
+        count += 1
+        torrent = resume.with_suffix(".torrent")
+        try:
+            total += torrent_size(bdecode(torrent.read_bytes()))
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+    return count, round(total / GB, 1)
+
+
+def find_bt_backup() -> Optional[Path]:
+    """Первый существующий ``BT_backup`` из стандартных расположений."""
+    for path in default_bt_backup_dirs():
+        if path.is_dir():
+            return path
+    return None
+
+
+def library_from_webapi(manager: BenchmarkManager) -> Optional[tuple[int, float]]:
+    """Число раздач и объём библиотеки (ГБ) из живого qBittorrent."""
+    torrents = manager.get_torrents()
+    if torrents is None:
+        return None
+    total = sum(t.get("total_size", t.get("size", 0)) or 0 for t in torrents)
+    return len(torrents), round(total / GB, 1)
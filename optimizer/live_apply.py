@@ -0,0 +1,180 @@
+"""Применение настроек на лету через WebAPI — без перезапуска qBittorrent.
+
+Читаем ``app/preferences``, считаем минимальную разницу с
+``OptimizedSettings``, отправляем только изменившиеся ключи одним
+вызовом ``app/setPreferences`` и проверяем результат повторным чтением.
+
+Набор ключей зависит от версии: ``disk_cache``/``enable_os_cache`` есть
+только в сборках с libtorrent 1.2, ``disk_io_read_mode`` и
+``hashing_threads`` — в 4.4+. Ключи, которых сервер не вернул, не
+отправляются и попадают в ``unsupported``.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from .benchmark_manager import BenchmarkManager
+from .ini_keys import listening_port
+from .models import EncryptionMode, OptimizedSettings, ProtocolMode
+
+# app/preferences: bittorrent_protocol и encryption — числовые коды
+PROTOCOL_PREFS = {
+    ProtocolMode.UTP_TCP: 0,
+    ProtocolMode.TCP_ONLY: 1,
+    ProtocolMode.UTP_ONLY: 2,
+}
+ENCRYPTION_PREFS = {
+    EncryptionMode.PREFER: 0,
+    EncryptionMode.REQUIRE: 1,
+    EncryptionMode.DISABLED: 2,
+}
+# 0 и -1 у лимитов скорости означают одно и то же — «без ограничений»
+SPEED_LIMIT_KEYS = ("dl_limit", "up_limit")
+# disk_io_read_mode / disk_io_write_mode (4.4+): 0 — без кэша ОС, 1 — с кэшем
+DISK_IO_OS_CACHE = 1
+DISK_IO_NO_OS_CACHE = 0
+
+
+def settings_to_preferences(settings: OptimizedSettings) -> dict[str, Any]:
+    """Все рассчитанные поля в ключах ``app/preferences``.
+
+    ``super_seeding`` — свойство раздачи, а не глобальная настройка, поэтому
+    здесь не участвует. Ключи обеих ветвей libtorrent перечислены вместе —
+    отбор по версии делает ``preference_diff``.
+    """
+    os_cache = DISK_IO_OS_CACHE if settings.enable_os_cache else DISK_IO_NO_OS_CACHE
+    prefs = {
+        # Скорость (КБ/с → байт/с)
+        "up_limit": settings.global_upload_limit_kbps * 1024,
+        "dl_limit": settings.global_download_limit_kbps * 1024,
+        "limit_utp_rate": True,
+        # Соединения
+        "max_connec": settings.max_connections_global,
+        "max_connec_per_torrent": settings.max_connections_per_torrent,
+        "max_uploads": settings.upload_slots_global,
+        "max_uploads_per_torrent": settings.upload_slots_per_torrent,
+        # Очередь
+        "max_active_downloads": settings.max_active_downloads,
+        "max_active_uploads": settings.max_active_uploads,
+        "max_active_torrents": settings.max_active_torrents,
+        # Диск
+        "disk_cache": settings.disk_cache_mb,
+        "enable_os_cache": settings.enable_os_cache,
+        "disk_io_read_mode": os_cache,
+        "disk_io_write_mode": os_cache,
+        "preallocate_all": settings.pre_allocate_disk,
+        "async_io_threads": settings.async_io_threads,
+        "enable_coalesce_read_write": settings.coalesce_reads_writes,
+        "file_pool_size": settings.file_pool_size,
+        "hashing_threads": settings.hashing_threads,
+        # Сеть
+        "bittorrent_protocol": PROTOCOL_PREFS[settings.protocol_mode],
+        "send_buffer_watermark": settings.send_buffer_watermark_kb,
+        "send_buffer_low_watermark": settings.send_buffer_low_watermark_kb,
+        "send_buffer_watermark_factor": settings.send_buffer_factor,
+        "socket_backlog_size": settings.socket_backlog_size,
+        "connection_speed": settings.outgoing_connections_per_second,
+        # Приватность
+        "encryption": ENCRYPTION_PREFS[settings.encryption_mode],
+        "anonymous_mode": settings.anonymous_mode,
+        "dht": settings.enable_dht,
+        "pex": settings.enable_pex,
+        "lsd": settings.enable_lsd,
+    }
+    port = listening_port(settings.listening_port)
+    if port is not None:
+        prefs["listen_port"] = port
+    if settings.network_interface:
+        prefs["current_network_interface"] = settings.network_interface
+    return prefs
+
+
+def same_preference(key: str, current: Any, desired: Any) -> bool:
+    """Совпадает ли текущее значение с желаемым.
+
+    WebAPI отдаёт флаги то как ``true``, то как 0/1, а числа — иногда строкой.
+    """
+    try:
+        if isinstance(desired, bool) or isinstance(current, bool):
+            return bool(current) == bool(desired)
+        if key in SPEED_LIMIT_KEYS:
+            return max(0, int(float(current))) == max(0, int(float(desired)))
+        if isinstance(desired, (int, float)):
+            return float(current) == float(desired)
+    except (TypeError, ValueError):
+        return False
+    return str(current) == str(desired)
+
+
+def preference_diff(current: dict[str, Any], desired: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    """Минимальная разница: ``(изменения, ключи, которых нет у сервера)``."""
+    changes = {}
+    unsupported = []
+    for key, value in desired.items():
+        if key not in current:
+            unsupported.append(key)
+        elif not same_preference(key, current[key], value):
+            changes[key] = value
+    return changes, unsupported
+
+
+@dataclass
+class LiveApplyResult:
+    """Итог применения через WebAPI."""
+    changed: dict[str, Any] = field(default_factory=dict)   # ключ → новое значение
+    previous: dict[str, Any] = field(default_factory=dict)  # ключ → значение до изменения
+    unchanged: list[str] = field(default_factory=list)
+    unsupported: list[str] = field(default_factory=list)
+    mismatched: dict[str, tuple[Any, Any]] = field(default_factory=dict)  # ключ → (ожидалось, прочитано)
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and not self.mismatched
+
+    def summary(self) -> str:
+        if self.error:
+            return f"Ошибка: {self.error}"
+        parts = [f"изменено {len(self.changed)}", f"без изменений {len(self.unchanged)}"]
+        if self.unsupported:
+            parts.append(f"не поддерживается версией: {', '.join(self.unsupported)}")
+        if self.mismatched:
+            parts.append(
+                "не применилось: "
+                + ", ".join(f"{k} ({want} → {got})" for k, (want, got) in self.mismatched.items())
+            )
+        return "; ".join(parts)
+
+
+def apply_live(manager: BenchmarkManager, settings: OptimizedSettings, dry_run: bool = False) -> LiveApplyResult:
+    """Применить настройки одним ``setPreferences`` и проверить чтением.
+
+    ``dry_run`` — только посчитать разницу, ничего не отправляя.
+    """
+    current = manager.get_preferences()
+    if current is None:
+        return LiveApplyResult(error="cannot read app/preferences")
+
+    desired = settings_to_preferences(settings)
+    changes, unsupported = preference_diff(current, desired)
+    result = LiveApplyResult(
+        changed=changes,
+        previous={key: current[key] for key in changes},
+        unchanged=[key for key in desired if key not in changes and key not in unsupported],
+        unsupported=unsupported,
+    )
+    if dry_run or not changes:
+        return result
+
+    if not manager.set_preferences(changes):
+        result.error = "setPreferences request failed"
+        return result
+
+    applied = manager.get_preferences()
+    if applied is None:
+        result.error = "cannot read back app/preferences"
+        return result
+    for key, value in changes.items():
+        if not same_preference(key, applied.get(key), value):
+            result.mismatched[key] = (value, applied.get(key))
+    return result
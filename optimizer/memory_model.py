@@ -0,0 +1,134 @@
+"""Модель потребления памяти qBittorrent и подгонка под бюджет RAM.
+
+Резидентный размер оценивается по слагаемым:
+
+- базовый процесс (Qt + libtorrent);
+- дисковый кэш (``-1`` — авто, около 1/8 RAM);
+- буферы отправки: на каждый слот отдачи — секундная доля скорости
+  пира × ``send_buffer_factor``, в пределах [low watermark, watermark];
+- состояние соединений (сокет, буфер приёма, учёт);
+- метаданные раздач: служебная часть + SHA-1 каждого куска;
+- piece picker активных загрузок.
+
+Если сумма превышает долю RAM (``HardwareSettings.ram_share``),
+настройки снижаются по порядку: кэш → соединения → буферы отправки.
+"""
+
+import math
+
+from .models import HardwareSettings, UsageSettings, OptimizedSettings
+
+
+BASE_MB = 80.0
+PEER_CONNECTION_KB = 48
+TORRENT_OVERHEAD_KB = 64
+PIECE_HASH_BYTES = 20
+AVG_PIECE_BYTES = 4 * 1024 * 1024
+PIECE_PICKER_KB = 512  # на активную загрузку
+AUTO_CACHE_DIVISOR = 8  # disk_cache = -1 → RAM / 8
+
+# Нижние пределы при снижении
+DISK_CACHE_FLOOR_MB = 32
+CONNECTIONS_FLOOR = 100
+SEND_BUFFER_FLOOR_KB = 16
+
+# Порядок слагаемых в бюджете (и в отчёте)
+COMPONENTS = ("base", "disk_cache", "send_buffers", "connections", "torrents", "piece_picker")
+COMPONENT_LABELS = {
+    "base": "Процесс",
+    "disk_cache": "Дисковый кэш",
+    "send_buffers": "Буферы отправки",
+    "connections": "Соединения",
+    "torrents": "Метаданные раздач",
+    "piece_picker": "Piece picker",
+}
+
+
+def effective_cache_mb(disk_cache_mb: int, ram_gb: int) -> float:
+    """Фактический размер кэша, МБ (-1 — авто)."""
+    if disk_cache_mb < 0:
+        return ram_gb * 1024 / AUTO_CACHE_DIVISOR
+    return float(disk_cache_mb)
+
+
+def estimate_memory(
+    settings: OptimizedSettings,
+    hardware: HardwareSettings,
+    usage: UsageSettings,
+) -> dict[str, float]:
+    """Оценка резидентной памяти по слагаемым, МБ."""
+    per_peer_rate_kb = settings.global_upload_limit_kbps / settings.upload_slots_global
+    per_peer_kb = min(
+        settings.send_buffer_watermark_kb,
+        max(settings.send_buffer_low_watermark_kb, per_peer_rate_kb * settings.send_buffer_factor / 100),
+    )
+    torrents = usage.torrent_count if usage.torrent_count > 0 else settings.max_active_torrents
+    return {
+        "base": BASE_MB,
+        "disk_cache": effective_cache_mb(settings.disk_cache_mb, hardware.ram_gb),
+        "send_buffers": settings.upload_slots_global * per_peer_kb / 1024,
+        "connections": settings.max_connections_global * PEER_CONNECTION_KB / 1024,
+        "torrents": (
+            torrents * TORRENT_OVERHEAD_KB / 1024
+            + usage.library_size_gb * 1024 ** 3 / AVG_PIECE_BYTES * PIECE_HASH_BYTES / 1024 ** 2
+        ),
+        "piece_picker": settings.max_active_downloads * PIECE_PICKER_KB / 1024,
+    }
+
+
+def total_mb(parts: dict[str, float]) -> float:
+    total = 0.0
+    for name in COMPONENTS:
+        total += parts[name]
+    return total
+
+
+def fit_memory_budget(
+    settings: OptimizedSettings,
+    hardware: HardwareSettings,
+    usage: UsageSettings,
+) -> list[str]:
+    """Снизить настройки до доли RAM; заполняет ``settings.memory_budget``.
+
+    Возвращает список изменённых параметров (пустой, если всё помещается).
+    """
+    limit = hardware.ram_gb * 1024 * hardware.ram_share
+    parts = estimate_memory(settings, hardware, usage)
+    excess = total_mb(parts) - limit
+    changes: list[str] = []
+
+    # 1. Дисковый кэш (0 — ZFS ARC, не трогаем)
+    if excess > 0 and settings.disk_cache_mb != 0:
+        cache = parts["disk_cache"]
+        new_cache = max(DISK_CACHE_FLOOR_MB, math.floor(cache - excess))
+        if new_cache < cache:
+            settings.disk_cache_mb = new_cache
+            excess -= cache - new_cache
+            changes.append(f"disk cache → {new_cache} МБ")
+
+    # 2. Соединения
+    if excess > 0:
+        conns = settings.max_connections_global
+        new_conns = max(min(conns, CONNECTIONS_FLOOR), conns - math.ceil(excess * 1024 / PEER_CONNECTION_KB))
+        if new_conns < conns:
+            settings.max_connections_global = new_conns
+            settings.max_connections_per_torrent = min(settings.max_connections_per_torrent, new_conns)
+            excess -= (conns - new_conns) * PEER_CONNECTION_KB / 1024
+            changes.append(f"соединения → {new_conns}")
+
+    # 3. Буферы отправки
+    if excess > 0:
+        target_kb = (parts["send_buffers"] - excess) * 1024 / settings.upload_slots_global
+        new_watermark = max(SEND_BUFFER_FLOOR_KB, math.floor(target_kb))
+        if new_watermark < settings.send_buffer_watermark_kb:
+            settings.send_buffer_watermark_kb = new_watermark
+            settings.send_buffer_low_watermark_kb = min(settings.send_buffer_low_watermark_kb, new_watermark)
+            changes.append(f"send buffer → {new_watermark} КБ")
+
+    parts = estimate_memory(settings, hardware, usage)
+    settings.memory_budget = {
+        **{name: round(parts[name], 1) for name in COMPONENTS},
+        "total": round(total_mb(parts), 1),
+        "limit": round(limit, 1),
+    }
+    return changes
@@ -2,6 +2,7 @@
 
 from dataclasses import dataclass, field
 from enum import Enum
+from typing import Optional
 
 
 class ConnectionType(Enum):
@@ -55,7 +56,9 @@ class EncryptionMode(Enum):
     DISABLED = "Disabled"
 
 
-@dataclass
+# Входные модели неизменяемы и хешируемы — их можно использовать
+# как ключ кэша (см. calculator.CalculatorCache).
+@dataclass(frozen=True, slots=True)
 class NetworkSettings:
     """Настройки сети."""
     download_speed_mbps: float
@@ -64,9 +67,28 @@ class NetworkSettings:
     use_vpn: bool
     vpn_interface: str = ""
     isp_throttling: bool = False
+    port_seed: str = ""  # зерно для порта обхода DPI (например, имя хоста)
+    rtt_ms: Optional[float] = None  # измеренный RTT под нагрузкой; None — по таблице
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class DiskProfile:
+    """Замер накопителя на каталоге загрузок (см. disk_benchmark).
+
+    Кривые IOPS и задержек — по одной точке на глубину очереди
+    из ``queue_depths``; случайные операции блоками ``block_size_kb``.
+    """
+    seq_write_mb_s: float
+    queue_depths: tuple[int, ...]
+    read_iops: tuple[float, ...]
+    write_iops: tuple[float, ...]
+    read_latency_ms: tuple[float, ...]
+    write_latency_ms: tuple[float, ...]
+    block_size_kb: int = 16
+    direct_io: bool = True  # False — замер шёл через кэш ОС
+
+
+@dataclass(frozen=True, slots=True)
 class HardwareSettings:
     """Характеристики железа."""
     storage_type: StorageType
@@ -74,14 +96,18 @@ class HardwareSettings:
     cpu_cores: int
     is_hybrid_cpu: bool = False
     p_cores: int = 0
+    disk: Optional[DiskProfile] = None  # замер диска; None — по типу накопителя
+    ram_share: float = 0.5  # доля RAM, которую может занять qBittorrent
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class UsageSettings:
     """Сценарий использования."""
     tracker_type: TrackerType
     user_role: UserRole = UserRole.LEECHER
     environment: EnvironmentProfile = EnvironmentProfile.SYSTEM
+    torrent_count: int = 0          # раздач в клиенте; 0 — неизвестно
+    library_size_gb: float = 0.0    # суммарный объём раздач
 
 
 @dataclass
@@ -126,7 +152,10 @@ class OptimizedSettings:
     
     # Advanced
     super_seeding: bool
+    file_pool_size: int = 100  # открытых файлов (libtorrent file_pool_size)
+    hashing_threads: int = 1  # потоков проверки хешей (qBittorrent 4.4+)
     
     # Meta
     warnings: list[str] = field(default_factory=list)
     explanations: dict[str, str] = field(default_factory=dict)
+    memory_budget: dict[str, float] = field(default_factory=dict)  # МБ, см. memory_model
@@ -3,9 +3,11 @@
 Использует HTTP запросы для оценки пропускной способности.
 """
 
+import socket
 import time
 import requests
-from typing import Tuple
+from typing import Optional, Tuple
+from urllib.parse import urlparse
 
 class NetworkTester:
     """Оценка скорости интернет-соединения."""
@@ -114,6 +116,75 @@ class NetworkTester:
             return round(mbps, 1)
         return 0.0
 
+    @staticmethod
+    def _tcp_rtt_ms(address: tuple, timeout: float = 2) -> Optional[float]:
+        """Один замер RTT: время TCP-рукопожатия (SYN → SYN/ACK)."""
+        start = time.perf_counter()
+        try:
+            with socket.create_connection(address, timeout=timeout):
+                pass
+        except OSError:
+            return None
+        return (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _summarize_rtt(values: list) -> dict:
+        """Распределение RTT: min / p50 / p90 / max и джиттер."""
+        values = sorted(v for v in values if v is not None)
+        if not values:
+            return {"samples": 0}
+
+        def pct(p: float) -> float:
+            return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+        return {
+            "samples": len(values),
+            "min": round(values[0], 1),
+            "p50": round(pct(0.5), 1),
+            "p90": round(pct(0.9), 1),
+            "max": round(values[-1], 1),
+            "jitter": round(pct(0.9) - pct(0.5), 1),
+        }
+
+    @staticmethod
+    def measure_rtt(url: str, samples: int = 10, interval: float = 0.1) -> dict:
+        """Замерить распределение RTT до сервера."""
+        parsed = urlparse(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        try:
+            # Резолвим один раз, чтобы DNS не попадал в замер
+            ip = socket.getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM)[0][4][0]
+        except (OSError, IndexError):
+            return {"samples": 0}
+
+        values = []
+        for _ in range(samples):
+            values.append(NetworkTester._tcp_rtt_ms((ip, port)))
+            time.sleep(interval)
+        return NetworkTester._summarize_rtt(values)
+
+    @staticmethod
+    def test_rtt_ms(samples: int = 10) -> dict:
+        """RTT в простое и под нагрузкой (во время параллельной загрузки).
+
+        Для расчёта буферов лучше брать ``loaded.p50`` — задержку,
+        которую видят пиры во время раздачи.
+        """
+        server = NetworkTester.get_best_server()
+        idle = NetworkTester.measure_rtt(server["url"], samples)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        num_threads = 4
+        chunk_size = 20 * 1024 * 1024 # 20MB
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = [executor.submit(NetworkTester._download_chunk, server["url"], chunk_size) for _ in range(num_threads)]
+            loaded = NetworkTester.measure_rtt(server["url"], samples)
+            for f in futures:
+                f.result()
+
+        return {"idle": idle, "loaded": loaded, "server": server["name"]}
+
     @staticmethod
     def run_full_test() -> Tuple[float, float, str]:
         """Запустить полный тест."""
@@ -0,0 +1,153 @@
+"""Разделение одной машины между несколькими экземплярами qBittorrent.
+
+Одна сессия libtorrent упирается в свой сетевой поток, поэтому на
+10 Гбит/с запускают N экземпляров qbittorrent-nox. Каждый экземпляр
+считается как «1/N машины»: скорость, RAM, ядра и библиотека делятся
+на N, настройки рассчитываются обычным калькулятором, а порты
+прослушивания идут непрерывным блоком без пересечений.
+
+Часть значений калькулятор берёт из уровней среды, а не из ресурсов
+(SEEDBOX получает одни и те же лимиты при любой доле машины), поэтому
+общие лимиты — соединения, слоты отдачи, дисковый кэш, очередь —
+дополнительно ограничиваются 1/N значения для машины целиком.
+"""
+
+import math
+from dataclasses import replace
+from pathlib import Path
+from typing import Union
+
+from .models import NetworkSettings, HardwareSettings, UsageSettings, OptimizedSettings
+from .memory_model import fit_memory_budget
+from .calculator import (
+    PORT_RANGE_MAX,
+    calculate_optimal_settings,
+    port_seed_for,
+    stable_port,
+)
+
+
+def instance_profile(
+    network: NetworkSettings,
+    hardware: HardwareSettings,
+    usage: UsageSettings,
+    instances: int,
+) -> tuple[NetworkSettings, HardwareSettings, UsageSettings]:
+    """Профиль одного экземпляра — доля 1/N ресурсов машины."""
+    disk = hardware.disk
+    if disk is not None:
+        # Диск общий: каждому экземпляру — 1/N его IOPS (форма кривой та же)
+        disk = replace(
+            disk,
+            read_iops=tuple(v / instances for v in disk.read_iops),
+            write_iops=tuple(v / instances for v in disk.write_iops),
+        )
+    p_cores = hardware.p_cores // instances
+    return (
+        replace(
+            network,
+            download_speed_mbps=network.download_speed_mbps / instances,
+            upload_speed_mbps=network.upload_speed_mbps / instances,
+        ),
+        replace(
+            hardware,
+            ram_gb=max(1, hardware.ram_gb // instances),
+            cpu_cores=max(1, hardware.cpu_cores // instances),
+            is_hybrid_cpu=hardware.is_hybrid_cpu and p_cores > 0,
+            p_cores=p_cores,
+            disk=disk,
+        ),
+        replace(
+            usage,
+            torrent_count=usage.torrent_count // instances,
+            library_size_gb=usage.library_size_gb / instances,
+        ),
+    )
+
+
+# Лимиты, которые экземпляры делят между собой: поле → ключ пояснения
+SHARED_LIMITS = {
+    "max_connections_global": "max_connections",
+    "upload_slots_global": "upload_slots",
+    "disk_cache_mb": "disk_cache",
+    "max_active_downloads": "queue",
+    "max_active_uploads": "queue",
+    "max_active_torrents": "queue",
+}
+
+
+def split_shared_limits(settings: OptimizedSettings, single: OptimizedSettings, instances: int):
+    """Ограничить общие лимиты экземпляра долей 1/N от ``single`` (вся машина)."""
+    for name, key in SHARED_LIMITS.items():
+        total = getattr(single, name)
+        if total <= 0:
+            continue  # 0/-1 — отключено или «авто», делить нечего
+        share = max(1, total // instances)
+        value = getattr(settings, name)
+        if value == 0 or 0 < value <= share:
+            continue
+        setattr(settings, name, share)
+        settings.explanations[key] = (
+            f"{settings.explanations.get(key, '')} {name}: {total} на машину ÷ {instances} = {share}."
+        ).strip()
+    # Производные лимиты не больше общих
+    settings.max_active_torrents = min(
+        settings.max_active_torrents, settings.max_active_downloads + settings.max_active_uploads
+    )
+    settings.max_connections_per_torrent = min(
+        settings.max_connections_per_torrent, settings.max_connections_global
+    )
+    settings.upload_slots_per_torrent = min(settings.upload_slots_per_torrent, settings.upload_slots_global)
+
+
+def instance_ports(network: NetworkSettings, instances: int) -> list[int]:
+    """Непрерывный блок портов из динамического диапазона."""
+    base = min(stable_port(port_seed_for(network)), PORT_RANGE_MAX - instances + 1)
+    return [base + i for i in range(instances)]
+
+
+def partition_settings(
+    network: NetworkSettings,
+    hardware: HardwareSettings,
+    usage: UsageSettings,
+    instances: int,
+) -> list[OptimizedSettings]:
+    """Рассчитать N согласованных наборов настроек для одной машины."""
+    if instances < 1:
+        raise ValueError(f"instances must be >= 1, got {instances}")
+
+    n, h, u = instance_profile(network, hardware, usage, instances)
+    base = calculate_optimal_settings(n, h, u)
+    if hardware.disk is not None and instances > 1:
+        # Колено кривой IOPS — на весь диск, делим потоки между экземплярами
+        base.async_io_threads = max(1, math.ceil(base.async_io_threads / instances))
+        base.explanations["async_io"] += f" ÷ {instances} экземпляров = {base.async_io_threads}."
+    if instances > 1:
+        split_shared_limits(base, calculate_optimal_settings(network, hardware, usage), instances)
+        fit_memory_budget(base, h, u)  # лимиты только снижались — оценка памяти по новым
+
+    result = []
+    for i, port in enumerate(instance_ports(network, instances)):
+        explanations = dict(base.explanations)
+        explanations["port"] = f"Порт экземпляра {i + 1} из {instances} (блок без пересечений)."
+        explanations["instance"] = (
+            f"Экземпляр {i + 1}/{instances}: {n.download_speed_mbps:g}/{n.upload_speed_mbps:g} Мбит/с, "
+            f"{h.ram_gb} ГБ RAM, {h.cpu_cores} ядер, {u.torrent_count} раздач."
+        )
+        result.append(replace(
+            base,
+            listening_port=f"Instance {i + 1} ({port})",
+            warnings=list(base.warnings),
+            explanations=explanations,
+            memory_budget=dict(base.memory_budget),
+        ))
+    return result
+
+
+def instance_config_paths(profile_root: Union[str, Path], instances: int) -> list[Path]:
+    """Пути конфигов для ``qbittorrent-nox --profile=<root>/instance-<i>``."""
+    root = Path(profile_root)
+    return [
+        root / f"instance-{i + 1}" / "qBittorrent" / "config" / "qBittorrent.conf"
+        for i in range(instances)
+    ]
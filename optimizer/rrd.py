@@ -0,0 +1,260 @@
+"""Кольцевое хранилище показателей для круглосуточного мониторинга (RRD).
+
+Файл фиксированного размера на экземпляр qBittorrent, три архива:
+
+- 1 сек × 1 час — сырые образцы;
+- 1 мин × 7 дней;
+- 1 ч × 365 дней.
+
+В каждой ячейке архива — начало интервала, число образцов и по каждому
+полю min/avg/max/last. Образец сразу сворачивается во все архивы (без
+отдельного этапа консолидации), запись — O(1). Ячейка из прошлого круга
+узнаётся по несовпадающему времени начала и при чтении пропускается,
+поэтому пропуски опроса не требуют очистки.
+
+Файл отображён в память (``mmap``), данные лежат по столбцам: чтение
+окна — срез ``memoryview`` без разбора, целиком история не загружается.
+"""
+
+import math
+import mmap
+import re
+import struct
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from .timeseries import FIELDS
+
+MAGIC = b"QFRRD001"
+# (шаг, сек; число ячеек)
+ARCHIVES = ((1, 3600), (60, 7 * 24 * 60), (3600, 365 * 24))
+CONSOLIDATIONS = ("min", "avg", "max", "last")
+
+HEADER_SIZE = 4096
+_HEADER = struct.Struct("<8sIId")  # magic, число архивов, число полей, последнее обновление
+_ARCHIVE = struct.Struct("<II")
+_FIELD_NAME = 32
+
+
+def archive_name(host: str) -> str:
+    """Имя файла архива для адреса Web UI: ``http://seed:8080`` → ``seed_8080.rrd``."""
+    name = re.sub(r"^[a-z]+://", "", host.strip().lower())
+    return re.sub(r"[^a-z0-9.-]+", "_", name).strip("_") + ".rrd"
+
+
+class RoundRobinStore:
+    """RRD-файл одного экземпляра. Запись и чтение — под блокировкой."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        fields: tuple[str, ...] = FIELDS,
+        archives: tuple[tuple[int, int], ...] = ARCHIVES,
+    ):
+        self.path = Path(path)
+        self.fields = tuple(fields)
+        self.archives = tuple(sorted(archives))
+        # Столбцы архива: начало ячейки, число образцов, затем поле × консолидация
+        self._columns = 2 + len(self.fields) * len(CONSOLIDATIONS)
+        self._base = []
+        offset = 0
+        for _, rows in self.archives:
+            self._base.append(offset)
+            offset += self._columns * rows
+        size = HEADER_SIZE + offset * 8
+        if _HEADER.size + len(self.archives) * _ARCHIVE.size + len(self.fields) * _FIELD_NAME > HEADER_SIZE:
+            raise ValueError("Too many archives or fields for the RRD header")
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "r+b" if not fresh else "w+b")
+        try:
+            if fresh:
+                self._file.truncate(size)
+            elif self.path.stat().st_size != size:
+                raise ValueError(f"{self.path}: file size does not match the RRD layout")
+            self._mm = mmap.mmap(self._file.fileno(), size)
+        except Exception:
+            self._file.close()
+            raise
+        self._data = memoryview(self._mm)[HEADER_SIZE:].cast("d")
+        if fresh:
+            self._write_header()
+        else:
+            self._check_header()
+
+    def _write_header(self):
+        self._data[:] = array("d", [math.nan]) * len(self._data)
+        header = bytearray(HEADER_SIZE)
+        _HEADER.pack_into(header, 0, MAGIC, len(self.archives), len(self.fields), 0.0)
+        pos = _HEADER.size
+        for step, rows in self.archives:
+            _ARCHIVE.pack_into(header, pos, step, rows)
+            pos += _ARCHIVE.size
+        for name in self.fields:
+            header[pos:pos + _FIELD_NAME] = name.encode().ljust(_FIELD_NAME, b"\0")
+            pos += _FIELD_NAME
+        self._mm[:HEADER_SIZE] = bytes(header)
+
+    def _check_header(self):
+        magic, n_archives, n_fields, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not an RRD file")
+        pos = _HEADER.size
+        archives = []
+        for _ in range(n_archives):
+            archives.append(_ARCHIVE.unpack_from(self._mm, pos))
+            pos += _ARCHIVE.size
+        fields = []
+        for _ in range(n_fields):
+            fields.append(bytes(self._mm[pos:pos + _FIELD_NAME]).rstrip(b"\0").decode())
+            pos += _FIELD_NAME
+        if tuple(archives) != self.archives or tuple(fields) != self.fields:
+            raise ValueError(f"{self.path}: RRD layout differs (archives {archives}, fields {fields})")
+
+    def close(self):
+        with self._lock:
+            if self._mm.closed:
+                return
+            self._data.release()
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+
+    def flush(self):
+        with self._lock:
+            self._mm.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Запись
+    # ─────────────────────────────────────────────────────────────────────────
+    def _column(self, archive: int, column: int) -> int:
+        """Смещение столбца в ``_data`` (в элементах double)."""
+        return self._base[archive] + column * self.archives[archive][1]
+
+    def _field_column(self, field: int, consolidation: int) -> int:
+        return 2 + field * len(CONSOLIDATIONS) + consolidation
+
+    @property
+    def last_update(self) -> float:
+        return _HEADER.unpack_from(self._mm, 0)[3]
+
+    def update(self, sample: dict[str, Any], timestamp: Optional[float] = None):
+        """Свернуть образец во все архивы; O(число архивов × полей)."""
+        if timestamp is None:
+            timestamp = sample.get("timestamp") or time.time()
+        values = [float(sample.get(name, 0) or 0) for name in self.fields]
+        data = self._data
+        with self._lock:
+            if self._mm.closed:
+                return
+            for a, (step, rows) in enumerate(self.archives):
+                slot = timestamp // step * step
+                i = int(slot // step) % rows
+                ts_at = self._column(a, 0) + i
+                count_at = self._column(a, 1) + i
+                if data[ts_at] != slot:
+                    # Ячейка прошлого круга (или новая) — начинаем заново
+                    data[ts_at] = slot
+                    data[count_at] = 0.0
+                n = data[count_at] + 1
+                data[count_at] = n
+                for f, x in enumerate(values):
+                    lo, avg, hi, last = (self._column(a, self._field_column(f, c)) + i for c in range(4))
+                    if n == 1:
+                        data[lo] = data[avg] = data[hi] = x
+                    else:
+                        data[lo] = min(data[lo], x)
+                        data[hi] = max(data[hi], x)
+                        data[avg] += (x - data[avg]) / n
+                    data[last] = x
+            if timestamp > self.last_update:
+                struct.pack_into("<d", self._mm, _HEADER.size - 8, timestamp)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Чтение
+    # ─────────────────────────────────────────────────────────────────────────
+    def _pick_archive(self, start: float, end: float, step: Optional[int]) -> int:
+        """Самый подробный архив, покрывающий ``start`` (или с шагом ``step``)."""
+        if step is not None:
+            for a, (s, _) in enumerate(self.archives):
+                if s == step:
+                    return a
+            raise ValueError(f"No archive with step {step}s")
+        newest = max(end, self.last_update)
+        for a, (s, rows) in enumerate(self.archives):
+            if newest - start < s * rows:
+                return a
+        return len(self.archives) - 1
+
+    def fetch(
+        self,
+        field: str,
+        start: float,
+        end: Optional[float] = None,
+        step: Optional[int] = None,
+    ) -> dict[str, Any]:
+        """Окно ``[start, end]`` поля ``field``: ячейки с данными по порядку времени.
+
+        Возвращает ``{"step", "timestamp", "count", "min", "avg", "max", "last"}``
+        (списки одинаковой длины). Архив выбирается по глубине окна, если
+        ``step`` не задан.
+        """
+        if field not in self.fields:
+            raise KeyError(field)
+        f = self.fields.index(field)
+        with self._lock:
+            if self._mm.closed:
+                # Архив закрыт другим потоком (отключение) — данных нет
+                return {"step": 0, "timestamp": [], "count": [], **{name: [] for name in CONSOLIDATIONS}}
+            if end is None:
+                end = self.last_update
+            a = self._pick_archive(start, end, step)
+            s, rows = self.archives[a]
+            first = start // s * s
+            last = end // s * s
+            # Окно не длиннее архива: старые ячейки уже перезаписаны
+            first = max(first, last - (rows - 1) * s)
+            n = int((last - first) // s) + 1 if last >= first else 0
+            i0 = int(first // s) % rows
+
+            def column(c: int) -> list[float]:
+                base = self._column(a, c)
+                head = self._data[base + i0:base + min(rows, i0 + n)].tolist()
+                if i0 + n > rows:
+                    head += self._data[base:base + i0 + n - rows].tolist()
+                return head
+
+            ts, counts = column(0), column(1)
+            cols = {name: column(self._field_column(f, c)) for c, name in enumerate(CONSOLIDATIONS)}
+
+        keep = [k for k in range(n) if ts[k] == first + k * s]
+        result = {"step": s, "timestamp": [ts[k] for k in keep], "count": [int(counts[k]) for k in keep]}
+        for name, values in cols.items():
+            result[name] = [values[k] for k in keep]
+        return result
+
+    def summary(self, field: str, start: float, end: Optional[float] = None) -> dict[str, float]:
+        """min/avg/max/last поля за окно (avg — взвешенное по числу образцов)."""
+        window = self.fetch(field, start, end)
+        total = sum(window["count"])
+        if not total:
+            return {}
+        return {
+            "min": min(window["min"]),
+            "avg": sum(a * n for a, n in zip(window["avg"], window["count"])) / total,
+            "max": max(window["max"]),
+            "last": window["last"][-1],
+            "samples": total,
+        }
+
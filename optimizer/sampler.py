@@ -0,0 +1,166 @@
+"""Общий сервис опроса: один запрос на интервал, много подписчиков.
+
+Живые карточки, запись замера и экспортёры получают один и тот же
+образец — данные с qBittorrent не запрашиваются повторно.
+
+Интервал адаптивный:
+
+- обычный — ``interval``;
+- во время записи (``set_fast``) — ``fast_interval``;
+- если трафика нет ``idle_after`` образцов подряд, интервал удваивается
+  до ``max_interval`` и возвращается к обычному при первом трафике.
+
+Скорости в образце пересчитываются из счётчиков байт (``CounterRates``),
+если источник их отдаёт: сливаемые и запоздавшие тики не искажают среднее.
+
+Сервис не владеет потоком: ``poll()`` и ``next_delay()`` вызывает
+цикл владельца (фоновый поток GUI, ``run()`` для headless-режима).
+Подписчики вызываются в потоке опроса.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .timeseries import CounterRates
+
+Sample = dict[str, Any]
+
+
+def _no_traffic(sample: Sample) -> bool:
+    return not sample.get("dl_speed") and not sample.get("ul_speed")
+
+
+class SamplingService:
+    """Опрос ``source()`` по расписанию с рассылкой образцов подписчикам."""
+
+    def __init__(
+        self,
+        source: Callable[[], Optional[Sample]],
+        interval: float = 1.0,
+        fast_interval: float = 0.5,
+        max_interval: float = 8.0,
+        idle_after: int = 5,
+        is_idle: Callable[[Sample], bool] = _no_traffic,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.source = source
+        self.base_interval = interval
+        self.fast_interval = fast_interval
+        self.max_interval = max_interval
+        self.idle_after = idle_after
+        self.is_idle = is_idle
+        self.clock = clock
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers: list[Callable[[Sample], None]] = []
+        self._fast_reasons: set[str] = set()
+        self._idle_streak = 0
+        self._due: Optional[float] = None  # None — опросить сразу
+        self.rates = CounterRates()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Подписка и режимы
+    # ─────────────────────────────────────────────────────────────────────────
+    def subscribe(self, callback: Callable[[Sample], None]) -> Callable[[], None]:
+        """Подписаться на образцы; возвращает функцию отписки."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def set_fast(self, reason: str, enabled: bool):
+        """Частый опрос, пока есть хоть одна причина (например, "recording")."""
+        with self._lock:
+            if enabled:
+                self._fast_reasons.add(reason)
+                self.interval = self.fast_interval
+                self._idle_streak = 0
+                now = self.clock()
+                if self._due is not None and self._due > now + self.fast_interval:
+                    self._due = now + self.fast_interval
+            else:
+                self._fast_reasons.discard(reason)
+                if not self._fast_reasons:
+                    self.interval = self.base_interval
+
+    @property
+    def fast(self) -> bool:
+        return bool(self._fast_reasons)
+
+    def reset(self):
+        """Следующий опрос — сразу, интервал — обычный (новое подключение)."""
+        with self._lock:
+            self._due = None
+            self._idle_streak = 0
+            self.rates.reset()
+            self.interval = self.fast_interval if self._fast_reasons else self.base_interval
+
+    def reset_rates(self):
+        """Источник сменил счётчики (другой торрент) — не считать прирост через границу."""
+        with self._lock:
+            self.rates.reset()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Опрос
+    # ─────────────────────────────────────────────────────────────────────────
+    def next_delay(self) -> float:
+        """Сколько секунд до следующего опроса (0 — пора)."""
+        with self._lock:
+            if self._due is None:
+                return 0.0
+            return max(0.0, self._due - self.clock())
+
+    def _adapt(self, sample: Sample):
+        if self._fast_reasons:
+            self.interval = self.fast_interval
+        elif self.is_idle(sample):
+            self._idle_streak += 1
+            if self._idle_streak >= self.idle_after:
+                self.interval = min(self.max_interval, self.interval * 2)
+        else:
+            self._idle_streak = 0
+            self.interval = self.base_interval
+
+    def poll(self) -> Sample:
+        """Один опрос: образец с ``timestamp``, ``interval`` и ``merged``.
+
+        ``merged`` — сколько интервалов пропущено из-за медленного ответа
+        или занятого потока (они слиты в этот образец).
+        """
+        start = self.clock()
+        with self._lock:
+            lag = start - self._due if self._due is not None else 0.0
+            merged = int(lag // self.interval) if lag > 0 else 0
+            interval = self.interval
+
+        sample = dict(self.source() or {})
+        sample["timestamp"] = time.time()
+        sample["interval"] = interval
+        sample["merged"] = merged
+
+        with self._lock:
+            self.rates.apply(sample)
+            self._adapt(sample)
+            self._due = start + self.interval
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"Sample subscriber failed: {e}")
+        return sample
+
+    def run(self, stop: threading.Event):
+        """Простой цикл опроса до ``stop.set()`` (headless-режим)."""
+        while not stop.is_set():
+            delay = self.next_delay()
+            if delay > 0:
+                stop.wait(delay)
+                continue
+            self.poll()
@@ -0,0 +1,116 @@
+"""Инкрементальный опрос qBittorrent через ``/api/v2/sync/maindata``.
+
+Сервер помнит, что отдал клиенту, и по ``rid`` присылает только
+изменения: новые и изменённые поля раздач, удалённые хэши, изменившиеся
+поля ``server_state``. ``MaindataMirror`` применяет эти дельты к
+локальной копии, поэтому стоимость тика пропорциональна числу изменений,
+а не размеру библиотеки.
+
+Если сервер потерял состояние клиента (перезапуск, слишком старый
+``rid``), он присылает ``full_update`` — копия строится заново.
+"""
+
+from typing import Any, Optional
+
+from .benchmark_manager import BenchmarkManager
+
+
+def _merge_section(target: dict[str, dict], delta: Optional[dict], removed: Optional[list]):
+    """Словарь объектов (раздачи, категории, трекеры): слить поля, удалить ключи."""
+    for key, fields in (delta or {}).items():
+        if isinstance(fields, dict):
+            target.setdefault(key, {}).update(fields)
+        else:
+            target[key] = fields
+    for key in removed or ():
+        target.pop(key, None)
+
+
+def _peers(record: Optional[dict]) -> int:
+    if not record:
+        return 0
+    return record.get("num_seeds", 0) + record.get("num_leechs", 0)
+
+
+class MaindataMirror:
+    """Локальная копия состояния qBittorrent, собираемая из дельт maindata."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rid = 0
+        self.server_state: dict[str, Any] = {}
+        self.torrents: dict[str, dict[str, Any]] = {}
+        self.categories: dict[str, dict[str, Any]] = {}
+        self.tags: set[str] = set()
+        self.trackers: dict[str, Any] = {}
+        self.peers = 0  # сумма num_seeds + num_leechs, ведётся по дельтам
+        self.last_changed = 0  # раздач изменилось в последнем ответе
+
+    def apply(self, data: dict[str, Any]):
+        """Применить один ответ ``sync/maindata``."""
+        if data.get("full_update"):
+            self.reset()
+
+        torrents = data.get("torrents") or {}
+        removed = data.get("torrents_removed") or ()
+        for torrent_hash in (*torrents, *removed):
+            self.peers -= _peers(self.torrents.get(torrent_hash))
+        _merge_section(self.torrents, torrents, removed)
+        for torrent_hash in torrents:
+            # В maindata хэш — ключ, а не поле; добавляем как в torrents/info
+            self.torrents[torrent_hash].setdefault("hash", torrent_hash)
+            self.peers += _peers(self.torrents[torrent_hash])
+        _merge_section(self.categories, data.get("categories"), data.get("categories_removed"))
+        _merge_section(self.trackers, data.get("trackers"), data.get("trackers_removed"))
+        self.tags.update(data.get("tags") or ())
+        self.tags.difference_update(data.get("tags_removed") or ())
+        self.server_state.update(data.get("server_state") or {})
+
+        self.last_changed = len(torrents) + len(removed)
+        self.rid = data.get("rid", self.rid)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Снимки в формате BenchmarkManager
+    # ─────────────────────────────────────────────────────────────────────────
+    def main_stats(self) -> dict[str, Any]:
+        """То же, что ``BenchmarkManager.get_main_stats``."""
+        stats = BenchmarkManager.main_stats_from_info(self.server_state)
+        stats["peers"] = self.peers
+        stats.update(BenchmarkManager.disk_stats_from_state(self.server_state))
+        return stats
+
+    def torrent_stats(self, torrent_hash: str) -> Optional[dict[str, Any]]:
+        """То же, что ``BenchmarkManager.get_torrent_stats``."""
+        record = self.torrents.get(torrent_hash)
+        if record is None:
+            return None
+        return BenchmarkManager.torrent_stats_from_record(record)
+
+
+class MaindataSync:
+    """Опрос ``sync/maindata`` через сессию ``BenchmarkManager``."""
+
+    def __init__(self, manager: BenchmarkManager):
+        self.manager = manager
+        self.mirror = MaindataMirror()
+
+    def update(self) -> bool:
+        """Запросить изменения с текущего ``rid`` и применить их.
+
+        При ошибке связи копия сбрасывается: следующий запрос (``rid=0``)
+        получит полное состояние.
+        """
+        data = self.manager.get_maindata(self.mirror.rid)
+        if data is None:
+            self.mirror.reset()
+            return False
+        self.mirror.apply(data)
+        return True
+
+    def main_stats(self) -> dict[str, Any]:
+        return self.mirror.main_stats()
+
+    def torrent_stats(self, torrent_hash: str) -> Optional[dict[str, Any]]:
+        return self.mirror.torrent_stats(torrent_hash)
@@ -0,0 +1,391 @@
+"""Таблица ступеней (tiers) для калькулятора.
+
+Разделы ``connections``, ``queue``, ``disk_io`` и ``network`` описаны
+декларативно: список правил ``when`` → лестница ступеней по метрике
+(скорость, RAM). При импорте таблица компилируется в индекс:
+
+- словарь по комбинации категорий (среда, накопитель, трекер...) —
+  первое подходящее правило для каждой комбинации вычисляется заранее;
+- ``bisect`` по порогам лестницы.
+
+Поэтому расчёт раздела — один поиск в словаре и один ``bisect``.
+Таблицу можно заменить своей (``TierTable.from_json``), не трогая
+``calculator.py``.
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from itertools import product
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from .models import (
+    NetworkSettings,
+    HardwareSettings,
+    UsageSettings,
+    ConnectionType,
+    StorageType,
+    EnvironmentProfile,
+    TrackerType,
+    UserRole,
+    ProtocolMode,
+)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ИЗМЕРЕНИЯ И МЕТРИКИ
+# ═══════════════════════════════════════════════════════════════════════════════
+# Категориальные измерения, по которым выбирается правило
+DIMENSIONS: dict[str, tuple[type, Callable]] = {
+    "tracker": (TrackerType, lambda n, h, u: u.tracker_type),
+    "role": (UserRole, lambda n, h, u: u.user_role),
+    "environment": (EnvironmentProfile, lambda n, h, u: u.environment),
+    "storage": (StorageType, lambda n, h, u: h.storage_type),
+    "connection": (ConnectionType, lambda n, h, u: n.connection_type),
+}
+
+# Числовые метрики, по которым строятся лестницы
+METRICS: dict[str, Callable] = {
+    "download_speed_mbps": lambda n, h, u: n.download_speed_mbps,
+    "upload_speed_mbps": lambda n, h, u: n.upload_speed_mbps,
+    "ram_gb": lambda n, h, u: h.ram_gb,
+}
+
+# Поля, значения которых задаются именем члена Enum
+ENUM_FIELDS: dict[str, type] = {
+    "protocol_mode": ProtocolMode,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ТАБЛИЦА ПО УМОЛЧАНИЮ
+# ═══════════════════════════════════════════════════════════════════════════════
+# Ступени: ``below`` — метрика строго меньше порога, ``up_to`` — не больше.
+# Последняя ступень лестницы порога не имеет.
+DEFAULT_TIERS: dict[str, Any] = {
+    "connections": {
+        "select": ["tracker", "environment"],
+        "rules": [
+            {"when": {"tracker": "PRIVATE"}, "tiers": [
+                {"max_connections_global": 200, "max_connections_per_torrent": 50,
+                 "explanations": {"max_connections": "100-300 для приватных трекеров."}},
+            ]},
+            {"when": {"environment": "SEEDBOX"}, "tiers": [
+                {"max_connections_global": 2000, "max_connections_per_torrent": 500,
+                 "explanations": {"max_connections": "Максимум для Seedbox."},
+                 "warnings": ["⚡ Seedbox: максимальные соединения для высоких скоростей."]},
+            ]},
+            {"metric": "download_speed_mbps", "tiers": [
+                {"below": 100, "max_connections_global": 200, "max_connections_per_torrent": 50,
+                 "explanations": {"max_connections": "200 для скоростей до 100 Мбит/с."}},
+                {"below": 500, "max_connections_global": 500, "max_connections_per_torrent": 125,
+                 "explanations": {"max_connections": "500 для средних скоростей."}},
+                {"max_connections_global": 1000, "max_connections_per_torrent": 250,
+                 "explanations": {"max_connections": "1000 для быстрых каналов."}},
+            ]},
+        ],
+    },
+    "queue": {
+        "select": ["role"],
+        "rules": [
+            # Сидер: uploads × 1.5
+            {"when": {"role": "SEEDER"}, "metric": "download_speed_mbps", "tiers": [
+                {"below": 50, "max_active_downloads": 2, "max_active_uploads": 4},
+                {"below": 300, "max_active_downloads": 5, "max_active_uploads": 12},
+                {"max_active_downloads": 10, "max_active_uploads": 22},
+            ]},
+            {"metric": "download_speed_mbps", "tiers": [
+                {"below": 50, "max_active_downloads": 2, "max_active_uploads": 3},
+                {"below": 300, "max_active_downloads": 5, "max_active_uploads": 8},
+                {"max_active_downloads": 10, "max_active_uploads": 15},
+            ]},
+        ],
+        "explanations": {
+            "queue": "Downloads: {max_active_downloads}, Uploads: {max_active_uploads}",
+        },
+    },
+    "disk_io": {
+        "select": ["environment", "storage"],
+        "rules": [
+            # ZFS: отключаем кэш, пусть работает ARC
+            {"when": {"environment": "TRUENAS"}, "tiers": [
+                {"disk_cache_mb": 0, "enable_os_cache": True, "pre_allocate_disk": False,
+                 "explanations": {
+                     "disk_cache": "Disk Cache = 0 для ZFS. Позвольте ZFS ARC управлять памятью.",
+                     "pre_allocate": "Pre-allocate выключен. ZFS использует Copy-on-Write.",
+                 },
+                 "warnings": ["🗄️ TrueNAS/ZFS: Disk Cache отключён, OS Cache включён, Pre-allocate выключен."]},
+            ]},
+            # Synology/QNAP: буфер для сетевых задержек
+            {"when": {"environment": "NAS"}, "tiers": [
+                {"disk_cache_mb": 512, "enable_os_cache": False, "pre_allocate_disk": True,
+                 "explanations": {"disk_cache": "512 МБ буфер для сетевых задержек NAS."},
+                 "warnings": ["📦 NAS: OS Cache выключен для стабильности."]},
+            ]},
+            {"when": {"environment": "DOCKER"}, "tiers": [
+                {"disk_cache_mb": -1, "enable_os_cache": True, "pre_allocate_disk": True,
+                 "explanations": {"disk_cache": "Auto для Docker контейнера."}},
+            ]},
+            {"when": {"environment": "SEEDBOX"}, "metric": "ram_gb", "tiers": [
+                {"below": 16, "disk_cache_mb": 1024},
+                {"below": 32, "disk_cache_mb": 2048},
+                {"disk_cache_mb": 4096},
+            ], "defaults": {
+                "enable_os_cache": True, "pre_allocate_disk": True,
+                "explanations": {"disk_cache": "{disk_cache_mb} МБ для Seedbox (высокая нагрузка)."},
+            }},
+            {"when": {"storage": "HDD"}, "metric": "ram_gb", "tiers": [
+                {"below": 8, "disk_cache_mb": 512},
+                {"below": 16, "disk_cache_mb": 1024},
+                {"disk_cache_mb": 2048},
+            ], "defaults": {
+                "enable_os_cache": True, "pre_allocate_disk": True,
+                "explanations": {"disk_cache": "{disk_cache_mb} МБ для HDD."},
+            }},
+            {"when": {"storage": "SSD_SATA"}, "metric": "ram_gb", "tiers": [
+                {"below": 8, "disk_cache_mb": 256},
+                {"disk_cache_mb": 512},
+            ], "defaults": {
+                "enable_os_cache": True, "pre_allocate_disk": True,
+                "explanations": {"disk_cache": "{disk_cache_mb} МБ для SATA SSD."},
+            }},
+            {"tiers": [
+                {"disk_cache_mb": -1, "enable_os_cache": True, "pre_allocate_disk": True,
+                 "explanations": {"disk_cache": "Auto (-1) для NVMe."}},
+            ]},
+        ],
+    },
+    "network": {
+        "select": ["environment"],
+        "rules": [
+            {"when": {"environment": "SEEDBOX"}, "tiers": [
+                {"send_buffer_watermark_kb": 16000, "send_buffer_low_watermark_kb": 160,
+                 "send_buffer_factor": 150, "socket_backlog_size": 1024,
+                 "outgoing_connections_per_second": 1000, "protocol_mode": "TCP_ONLY",
+                 "explanations": {
+                     "send_buffer": "16 МБ буфер для Seedbox (1+ Гбит/с).",
+                     "socket_backlog": "Socket backlog 1024 для массовых подключений.",
+                     "protocol": "TCP only — μTP не нужен на сидбоксе.",
+                 }},
+            ]},
+            {"when": {"environment": "DOCKER"}, "tiers": [
+                {"send_buffer_watermark_kb": 500, "send_buffer_low_watermark_kb": 16,
+                 "send_buffer_factor": 100, "socket_backlog_size": 30,
+                 "outgoing_connections_per_second": 100, "protocol_mode": "TCP_ONLY",
+                 "explanations": {"protocol": "TCP only внутри VPN-туннеля."}},
+            ]},
+            # На Fiber протокол дополнительно переключается на TCP в калькуляторе
+            {"metric": "upload_speed_mbps", "tiers": [
+                {"up_to": 100, "send_buffer_watermark_kb": 500, "send_buffer_low_watermark_kb": 16,
+                 "send_buffer_factor": 100, "socket_backlog_size": 30,
+                 "outgoing_connections_per_second": 100, "protocol_mode": "UTP_TCP",
+                 "explanations": {"send_buffer": "Стандартное значение."}},
+                {"up_to": 500, "send_buffer_watermark_kb": 5000, "send_buffer_low_watermark_kb": 160,
+                 "send_buffer_factor": 120, "socket_backlog_size": 100,
+                 "outgoing_connections_per_second": 200, "protocol_mode": "UTP_TCP",
+                 "explanations": {"send_buffer": "5 МБ буфер."}},
+                {"send_buffer_watermark_kb": 8000, "send_buffer_low_watermark_kb": 160,
+                 "send_buffer_factor": 120, "socket_backlog_size": 200,
+                 "outgoing_connections_per_second": 500, "protocol_mode": "UTP_TCP",
+                 "explanations": {"send_buffer": "8 МБ буфер для высоких скоростей."}},
+            ]},
+        ],
+    },
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# СКОМПИЛИРОВАННЫЕ СТРУКТУРЫ
+# ═══════════════════════════════════════════════════════════════════════════════
+@dataclass(frozen=True)
+class Tier:
+    """Ступень: готовые значения полей, пояснения и предупреждения."""
+    values: dict[str, Any]
+    explanations: dict[str, str] = field(default_factory=dict)
+    warnings: tuple[str, ...] = ()
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+
+class Ladder:
+    """Лестница ступеней по одной метрике (поиск через ``bisect``)."""
+
+    def __init__(
+        self,
+        metric: Optional[str],
+        bounds: list[float],
+        inclusive: bool,
+        tiers: list[Tier],
+    ):
+        self.metric = metric
+        self.bounds = bounds
+        self.inclusive = inclusive
+        self.tiers = tiers
+        self._bisect = bisect_left if inclusive else bisect_right
+
+    def index_for(self, value: float) -> int:
+        """Номер ступени для значения метрики."""
+        return self._bisect(self.bounds, value)
+
+    def select(
+        self,
+        network: NetworkSettings,
+        hardware: HardwareSettings,
+        usage: UsageSettings,
+    ) -> Tier:
+        if not self.bounds:
+            return self.tiers[0]
+        return self.tiers[self.index_for(METRICS[self.metric](network, hardware, usage))]
+
+
+class Section:
+    """Раздел таблицы: индекс «комбинация категорий → лестница»."""
+
+    def __init__(self, name: str, dims: list[str], index: dict[tuple, Ladder]):
+        self.name = name
+        self.dims = dims
+        self.index = index
+        self._getters = [DIMENSIONS[d][1] for d in dims]
+
+    def select(
+        self,
+        network: NetworkSettings,
+        hardware: HardwareSettings,
+        usage: UsageSettings,
+    ) -> Tier:
+        key = tuple(get(network, hardware, usage) for get in self._getters)
+        return self.index[key].select(network, hardware, usage)
+
+    def ladders(self) -> dict[int, tuple[Ladder, list[tuple]]]:
+        """Уникальные лестницы и комбинации, которые на них ссылаются."""
+        groups: dict[int, tuple[Ladder, list[tuple]]] = {}
+        for key, ladder in self.index.items():
+            groups.setdefault(id(ladder), (ladder, []))[1].append(key)
+        return groups
+
+
+def _compile_tier(raw: dict, defaults: dict, section_explanations: dict, where: str) -> Tier:
+    merged = {**defaults, **raw}
+    explanations = {
+        **section_explanations,
+        **defaults.get("explanations", {}),
+        **raw.get("explanations", {}),
+    }
+    warnings = tuple(defaults.get("warnings", ())) + tuple(raw.get("warnings", ()))
+
+    values: dict[str, Any] = {}
+    for key, value in merged.items():
+        if key in ("below", "up_to", "explanations", "warnings"):
+            continue
+        if key in ENUM_FIELDS:
+            try:
+                value = ENUM_FIELDS[key][value]
+            except KeyError:
+                raise ValueError(f"{where}: unknown {key} '{value}'") from None
+        values[key] = value
+
+    try:
+        explanations = {k: v.format(**values) for k, v in explanations.items()}
+    except KeyError as e:
+        raise ValueError(f"{where}: explanation refers to unknown field {e}") from None
+    return Tier(values=values, explanations=explanations, warnings=warnings)
+
+
+def _compile_ladder(rule: dict, section_explanations: dict, where: str) -> Ladder:
+    raw_tiers = rule.get("tiers") or []
+    if not raw_tiers:
+        raise ValueError(f"{where}: rule has no tiers")
+
+    metric = rule.get("metric")
+    if len(raw_tiers) > 1 and metric not in METRICS:
+        raise ValueError(f"{where}: unknown metric '{metric}'")
+
+    head, last = raw_tiers[:-1], raw_tiers[-1]
+    if "below" in last or "up_to" in last:
+        raise ValueError(f"{where}: last tier must not have a bound")
+    kinds = {"up_to" if "up_to" in t else "below" if "below" in t else None for t in head}
+    if None in kinds or len(kinds) > 1:
+        raise ValueError(f"{where}: tiers must all use either 'below' or 'up_to'")
+    inclusive = kinds == {"up_to"}
+    bounds = [float(t["up_to" if inclusive else "below"]) for t in head]
+    if bounds != sorted(bounds):
+        raise ValueError(f"{where}: tier bounds must be ascending")
+
+    defaults = rule.get("defaults", {})
+    tiers = [
+        _compile_tier(t, defaults, section_explanations, f"{where}[{i}]")
+        for i, t in enumerate(raw_tiers)
+    ]
+    return Ladder(metric, bounds, inclusive, tiers)
+
+
+def _compile_section(name: str, spec: dict) -> Section:
+    dims = list(spec.get("select", []))
+    for d in dims:
+        if d not in DIMENSIONS:
+            raise ValueError(f"{name}: unknown dimension '{d}'")
+
+    rules = []
+    for i, rule in enumerate(spec.get("rules", [])):
+        when = rule.get("when", {})
+        for d, member in when.items():
+            if d not in dims:
+                raise ValueError(f"{name}.rules[{i}]: dimension '{d}' is not selected")
+            if member not in DIMENSIONS[d][0].__members__:
+                raise ValueError(f"{name}.rules[{i}]: unknown {d} '{member}'")
+        ladder = _compile_ladder(rule, spec.get("explanations", {}), f"{name}.rules[{i}]")
+        rules.append((when, ladder))
+
+    fields = {frozenset(t.values) for _, ladder in rules for t in ladder.tiers}
+    if len(fields) > 1:
+        raise ValueError(f"{name}: all tiers must define the same fields")
+
+    # Разворачиваем правила в полный индекс: для каждой комбинации — первое совпадение
+    index: dict[tuple, Ladder] = {}
+    for combo in product(*(list(DIMENSIONS[d][0]) for d in dims)):
+        named = {d: m.name for d, m in zip(dims, combo)}
+        for when, ladder in rules:
+            if all(named[d] == member for d, member in when.items()):
+                index[combo] = ladder
+                break
+        else:
+            raise ValueError(f"{name}: no rule matches {named}")
+    return Section(name, dims, index)
+
+
+class TierTable:
+    """Скомпилированная таблица ступеней."""
+
+    SECTIONS = ("connections", "queue", "disk_io", "network")
+
+    def __init__(self, spec: dict[str, Any]):
+        missing = [s for s in self.SECTIONS if s not in spec]
+        if missing:
+            raise ValueError(f"Tier table is missing sections: {', '.join(missing)}")
+        self.spec = spec
+        self.sections = {name: _compile_section(name, spec[name]) for name in self.SECTIONS}
+
+    @classmethod
+    def from_json(cls, path: Path) -> "TierTable":
+        """Загрузить таблицу сайта из JSON.
+
+        Разделы, которых нет в файле, берутся из таблицы по умолчанию.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls({**DEFAULT_TIERS, **spec})
+
+    def select(
+        self,
+        section: str,
+        network: NetworkSettings,
+        hardware: HardwareSettings,
+        usage: UsageSettings,
+    ) -> Tier:
+        """Найти ступень раздела для профиля."""
+        return self.sections[section].select(network, hardware, usage)
+
+
+DEFAULT_TIER_TABLE = TierTable(DEFAULT_TIERS)
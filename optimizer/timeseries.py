@@ -0,0 +1,318 @@
+"""Кольцевой буфер образцов с потоковой статистикой.
+
+Образцы хранятся в массивах ``array('d')`` фиксированной ёмкости: часы
+мониторинга на 1 Гц занимают постоянную память, а добавление образца
+стоит O(1) независимо от длины окна.
+
+По каждому полю ведутся:
+
+- среднее и дисперсия окна — Уэлфорд с добавлением и вычитанием
+  (вытесняемый образец «вычитается» из суммы);
+- EWMA — сглаженное текущее значение;
+- p50/p95/p99 — оценки P² (Jain & Chlamtac) по всем образцам с
+  последнего ``clear()``, без хранения выборки.
+
+Скорость берётся из прироста счётчиков байт (``CounterRates``) на
+интервале ``time.monotonic()``, а не из сглаженного qBittorrent
+мгновенного значения. Окно хранит суммы байт и секунд, поэтому средняя
+скорость точна при любом дрожании опроса и пропущенных тиках.
+"""
+
+import math
+from array import array
+from typing import Any, Iterable, Optional
+
+MB = 1024 * 1024
+
+FIELDS = ("dl_speed", "ul_speed", "dht_nodes", "peers")
+# Дисковая очередь libtorrent из server_state (см. diagnostics)
+DISK_FIELDS = (
+    "queued_io_jobs", "average_time_queue", "read_cache_overload",
+    "write_cache_overload", "total_buffers_size", "total_queued_size",
+)
+# Хранятся, но без статистик: время, интервал скорости, счётчики байт, диск
+RAW_FIELDS = ("monotonic", "dt", "dl_data", "ul_data") + DISK_FIELDS
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# СКОРОСТЬ ПО СЧЁТЧИКАМ
+# ═══════════════════════════════════════════════════════════════════════════════
+class CounterRates:
+    """Скорость как прирост ``dl_data``/``ul_data`` за интервал ``monotonic``.
+
+    В образец записываются ``dl_speed``/``ul_speed`` (байт/с) и ``dt`` —
+    сколько секунд покрывает скорость. Первый образец и образец после
+    сброса счётчика (перезапуск qBittorrent, другой торрент) оставляют
+    мгновенную скорость с ``dt = 0``: в точные средние они не входят.
+    """
+
+    def __init__(self):
+        self._prev: Optional[tuple[float, float, float]] = None
+
+    def reset(self):
+        self._prev = None
+
+    def apply(self, sample: dict[str, Any]) -> dict[str, Any]:
+        if "dl_data" not in sample or "monotonic" not in sample:
+            return sample
+        now, dl, ul = sample["monotonic"], sample["dl_data"], sample["ul_data"]
+        prev, self._prev = self._prev, (now, dl, ul)
+        sample["dt"] = 0.0
+        if prev is None:
+            return sample
+        dt = now - prev[0]
+        if dt <= 0 or dl < prev[1] or ul < prev[2]:
+            return sample
+        sample["dl_speed"] = (dl - prev[1]) / dt
+        sample["ul_speed"] = (ul - prev[2]) / dt
+        sample["dt"] = dt
+        return sample
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ПОТОКОВЫЕ ОЦЕНКИ
+# ═══════════════════════════════════════════════════════════════════════════════
+class RunningStats:
+    """Среднее и дисперсия окна по Уэлфорду (с удалением старых значений)."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x: float):
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.n -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 = max(0.0, self.m2 - delta * (x - self.mean))
+
+    @property
+    def variance(self) -> float:
+        """Дисперсия генеральной совокупности (как в ``analyze_results``)."""
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Ewma:
+    """Экспоненциально взвешенное среднее."""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    def add(self, x: float):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+
+
+class P2Quantile:
+    """Оценка квантиля алгоритмом P² (пять маркеров, O(1) памяти)."""
+
+    __slots__ = ("p", "count", "q", "pos", "want", "step")
+
+    def __init__(self, p: float):
+        self.p = p
+        self.count = 0
+        self.q: list[float] = []
+        self.pos = [1, 2, 3, 4, 5]
+        self.want = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.step = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        self.count += 1
+        q = self.q
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self.pos[i] += 1
+        for i in range(5):
+            self.want[i] += self.step[i]
+
+        pos = self.pos
+        for i in (1, 2, 3):
+            d = self.want[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                s = 1 if d > 0 else -1
+                # Параболическая поправка; если выходит за соседей — линейная
+                qp = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + s * (q[i + s] - q[i]) / (pos[i + s] - pos[i])
+                q[i] = qp
+                pos[i] += s
+
+    @property
+    def value(self) -> float:
+        if not self.q:
+            return 0.0
+        if self.count <= 5:
+            # Пока маркеров нет — точный nearest-rank
+            return self.q[max(0, math.ceil(self.p * len(self.q)) - 1)]
+        return self.q[2]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# КОЛЬЦЕВОЙ БУФЕР
+# ═══════════════════════════════════════════════════════════════════════════════
+class TimeSeries:
+    """Последние ``capacity`` образцов (``timestamp`` + ``FIELDS``)."""
+
+    def __init__(
+        self,
+        capacity: int,
+        alpha: float = 0.2,
+        quantiles: tuple[float, ...] = QUANTILES,
+    ):
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.capacity = capacity
+        self.alpha = alpha
+        self.quantile_levels = quantiles
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._data = {name: array("d", bytes(8 * capacity)) for name in FIELDS + RAW_FIELDS}
+        self.clear()
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+        self.total = 0  # образцов с последнего clear()
+        # Байты и секунды по счётчикам в окне: точная средняя скорость
+        self.counted_sec = 0.0
+        self.counted_bytes = {"dl_speed": 0.0, "ul_speed": 0.0}
+        self.stats = {name: RunningStats() for name in FIELDS}
+        self.ewma = {name: Ewma(self.alpha) for name in FIELDS}
+        self.quantiles = {name: {p: P2Quantile(p) for p in self.quantile_levels} for name in FIELDS}
+
+    @classmethod
+    def from_samples(cls, samples: Iterable[dict[str, Any]], capacity: Optional[int] = None) -> "TimeSeries":
+        samples = list(samples)
+        series = cls(capacity or max(1, len(samples)))
+        for sample in samples:
+            series.append(sample)
+        return series
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, sample: dict[str, Any]):
+        """Добавить образец (формат ``get_main_stats``); O(1)."""
+        if self._len == self.capacity:
+            # Вытесняем самый старый образец: его ячейка станет самой новой
+            i = self._start
+            for name in FIELDS:
+                self.stats[name].remove(self._data[name][i])
+            self._count(i, -1)
+            self._start = (self._start + 1) % self.capacity
+        else:
+            i = (self._start + self._len) % self.capacity
+            self._len += 1
+
+        self._timestamps[i] = sample.get("timestamp", 0.0)
+        for name in FIELDS:
+            x = float(sample.get(name, 0) or 0)
+            self._data[name][i] = x
+            self.stats[name].add(x)
+            self.ewma[name].add(x)
+            for estimator in self.quantiles[name].values():
+                estimator.add(x)
+        for name in RAW_FIELDS:
+            self._data[name][i] = float(sample.get(name, 0) or 0)
+        self._count(i, 1)
+        self.total += 1
+
+    def _count(self, i: int, sign: int):
+        dt = self._data["dt"][i]
+        if dt > 0:
+            self.counted_sec += sign * dt
+            for name in self.counted_bytes:
+                self.counted_bytes[name] += sign * self._data[name][i] * dt
+        if self.counted_sec < 1e-9:
+            # Окно без образцов по счётчикам: обнуляем накопленную ошибку
+            self.counted_sec = 0.0
+            self.counted_bytes = dict.fromkeys(self.counted_bytes, 0.0)
+
+    def mean_rate(self, name: str) -> float:
+        """Средняя скорость окна: по счётчикам, если есть, иначе среднее образцов."""
+        if self.counted_sec > 0:
+            return self.counted_bytes[name] / self.counted_sec
+        return self.stats[name].mean
+
+    def _ordered(self, column: array) -> list[float]:
+        end = self._start + self._len
+        if end <= self.capacity:
+            return column[self._start:end].tolist()
+        return column[self._start:].tolist() + column[:end - self.capacity].tolist()
+
+    def values(self, name: str) -> list[float]:
+        """Значения поля в окне, от старых к новым."""
+        return self._ordered(self._data[name])
+
+    def timestamps(self) -> list[float]:
+        return self._ordered(self._timestamps)
+
+    def samples(self) -> list[dict[str, float]]:
+        """Окно как список образцов (для сохранения прогона)."""
+        columns = [self.timestamps()] + [self.values(name) for name in FIELDS + RAW_FIELDS]
+        keys = ("timestamp",) + FIELDS + RAW_FIELDS
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def percentile(self, name: str, p: float) -> float:
+        return self.quantiles[name][p].value
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Сводка
+    # ─────────────────────────────────────────────────────────────────────────
+    def stability(self) -> float:
+        """100 − коэффициент вариации загрузки, % (как в ``analyze_results``)."""
+        dl = self.stats["dl_speed"]
+        if dl.mean > 0:
+            return 100 - min(100, dl.std / dl.mean * 100)
+        return 0
+
+    def analysis(self) -> dict[str, Any]:
+        """Сводка окна в формате ``BenchmarkManager.analyze_results`` + квантили."""
+        if not self._len:
+            return {}
+        result = {
+            "avg_dl_mbps": round(self.mean_rate("dl_speed") / MB, 2),
+            "avg_ul_mbps": round(self.mean_rate("ul_speed") / MB, 2),
+            "avg_dht": int(self.stats["dht_nodes"].mean),
+            "stability_score": round(self.stability(), 1),
+            "samples": self._len,
+        }
+        for name, prefix in (("dl_speed", "dl"), ("ul_speed", "ul")):
+            for p in self.quantile_levels:
+                result[f"p{round(p * 100)}_{prefix}_mbps"] = round(self.percentile(name, p) / MB, 2)
+            result[f"ewma_{prefix}_mbps"] = round((self.ewma[name].value or 0.0) / MB, 2)
+        return result
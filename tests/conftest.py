@@ -0,0 +1,169 @@
+"""Общие фикстуры: локальный mock qBittorrent WebAPI."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class MockQBittorrent:
+    """Состояние фейкового qBittorrent.
+
+    ``speed_model(prefs) -> (dl, ul)`` задаёт скорость (байт/с) в
+    зависимости от текущих настроек.
+    """
+
+    def __init__(self):
+        self.prefs = {
+            "max_connec": 500,
+            "max_uploads": 100,
+            "async_io_threads": 10,
+            "send_buffer_watermark": 500,
+            "disk_cache": -1,
+        }
+        self.transfer = {"dht_nodes": 300, "connection_status": "connected"}
+        self.torrents: list[dict] = []
+        self.requests: list[tuple[str, str]] = []
+        self.set_calls: list[dict] = []
+        self.speed_model = lambda prefs: (0, 0)
+        self.client_ports: set[int] = set()  # разные порты = разные TCP-соединения
+        self.cookies: list[str] = []
+        self.sync_snapshots: dict[int, tuple[dict, dict]] = {}  # rid → (server_state, torrents)
+        self.sync_responses: list[dict] = []
+
+    def server_state(self) -> dict:
+        dl, ul = self.speed_model(self.prefs)
+        return {"dl_info_speed": dl, "up_info_speed": ul, **self.transfer}
+
+    def maindata(self, rid: int) -> dict:
+        """Ответ sync/maindata: дельта к снимку ``rid`` или полное состояние."""
+        server = self.server_state()
+        torrents = {
+            t["hash"]: {k: v for k, v in t.items() if k != "hash"} for t in self.torrents
+        }
+        new_rid = len(self.sync_snapshots) + 1
+        self.sync_snapshots[new_rid] = (server, torrents)
+        if rid not in self.sync_snapshots:
+            resp = {"rid": new_rid, "full_update": True, "server_state": server, "torrents": torrents}
+        else:
+            old_server, old_torrents = self.sync_snapshots[rid]
+            changed = {}
+            for h, fields in torrents.items():
+                old = old_torrents.get(h, {})
+                diff = {k: v for k, v in fields.items() if old.get(k) != v}
+                if diff:
+                    changed[h] = diff
+            resp = {"rid": new_rid}
+            if changed:
+                resp["torrents"] = changed
+            removed = [h for h in old_torrents if h not in torrents]
+            if removed:
+                resp["torrents_removed"] = removed
+            server_diff = {k: v for k, v in server.items() if old_server.get(k) != v}
+            if server_diff:
+                resp["server_state"] = server_diff
+        self.sync_responses.append(resp)
+        return resp
+
+
+def _make_handler(state: MockQBittorrent):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего WebUI
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, status=200, headers=None):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _track(self, method, path):
+            state.requests.append((method, path))
+            state.client_ports.add(self.client_address[1])
+            state.cookies.append(self.headers.get("Cookie", ""))
+
+        def _form(self) -> dict:
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length).decode()
+            return {k: v[0] for k, v in parse_qs(raw).items()}
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            self._track("GET", url.path)
+            if url.path == "/api/v2/app/preferences":
+                self._send(state.prefs)
+            elif url.path == "/api/v2/transfer/info":
+                self._send(state.server_state())
+            elif url.path == "/api/v2/sync/maindata":
+                rid = int(parse_qs(url.query).get("rid", ["0"])[0])
+                self._send(state.maindata(rid))
+            elif url.path == "/api/v2/torrents/info":
+                self._send(state.torrents)
+            else:
+                self._send(b"Not Found", 404)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            self._track("POST", url.path)
+            form = self._form()
+            if url.path == "/api/v2/auth/login":
+                self._send(b"Ok.", headers={"Set-Cookie": "SID=test-sid; HttpOnly; path=/"})
+            elif url.path == "/api/v2/app/setPreferences":
+                changes = json.loads(form["json"])
+                state.set_calls.append(changes)
+                state.prefs.update(changes)
+                self._send(b"")
+            else:
+                self._send(b"Not Found", 404)
+
+    return Handler
+
+
+def _start_server(state: MockQBittorrent) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _stop_server(server: ThreadingHTTPServer):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mock_qbt():
+    """Запустить mock WebAPI; возвращает (url, state)."""
+    state = MockQBittorrent()
+    server = _start_server(state)
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", state
+    finally:
+        _stop_server(server)
+
+
+@pytest.fixture
+def mock_qbt_cluster():
+    """Фабрика mock-экземпляров: ``make(n)`` → [(url, state), ...]."""
+    servers = []
+
+    def make(n: int):
+        result = []
+        for _ in range(n):
+            state = MockQBittorrent()
+            server = _start_server(state)
+            servers.append(server)
+            result.append((f"http://127.0.0.1:{server.server_address[1]}", state))
+        return result
+
+    try:
+        yield make
+    finally:
+        for server in servers:
+            _stop_server(server)
@@ -0,0 +1,122 @@
+import json
+
+from optimizer.advisor import TuningAdvisor
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.diagnostics import RunContext
+from optimizer.models import (
+    ConnectionType, EnvironmentProfile, HardwareSettings, NetworkSettings,
+    StorageType, TrackerType, UsageSettings, UserRole,
+)
+
+MB = 1024 * 1024
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _advisor(mock_qbt, tmp_path, **kwargs):
+    url, state = mock_qbt
+    settings = calculate_optimal_settings(
+        NetworkSettings(500, 100, ConnectionType.FIBER, False),
+        HardwareSettings(storage_type=StorageType.HDD, ram_gb=16, cpu_cores=8),
+        UsageSettings(TrackerType.PUBLIC, UserRole.LEECHER, EnvironmentProfile.SYSTEM),
+    )
+    manager = BenchmarkManager(url)
+    assert manager.connect()
+    clock = FakeClock()
+    options = {"window": 5, "confirm": 2, "cooldown_sec": 100, "log_path": tmp_path / "advisor.jsonl", "clock": clock}
+    options.update(kwargs)
+    advisor = TuningAdvisor(manager, settings, RunContext(), **options)
+    return advisor, settings, state, clock
+
+
+def _window(advisor, clock, seconds=60):
+    for _ in range(advisor.window):
+        advisor.sample()
+    clock.now += seconds
+    return advisor.evaluate()
+
+
+def test_disk_pressure_needs_confirmation_and_respects_cooldown(mock_qbt, tmp_path):
+    advisor, settings, state, clock = _advisor(mock_qbt, tmp_path)
+    state.speed_model = lambda prefs: (20 * MB, 2 * MB)
+    state.torrents = [{"hash": "a", "num_seeds": 50, "num_leechs": 50}]
+    state.transfer.update({"queued_io_jobs": 64, "average_time_queue": 400})
+
+    assert _window(advisor, clock) is None  # первое окно — только подтверждение
+    change = _window(advisor, clock)
+    assert change.pref_key == "max_active_downloads" and change.verdict == "disk"
+    assert change.new < change.old and state.prefs["max_active_downloads"] == change.new
+
+    # Эффект измеряется в следующем окне; затем cooldown не даёт менять снова
+    assert _window(advisor, clock, seconds=10) is None
+    assert advisor.changes[0].throughput_after is not None
+    assert _window(advisor, clock, seconds=10) is None
+    assert len(state.set_calls) == 1
+
+    entries = [json.loads(line) for line in (tmp_path / "advisor.jsonl").read_text().splitlines()]
+    assert [e["event"] for e in entries] == ["applied", "measured"]
+    assert entries[1]["effect_pct"] == 0.0
+
+
+def test_steps_stay_within_bounds_and_relax_to_baseline(mock_qbt, tmp_path):
+    advisor, settings, state, clock = _advisor(mock_qbt, tmp_path, window=2, confirm=1, cooldown_sec=0)
+    base = settings.max_connections_global
+    state.speed_model = lambda prefs: (10 * MB, MB)
+    state.torrents = [{"hash": "a", "num_seeds": 10_000, "num_leechs": 0}]  # всегда у лимита
+
+    for _ in range(16):
+        _window(advisor, clock)
+    assert advisor.current["max_connections_global"] == min(2000, base * 2)
+    assert advisor.current["max_connections_per_torrent"] <= settings.max_connections_per_torrent * 2
+
+    # Нагрузка спала: по шагу назад, не ниже расчётного
+    state.speed_model = lambda prefs: (0, 0)
+    state.torrents = []
+    state.transfer["dht_nodes"] = 0
+    for _ in range(16):
+        _window(advisor, clock)
+    assert advisor.current == advisor.baseline
+
+
+def test_regression_is_reverted(mock_qbt, tmp_path):
+    advisor, settings, state, clock = _advisor(mock_qbt, tmp_path, confirm=1, cooldown_sec=0)
+    state.torrents = [{"hash": "a", "num_seeds": 50, "num_leechs": 50}]
+    state.transfer.update({"queued_io_jobs": 64})
+    # Меньше активных загрузок — скорость падает вдвое, очередь не уменьшается
+    state.prefs["max_active_downloads"] = settings.max_active_downloads
+    state.speed_model = lambda prefs: (
+        (20 if prefs["max_active_downloads"] >= settings.max_active_downloads else 10) * MB, 0
+    )
+
+    change = _window(advisor, clock)
+    assert change.pref_key == "max_active_downloads"
+    revert = _window(advisor, clock)
+    assert change.reverted and change.effect_pct < -15
+    assert revert.verdict == "revert" and revert.new == change.old
+    assert state.prefs["max_active_downloads"] == change.old
+    # Откат блокирует то же направление: следующий шаг — другим полем
+    follow = _window(advisor, clock)
+    assert follow is None or follow.pref_key != "max_active_downloads"
+
+
+def test_knobs_unknown_to_server_are_skipped(mock_qbt, tmp_path):
+    advisor, settings, state, clock = _advisor(mock_qbt, tmp_path, confirm=1, cooldown_sec=0)
+    assert settings.disk_cache_mb > 0 and "disk_cache_mb" in advisor.knobs
+    state.prefs.update({k.pref_key: getattr(settings, n) for n, k in advisor.knobs.items()})
+    del state.prefs["disk_cache"]  # libtorrent 2.0: ключа нет
+    state.torrents = [{"hash": "a", "num_seeds": 50, "num_leechs": 50}]
+    state.transfer.update({"write_cache_overload": "80"})
+
+    assert advisor.load_current()
+    assert advisor.skipped == ["disk_cache_mb"] and "disk_cache_mb" not in advisor.knobs
+    for _ in range(3):
+        _window(advisor, clock)
+    assert all("disk_cache" not in call for call in state.set_calls)
+    assert advisor.restore() and "disk_cache" not in state.prefs
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from optimizer.async_client import AsyncQBittorrentClient, InstanceMonitor
+
+MB = 1024 * 1024
+
+
+@pytest.mark.parametrize("transport", ["stdlib", "aiohttp"])
+def test_async_client_reuses_pooled_connections(mock_qbt, transport):
+    if transport == "aiohttp":
+        pytest.importorskip("aiohttp")
+    url, state = mock_qbt
+    state.speed_model = lambda prefs: (3 * MB, MB)
+    state.torrents = [{"hash": "abc", "dlspeed": 5, "upspeed": 7, "progress": 0.5, "state": "downloading"}]
+
+    async def main():
+        async with AsyncQBittorrentClient(url, "admin", "admin", pool_size=2, transport=transport) as client:
+            assert await client.connect()
+            stats = await asyncio.gather(*(client.get_main_stats() for _ in range(10)))
+            torrent = await client.get_torrent_stats("abc")
+        return stats, torrent
+
+    stats, torrent = asyncio.run(main())
+
+    assert all(s["dl_speed"] == 3 * MB and s["ul_speed"] == MB for s in stats)
+    assert torrent["ul_speed"] == 7 and torrent["state"] == "downloading"
+    assert len(state.client_ports) <= 2  # 12 запросов через пул из 2 соединений
+    assert state.cookies[-1] == "SID=test-sid"
+
+
+def test_monitor_aggregates_instances(mock_qbt_cluster):
+    cluster = mock_qbt_cluster(3)
+    for i, (_, state) in enumerate(cluster):
+        state.speed_model = lambda prefs, i=i: ((i + 1) * MB, MB)
+
+    async def main():
+        clients = [AsyncQBittorrentClient(url, transport="stdlib") for url, _ in cluster]
+        clients.append(AsyncQBittorrentClient("http://127.0.0.1:1", timeout=0.5, transport="stdlib"))
+        monitor = InstanceMonitor(clients, max_concurrency=2)
+        try:
+            return [snapshot async for snapshot in monitor.stream(interval=0.01, count=2)]
+        finally:
+            await monitor.close()
+
+    snapshots = asyncio.run(main())
+
+    assert len(snapshots) == 2
+    last = snapshots[-1]
+    assert last["total"]["online"] == 3
+    assert last["total"]["dl_speed"] == 6 * MB
+    assert last["instances"]["http://127.0.0.1:1"]["ok"] is False
+    # Вход выполняется один раз, дальше — только опрос
+    for _, state in cluster:
+        assert state.requests.count(("POST", "/api/v2/auth/login")) == 1
+
+
+def test_hanging_connect_is_bounded_by_timeout(mock_qbt, monkeypatch):
+    url, state = mock_qbt
+
+    async def blackhole(*args, **kwargs):
+        await asyncio.sleep(30)
+
+    async def main():
+        live = AsyncQBittorrentClient(url, transport="stdlib")
+        assert await live.connect()
+        monkeypatch.setattr(asyncio, "open_connection", blackhole)
+        dead = AsyncQBittorrentClient("http://10.255.255.1:8080", timeout=0.2, transport="stdlib")
+        assert not await asyncio.wait_for(dead.connect(), 2)
+
+        # Опрос упал по таймауту: хост не онлайн и не даёт нулей в сумму
+        live.timeout = live._http.timeout = 0.2
+        live._http._idle.clear()
+        monitor = InstanceMonitor([live])
+        snapshot = await asyncio.wait_for(monitor.poll(), 2)
+        await monitor.close()
+        return snapshot
+
+    snapshot = asyncio.run(main())
+    assert snapshot["instances"][url]["ok"] is False
+    assert snapshot["total"]["online"] == 0
@@ -0,0 +1,63 @@
+import threading
+
+from optimizer.autotuner import AutoTuner
+from optimizer.benchmark_manager import BenchmarkManager
+
+MB = 1024 * 1024
+
+
+def _peaked(prefs):
+    """Скорость максимальна при max_connec=1000 и async_io_threads=32."""
+    penalty = abs(prefs["max_connec"] - 1000) / 2000 + abs(prefs["async_io_threads"] - 32) / 128
+    return int(50 * MB * max(0.1, 1 - penalty)), int(5 * MB)
+
+
+def _tuner(url, **kwargs):
+    manager = BenchmarkManager(url)
+    assert manager.connect("admin", "admin")
+    options = dict(time_budget_sec=30, min_duration_sec=0.01, sample_interval_sec=0.002, settle_sec=0)
+    options.update(kwargs)
+    return AutoTuner(manager, **options)
+
+
+def test_autotune_converges_and_restores(mock_qbt):
+    url, state = mock_qbt
+    state.speed_model = _peaked
+    original = dict(state.prefs)
+
+    result = _tuner(url).run()
+
+    assert result.best_values["max_connections_global"] == 1000
+    assert result.best_values["async_io_threads"] == 32
+    assert result.best_score > result.start_score
+    assert not result.aborted
+    assert result.restored
+    assert state.prefs == original
+
+
+def test_autotune_abort_restores_preferences(mock_qbt):
+    url, state = mock_qbt
+    state.speed_model = _peaked
+    original = dict(state.prefs)
+
+    tuner = _tuner(url, min_duration_sec=5)
+    threading.Timer(0.2, tuner.abort).start()
+    result = tuner.run()
+
+    assert result.aborted
+    assert result.restored
+    assert state.prefs == original
+    assert len(state.set_calls) >= 2  # кандидат + восстановление
+
+
+def test_autotune_skips_keys_unknown_to_server(mock_qbt):
+    url, state = mock_qbt
+    state.speed_model = _peaked
+    del state.prefs["disk_cache"]  # libtorrent 2.0: ключа нет
+
+    result = _tuner(url).run()
+
+    assert result.skipped == ["disk_cache_mb"]
+    assert "disk_cache_mb" not in result.best_values
+    assert all("disk_cache" not in call for call in state.set_calls)
+    assert "disk_cache" not in state.prefs and result.restored
@@ -0,0 +1,85 @@
+import itertools
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from optimizer.models import (
+    NetworkSettings, HardwareSettings, UsageSettings,
+    ConnectionType, StorageType, EnvironmentProfile,
+    TrackerType, UserRole
+)
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.batch_calculator import (
+    calculate_columns, calculate_optimal_settings_batch, profiles_to_columns,
+    RESULT_FIELDS, PROTOCOL_CODES, ENCRYPTION_CODES
+)
+
+# Скорости подобраны на границах всех порогов калькулятора
+SPEEDS = [(49, 100), (50, 101), (99, 500), (100, 501), (299, 1000), (300, 50), (499, 99), (500, 2500)]
+# RAM и CPU независимы в калькуляторе — перебираем их парами
+HARDWARE = [(4, 8, False, 0), (8, 16, True, 8), (16, 16, True, 0), (32, 12, False, 6)]
+VPNS = [(False, ""), (True, ""), (True, "wg0")]
+THROTTLING = [(False, ""), (True, ""), (True, "host-17")]
+# RTT чередуется по строкам: без замера, LAN, обычный, VPN, спутник
+RTTS = [None, 0.8, 35.5, 180.0, 1500.0]
+# Библиотеки (раздач, ГБ); длина взаимно проста с RTTS — сочетания не повторяются
+LIBRARIES = [(0, 0.0), (40, 30.0), (900, 12000.0), (5000, 8000.0), (20000, 250000.0), (300, 0.0), (12, 120.0)]
+
+
+def _grid():
+    for i, ((dl, ul), conn, storage, (ram, cores, hybrid, p), tracker, role, env, (vpn, iface), (throttling, seed)) in enumerate(itertools.product(
+        SPEEDS, ConnectionType, StorageType, HARDWARE,
+        TrackerType, UserRole, EnvironmentProfile, VPNS, THROTTLING
+    )):
+        yield (
+            NetworkSettings(dl, ul, conn, vpn, iface, throttling, seed, RTTS[i % len(RTTS)]),
+            HardwareSettings(storage, ram, cores, hybrid, p),
+            UsageSettings(tracker, role, env, *LIBRARIES[i % len(LIBRARIES)]),
+        )
+
+
+def test_batch_matches_scalar_on_full_grid():
+    profiles = list(_grid())
+    result = calculate_columns(profiles_to_columns(profiles))
+
+    for i, (n, h, u) in enumerate(profiles):
+        expected = calculate_optimal_settings(n, h, u)
+        for name in RESULT_FIELDS:
+            got = result[name][i]
+            want = getattr(expected, name)
+            if name == "protocol_mode":
+                got = PROTOCOL_CODES[got]
+            elif name == "encryption_mode":
+                got = ENCRYPTION_CODES[got]
+            assert got == want, f"{name} mismatch for {n}, {h}, {u}"
+
+
+def test_batch_broadcasts_scalar_categories():
+    result = calculate_optimal_settings_batch(
+        download_speed_mbps=np.array([10.0, 200.0, 1000.0]),
+        upload_speed_mbps=np.array([10.0, 200.0, 1000.0]),
+        connection_type=0,
+        storage_type=2,
+        ram_gb=16,
+        cpu_cores=8,
+        tracker_type=0,
+    )
+    assert result["max_connections_global"].tolist() == [200, 500, 1000]
+    assert result["async_io_threads"].tolist() == [32, 32, 32]
+    assert result["listening_port"].tolist() == ["Стандартный"] * 3
+
+
+def test_batch_uses_custom_tier_table():
+    import json
+    from optimizer.tiers import TierTable, DEFAULT_TIERS
+
+    spec = json.loads(json.dumps(DEFAULT_TIERS))
+    spec["connections"]["rules"][2]["tiers"][0]["below"] = 50
+    table = TierTable(spec)
+    profiles = [p for p in _grid() if p[2].environment == EnvironmentProfile.SYSTEM][:2000]
+
+    result = calculate_columns(profiles_to_columns(profiles), tiers=table)
+    for i, (n, h, u) in enumerate(profiles):
+        expected = calculate_optimal_settings(n, h, u, tiers=table)
+        assert result["max_connections_global"][i] == expected.max_connections_global
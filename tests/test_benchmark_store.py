@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from optimizer.benchmark_store import DAY_SEC, BenchmarkStore, settings_key, settings_to_dict
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.models import (
+    ConnectionType, EnvironmentProfile, HardwareSettings, NetworkSettings,
+    StorageType, TrackerType, UsageSettings, UserRole,
+)
+from optimizer.timeseries import MB
+
+NOW = 1_700_000_000.0
+
+
+def _settings(download_mbps=100):
+    return calculate_optimal_settings(
+        NetworkSettings(download_mbps, 100, ConnectionType.FIBER, False),
+        HardwareSettings(storage_type=StorageType.SSD_SATA, ram_gb=16, cpu_cores=8),
+        UsageSettings(TrackerType.PUBLIC, UserRole.LEECHER, EnvironmentProfile.SYSTEM),
+    )
+
+
+def _run(start, dl_mb, n=30):
+    """Прогон со счётчиками: ``dl_mb`` МБ/с ровно, опрос раз в секунду."""
+    return [
+        {"timestamp": start + i, "dl_speed": dl_mb * MB, "ul_speed": MB, "dht_nodes": 300,
+         "peers": 10, "dl_data": dl_mb * MB * i, "ul_data": MB * i, "dt": 1.0 if i else 0.0}
+        for i in range(n)
+    ]
+
+
+def test_record_run_roundtrip(tmp_path):
+    settings = _settings()
+    with BenchmarkStore(tmp_path / "history.db") as store:
+        samples = _run(NOW, 8)
+        run_id = store.record_run("http://a:8080", "optimized", samples, settings=settings,
+                                  environment="SYSTEM", qbt_version="v4.6.2")
+
+        assert store.samples(run_id) == [
+            {k: s[k] for k in ("timestamp", "dl_speed", "ul_speed", "dht_nodes", "peers",
+                               "dl_data", "ul_data", "dt")}
+            for s in samples
+        ]
+        (run,) = store.runs(host="http://a:8080")
+        assert run["qbt_version"] == "v4.6.2"
+        assert run["sample_count"] == 30 and run["duration_sec"] == 29
+        assert run["avg_dl"] == pytest.approx(8 * MB)
+        assert run["settings"] == json.loads(json.dumps(settings_to_dict(settings)))
+        assert run["settings"]["protocol_mode"] == settings.protocol_mode.name
+        assert "warnings" not in run["settings"]
+        assert run["analysis"]["avg_dl_mbps"] == 8.0
+
+    with pytest.raises(ValueError):
+        BenchmarkStore().record_run("h", "baseline", [])
+
+
+def test_throughput_trend_by_day():
+    store = BenchmarkStore()
+    for day in range(100):
+        # Два прогона в день: 4 и 8 МБ/с по 30 секунд — среднее дня 6 МБ/с
+        store.record_run("a", "optimized", _run(NOW - day * DAY_SEC, 4))
+        store.record_run("a", "baseline", _run(NOW - day * DAY_SEC + 60, 8))
+    store.record_run("b", "optimized", _run(NOW, 100))
+
+    trend = store.throughput_trend("a", days=90, now=NOW + 3600)
+    assert len(trend) == 90
+    assert [row["start"] for row in trend] == sorted(row["start"] for row in trend)
+    assert all(row["runs"] == 2 and row["avg_dl_mbps"] == pytest.approx(6.0) for row in trend)
+
+    only_opt = store.throughput_trend("a", days=90, profile="optimized", now=NOW + 3600)
+    assert {row["avg_dl_mbps"] for row in only_opt} == {4.0}
+
+
+def test_best_profile_per_environment():
+    store = BenchmarkStore()
+    slow, fast = _settings(50), _settings(1000)
+    assert settings_key(settings_to_dict(slow)) != settings_key(settings_to_dict(fast))
+    for i in range(3):
+        store.record_run("a", "optimized", _run(NOW + i * 100, 5), settings=slow, environment="SYSTEM")
+        store.record_run("a", "optimized", _run(NOW + i * 100 + 50, 9), settings=fast, environment="SYSTEM")
+    store.record_run("b", "optimized", _run(NOW, 3), settings=slow, environment="DOCKER")
+
+    best = store.best_profiles()
+    assert set(best) == {"SYSTEM", "DOCKER"}
+    assert best["SYSTEM"]["settings_key"] == settings_key(settings_to_dict(fast))
+    assert best["SYSTEM"]["runs"] == 3 and best["SYSTEM"]["avg_dl_mbps"] == 9.0
+    assert best["DOCKER"]["settings"]["max_connections_global"] == slow.max_connections_global
+
+
+def test_best_profile_ignores_runs_without_counters():
+    store = BenchmarkStore()
+    slow, fast = _settings(50), _settings(1000)
+    store.record_run("a", "optimized", _run(NOW, 9), settings=fast, environment="SYSTEM")
+    # Без счётчиков — только мгновенные скорости; в рейтинг не попадает
+    legacy = [{k: v for k, v in s.items() if k not in ("dl_data", "ul_data", "dt")} for s in _run(NOW + 100, 50)]
+    run_id = store.record_run("a", "optimized", legacy, settings=slow, environment="SYSTEM")
+    assert store.runs()[0]["id"] == run_id and store.runs()[0]["counted_sec"] == 0
+    store.record_run("a", "optimized", legacy, settings=slow, environment="LEGACY")
+
+    best = store.best_profiles()
+    assert set(best) == {"SYSTEM"}
+    assert best["SYSTEM"]["settings_key"] == settings_key(settings_to_dict(fast))
+    assert best["SYSTEM"]["runs"] == 1
+
+
+def test_queries_use_indexes():
+    store = BenchmarkStore()
+    plans = {
+        "trend": store._query(
+            "EXPLAIN QUERY PLAN SELECT SUM(dl_bytes) FROM runs WHERE host = ? AND started_at >= ?", ("a", 0)
+        ),
+        "samples": store._query("EXPLAIN QUERY PLAN SELECT ts FROM samples WHERE run_id = ? ORDER BY seq", (1,)),
+    }
+    assert "runs_host_time" in " ".join(row["detail"] for row in plans["trend"])
+    assert "PRIMARY KEY" in " ".join(row["detail"] for row in plans["samples"])
+
+
+def test_delete_before_cascades_samples():
+    store = BenchmarkStore()
+    old = store.record_run("a", "baseline", _run(NOW - 200 * DAY_SEC, 4))
+    store.record_run("a", "baseline", _run(NOW, 4))
+    assert store.delete_before(NOW - 90 * DAY_SEC) == 1
+    assert store.samples(old) == [] and len(store.runs()) == 1
@@ -4,7 +4,7 @@ from optimizer.models import (
     ConnectionType, StorageType, EnvironmentProfile, 
     TrackerType, UserRole, OptimizedSettings
 )
-from optimizer.calculator import calculate_optimal_settings
+from optimizer.calculator import calculate_optimal_settings, CalculatorCache, stable_port
 
 def test_calculate_desktop_defaults():
     network = NetworkSettings(
@@ -69,3 +69,76 @@ def test_calculate_hybrid_cpu():
     
     # Should use P-cores for async I/O
     assert settings.async_io_threads == 32 # 8 P-cores * 4
+
+def test_throttling_port_is_deterministic():
+    network = NetworkSettings(100, 100, ConnectionType.FIBER, False, isp_throttling=True)
+    hardware = HardwareSettings(StorageType.SSD_SATA, 16, 8)
+    usage = UsageSettings(TrackerType.PUBLIC)
+
+    first = calculate_optimal_settings(network, hardware, usage)
+    second = calculate_optimal_settings(network, hardware, usage)
+    assert first.listening_port == second.listening_port
+    port = int(first.listening_port.removeprefix("Random (").rstrip(")"))
+    assert 49152 <= port <= 65535
+
+    seeded = NetworkSettings(100, 100, ConnectionType.FIBER, False, isp_throttling=True, port_seed="box-1")
+    assert calculate_optimal_settings(seeded, hardware, usage).listening_port == \
+        f"Random ({stable_port('box-1')})"
+
+def test_calculator_cache_hits_and_eviction():
+    cache = CalculatorCache(maxsize=2)
+    hardware = HardwareSettings(StorageType.NVME, 32, 8)
+    usage = UsageSettings(TrackerType.PUBLIC)
+    profiles = [NetworkSettings(speed, speed, ConnectionType.FIBER, False) for speed in (100, 200, 300)]
+
+    first = cache(profiles[0], hardware, usage)
+    first.warnings.append("mutated by caller")
+    again = cache(profiles[0], hardware, usage)
+    assert "mutated by caller" not in again.warnings
+    assert cache.info() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 2}
+
+    cache(profiles[1], hardware, usage)
+    cache(profiles[2], hardware, usage)  # вытесняет profiles[0]
+    cache(profiles[0], hardware, usage)
+    assert cache.misses == 4
+    assert cache.info()["size"] == 2
+
+def test_send_buffer_from_bdp():
+    hardware = HardwareSettings(StorageType.NVME, 32, 8)
+    usage = UsageSettings(TrackerType.PRIVATE, UserRole.SEEDER)
+
+    # 100 Мбит/с = 12500 КБ/с; RTT 600 мс → BDP 7500 КБ, 50 слотов
+    network = NetworkSettings(500, 100, ConnectionType.CABLE_DSL, True, rtt_ms=600)
+    result = calculate_optimal_settings(network, hardware, usage)
+    assert result.upload_slots_global == 50
+    assert result.send_buffer_watermark_kb == 15000
+    assert result.send_buffer_low_watermark_kb == 300
+    assert result.send_buffer_factor == 120
+    assert "BDP" in result.explanations["send_buffer"]
+
+    # LAN: BDP ничтожен — упираемся в нижние пределы
+    lan = calculate_optimal_settings(NetworkSettings(1000, 1000, ConnectionType.FIBER, False, rtt_ms=1), hardware, usage)
+    assert (lan.send_buffer_watermark_kb, lan.send_buffer_low_watermark_kb) == (256, 16)
+
+    # Без RTT — значения таблицы
+    plain = calculate_optimal_settings(NetworkSettings(500, 100, ConnectionType.CABLE_DSL, True), hardware, usage)
+    assert "BDP" not in plain.explanations["send_buffer"]
+
+def test_large_library_scales_queue_and_file_pool():
+    network = NetworkSettings(1000, 1000, ConnectionType.FIBER, False)
+    usage = UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER, torrent_count=20000, library_size_gb=250000)
+
+    hdd = calculate_optimal_settings(network, HardwareSettings(StorageType.HDD, 32, 8), usage)
+    assert hdd.max_active_uploads == 300  # предел случайного чтения HDD
+    assert hdd.max_connections_global >= hdd.max_active_torrents * 4
+    assert hdd.file_pool_size == hdd.max_active_torrents * 4  # средняя раздача 12.5 ГБ
+    assert "library" in hdd.explanations
+
+    nvme = calculate_optimal_settings(network, HardwareSettings(StorageType.NVME, 32, 8), usage)
+    assert nvme.max_active_uploads == 500  # 2000 соединений / 4
+    assert nvme.max_connections_global == 2000
+
+    # Без данных о библиотеке — прежнее поведение
+    plain = calculate_optimal_settings(network, HardwareSettings(StorageType.HDD, 32, 8), UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER))
+    assert plain.file_pool_size == 100
+    assert "library" not in plain.explanations
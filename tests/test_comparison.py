@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.comparison import (
+    bootstrap_ci,
+    cliffs_delta,
+    compare_runs,
+    mann_whitney_u,
+    required_samples,
+    trim_warmup,
+)
+
+MB = 1024 * 1024
+
+
+def _run(rng, mean, n=60, warmup=0):
+    # Разгон: скорость растёт от нуля, затем шумит вокруг mean
+    return [mean * (i + 1) / (warmup + 1) if i < warmup else rng.gauss(mean, mean * 0.3) for i in range(n)]
+
+
+def test_trim_warmup_cuts_ramp():
+    rng = random.Random(1)
+    run = _run(rng, 10.0, n=60, warmup=15)
+    kept = trim_warmup(run)
+    assert 30 <= len(kept) <= 45  # разгон отрезан, но не больше половины
+    assert trim_warmup([1, 2, 3]) == [1, 2, 3]
+
+
+def test_mann_whitney_and_cliffs_delta():
+    a = [1, 2, 3, 4, 5]
+    b = [6, 7, 8, 9, 10]
+    u, p = mann_whitney_u(a, b)
+    assert u == 25 and p < 0.05
+    assert cliffs_delta(a, b) == 1.0
+    assert cliffs_delta(b, a) == -1.0
+    assert mann_whitney_u([1, 1, 1], [1, 1, 1])[1] == 1.0
+
+
+def test_bootstrap_ci_covers_mean_difference():
+    rng = random.Random(2)
+    a = [rng.gauss(10, 2) for _ in range(200)]
+    b = [rng.gauss(12, 2) for _ in range(200)]
+    lo, hi = bootstrap_ci(a, b)
+    assert lo < 2 < hi and lo > 0
+
+
+def test_compare_runs_verdicts():
+    rng = random.Random(3)
+    base = [_run(rng, 10 * MB, warmup=10) for _ in range(3)]
+    better = [_run(rng, 13 * MB, warmup=10) for _ in range(3)]
+
+    improved = compare_runs(base, better)
+    assert improved.verdict == "improved" and improved.significant
+    assert improved.trimmed > 0 and improved.diff_pct == pytest.approx(30, abs=8)
+    assert improved.min_samples is not None and improved.min_samples < improved.optimized_n
+
+    assert compare_runs(better, base).verdict == "regressed"
+
+
+def test_same_profile_is_rarely_called_different():
+    false_positives = 0
+    for seed in range(20):
+        rng = random.Random(100 + seed)
+        a = [_run(rng, 10 * MB, warmup=10) for _ in range(3)]
+        b = [_run(rng, 10 * MB, warmup=10) for _ in range(3)]
+        false_positives += compare_runs(a, b, resamples=100, seed=seed).verdict != "inconclusive"
+    assert false_positives <= 2
+    assert compare_runs([[1.0]], [[2.0]]) is None
+
+
+def test_required_samples_grows_for_small_effects():
+    rng = random.Random(4)
+    a = [rng.gauss(10, 3) for _ in range(100)]
+    big = required_samples(a, [x + 3 for x in a])
+    small = required_samples(a, [x + 0.5 for x in a])
+    assert big < small
+    assert required_samples(a, list(a)) is None
+
+
+def test_manager_report_includes_significance():
+    rng = random.Random(5)
+    manager = BenchmarkManager()
+    for mode, mean in (("baseline", 10 * MB), ("optimized", 14 * MB)):
+        for _ in range(2):
+            manager.add_run(mode, [
+                {"timestamp": float(i), "dl_speed": v, "ul_speed": MB, "dht_nodes": 100}
+                for i, v in enumerate(_run(rng, mean, warmup=5))
+            ])
+    assert manager.optimized_results["runs"] == 2
+
+    manager.update_comparison()
+    assert manager.comparison["dl_speed"].verdict == "improved"
+    report = manager.get_comparison_report()
+    assert "реальное улучшение" in report and "Прогонов baseline / optimized: 2 / 2" in report
+
+    manager.reset_runs()
+    assert manager.comparison == {} and manager.baseline_results is None
+
+
+def _ar1(rng, mean, n=60, rho=0.9):
+    # Посекундная скорость «помнит» прошлую секунду — как в живом рое
+    x, out = 0.0, []
+    for _ in range(n):
+        x = rho * x + rng.gauss(0, mean * 0.1)
+        out.append(mean + x)
+    return out
+
+
+def test_autocorrelated_runs_use_blocks():
+    false_positives = naive = 0
+    for seed in range(20):
+        rng = random.Random(200 + seed)
+        a = [_ar1(rng, 10 * MB) for _ in range(3)]
+        b = [_ar1(rng, 10 * MB) for _ in range(3)]
+        result = compare_runs(a, b, resamples=100, seed=seed)
+        assert result.block > 1
+        false_positives += result.significant
+        # Посекундные замеры как независимые — «значимо» почти всегда
+        naive += mann_whitney_u(sum(a, []), sum(b, []))[1] < 0.05
+    assert false_positives <= 2 < 10 <= naive
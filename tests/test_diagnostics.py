@@ -0,0 +1,88 @@
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.diagnostics import INCONCLUSIVE, RunContext, diagnose_run
+from optimizer.models import (
+    ConnectionType, EnvironmentProfile, HardwareSettings, NetworkSettings,
+    StorageType, TrackerType, UsageSettings, UserRole,
+)
+from optimizer.sync_client import MaindataMirror
+
+MB = 1024 * 1024
+
+
+def _settings():
+    return calculate_optimal_settings(
+        NetworkSettings(1000, 1000, ConnectionType.FIBER, False),
+        HardwareSettings(storage_type=StorageType.HDD, ram_gb=16, cpu_cores=8),
+        UsageSettings(TrackerType.PUBLIC, UserRole.LEECHER, EnvironmentProfile.SYSTEM),
+    )
+
+
+def _samples(n=30, **fields):
+    base = {"dl_speed": 20 * MB, "ul_speed": 2 * MB, "peers": 150}
+    return [{**base, **fields} for _ in range(n)]
+
+
+def _fields(diagnosis):
+    return [r.field for r in diagnosis.recommendations]
+
+
+def test_disk_bound_maps_to_cache_and_io_threads():
+    settings = _settings()
+    d = diagnose_run(
+        _samples(queued_io_jobs=64, average_time_queue=300, write_cache_overload=40),
+        RunContext(link_dl=125e6, max_connections=500),
+        settings,
+    )
+    assert d.verdict == "disk"
+    assert _fields(d)[:2] == ["disk_cache_mb", "async_io_threads"]
+    cache, io = d.recommendations[:2]
+    assert cache.current == settings.disk_cache_mb
+    assert cache.suggested == (None if settings.disk_cache_mb <= 0 else min(8192, settings.disk_cache_mb * 2))
+    assert io.suggested == min(128, settings.async_io_threads * 2)
+
+
+def test_network_bound_by_link_and_by_limit():
+    link = RunContext(link_dl=100e6 / 8, link_ul=20e6 / 8, max_connections=500)
+    d = diagnose_run(_samples(ul_speed=2.4e6), link, _settings())
+    assert d.verdict == "network"
+    assert _fields(d) == ["global_upload_limit_kbps", "send_buffer_watermark_kb"]
+    assert d.recommendations[0].direction == "decrease"
+    assert d.recommendations[0].suggested == 2000  # 80% от 2500 КБ/с
+
+    limited = RunContext.from_preferences({"dl_limit": 21 * MB, "up_limit": -1, "max_connec": 500})
+    d = diagnose_run(_samples(), limited)
+    assert d.verdict == "network"
+    assert _fields(d) == ["global_download_limit_kbps"]
+    assert d.recommendations[0].direction == "increase"
+
+
+def test_peer_bound_cap_vs_small_swarm():
+    d = diagnose_run(_samples(peers=195), RunContext(max_connections=200), _settings())
+    assert d.verdict == "peers"
+    assert _fields(d) == ["max_connections_global", "max_connections_per_torrent"]
+    assert d.recommendations[0].direction == "increase"
+
+    d = diagnose_run(_samples(peers=3), RunContext(max_connections=500))
+    assert d.verdict == "peers"
+    assert "outgoing_connections_per_second" in _fields(d)
+
+
+def test_cpu_bound_and_inconclusive():
+    d = diagnose_run(_samples(), RunContext(max_connections=500, cpu_load=0.97), _settings())
+    assert d.verdict == "cpu"
+    assert all(r.direction == "decrease" for r in d.recommendations)
+
+    d = diagnose_run(_samples(queued_io_jobs=2), RunContext(link_dl=125e6, max_connections=500))
+    assert d.verdict == INCONCLUSIVE and d.recommendations == []
+    assert d.scores["disk"] < 1
+
+
+def test_maindata_samples_carry_disk_queue():
+    mirror = MaindataMirror()
+    mirror.apply({"rid": 1, "full_update": True, "server_state": {
+        "dl_info_speed": MB, "queued_io_jobs": 7, "average_time_queue": "120", "read_cache_overload": "0",
+    }})
+    stats = mirror.main_stats()
+    assert stats["queued_io_jobs"] == 7 and stats["average_time_queue"] == 120.0
+    assert "queued_io_jobs" not in BenchmarkManager.main_stats_from_info({"dl_info_speed": 1})
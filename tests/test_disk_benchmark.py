@@ -0,0 +1,76 @@
+import errno
+
+import pytest
+
+from optimizer.models import (
+    NetworkSettings, HardwareSettings, UsageSettings, DiskProfile,
+    ConnectionType, StorageType, EnvironmentProfile, TrackerType
+)
+from optimizer.calculator import calculate_optimal_settings, iops_knee
+from optimizer.disk_benchmark import DiskBenchmark, profile_from_dict, profile_to_dict
+
+
+def test_benchmark_measures_and_cleans_up(tmp_path):
+    bench = DiskBenchmark(tmp_path, file_size_mb=4, queue_depths=(1, 2), duration_sec=0.05)
+    profile = bench.run()
+
+    assert profile.queue_depths == (1, 2)
+    assert profile.seq_write_mb_s > 0
+    assert all(v > 0 for v in profile.read_iops + profile.write_iops)
+    assert list(tmp_path.iterdir()) == []  # временный файл удалён
+    assert profile_from_dict(profile_to_dict(profile)) == profile
+
+
+def test_random_io_closes_files_when_open_fails(tmp_path):
+    bench = DiskBenchmark(tmp_path, file_size_mb=1, queue_depths=(4,), duration_sec=0.01)
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"\0" * (1024 * 1024))
+    opened = []
+    real_open = bench._open
+
+    def flaky_open(p, create=False):
+        if len(opened) == 2:
+            raise OSError(errno.EMFILE, "Too many open files")
+        opened.append(real_open(p, create))
+        return opened[-1]
+
+    bench._open = flaky_open
+    with pytest.raises(OSError):
+        bench._random_io(path, 4, write=False)
+    assert len(opened) == 2 and all(f.closed for f in opened)
+
+
+def test_iops_knee():
+    qds = (1, 2, 4, 8, 16, 32)
+    assert iops_knee(qds, (200, 210, 215, 215, 216, 216)) == 1          # HDD
+    assert iops_knee(qds, (10e3, 19e3, 35e3, 60e3, 64e3, 65e3)) == 8    # SSD
+    assert iops_knee(qds, (1, 2, 4, 8, 16, 32)) == 32                   # не насытился
+
+
+def _disk(write_iops):
+    qds = (1, 2, 4, 8, 16)
+    return DiskProfile(
+        seq_write_mb_s=150.0, queue_depths=qds,
+        read_iops=(150, 180, 200, 205, 206), write_iops=write_iops,
+        read_latency_ms=(6.0,) * 5, write_latency_ms=(7.0,) * 5,
+    )
+
+
+def test_calculator_sizes_from_disk_profile():
+    network = NetworkSettings(1000, 100, ConnectionType.FIBER, False)
+    usage = UsageSettings(TrackerType.PUBLIC)
+
+    # Медленный RAID: 16К запись 1620 × 16 КБ ≈ 25.3 МБ/с при загрузке 125 МБ/с
+    slow = HardwareSettings(StorageType.NVME, 16, 16, disk=_disk((400, 800, 1400, 1600, 1620)))
+    result = calculate_optimal_settings(network, slow, usage)
+    assert result.async_io_threads == 8
+    assert result.disk_cache_mb == 997  # ceil(99.7 МБ/с × 10 с)
+    assert "QD8" in result.explanations["async_io"]
+
+    # Быстрый диск: кэш остаётся по таблице (Auto для NVMe)
+    fast = HardwareSettings(StorageType.NVME, 16, 16, disk=_disk((20e3, 40e3, 60e3, 62e3, 62e3)))
+    assert calculate_optimal_settings(network, fast, usage).disk_cache_mb == -1
+
+    # ZFS: кэш не трогаем даже при медленном диске
+    zfs = calculate_optimal_settings(network, slow, UsageSettings(TrackerType.PUBLIC, environment=EnvironmentProfile.TRUENAS))
+    assert zfs.disk_cache_mb == 0
@@ -0,0 +1,92 @@
+import asyncio
+import re
+import urllib.request
+
+from optimizer.async_client import AsyncQBittorrentClient
+from optimizer.exporter import MetricsExporter, serve_metrics
+
+MB = 1024 * 1024
+
+
+def _value(text, name, **labels):
+    label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(rf"^{name}{{{re.escape(label_text)}}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def _exporter(cluster, dead=True):
+    clients = [AsyncQBittorrentClient(url, transport="stdlib") for url, _ in cluster]
+    if dead:
+        clients.append(AsyncQBittorrentClient("http://127.0.0.1:1", timeout=0.5, transport="stdlib"))
+    return MetricsExporter(clients, preferences_every=10)
+
+
+def test_exporter_labels_instances(mock_qbt_cluster):
+    cluster = mock_qbt_cluster(2)
+    for i, (_, state) in enumerate(cluster):
+        state.speed_model = lambda prefs, i=i: ((i + 1) * MB, MB)
+        state.transfer.update({"queued_io_jobs": 4, "average_time_queue": 250, "read_cache_hits": "37"})
+        state.torrents = [{"hash": f"t{i}", "num_seeds": 3, "num_leechs": 2}]
+    exporter = _exporter(cluster)
+
+    async def main():
+        await exporter.poll()
+        await exporter.poll()
+        await exporter.close()
+
+    asyncio.run(main())
+    text = exporter.snapshot().decode()
+
+    (url0, _), (url1, _) = cluster
+    assert text.endswith("# EOF\n")
+    assert _value(text, "qbittorrent_up", instance=url0) == 1
+    assert _value(text, "qbittorrent_up", instance="http://127.0.0.1:1") == 0
+    assert _value(text, "qbittorrent_poll_errors_total", instance="http://127.0.0.1:1") == 2
+    assert _value(text, "qbittorrent_download_rate_bytes_per_second", instance=url1) == 2 * MB
+    assert _value(text, "qbittorrent_dht_nodes", instance=url0) == 300
+    assert _value(text, "qbittorrent_peers", instance=url0) == 5
+    assert _value(text, "qbittorrent_torrents", instance=url1) == 1
+    assert _value(text, "qbittorrent_disk_queued_io_jobs", instance=url0) == 4
+    assert _value(text, "qbittorrent_disk_queue_time_seconds", instance=url0) == 0.25
+    assert _value(text, "qbittorrent_disk_read_cache_hits_ratio", instance=url0) == 0.37
+    assert _value(text, "qbittorrent_tuner_stability_ratio", instance=url0) == 1
+    assert _value(text, "qbittorrent_setting", instance=url0, key="max_connec") == 500
+    assert "# UNIT qbittorrent_download_rate_bytes_per_second bytes_per_second" in text
+    assert "# TYPE qbittorrent_poll_errors counter" in text
+    # Настройки — раз в preferences_every проходов, maindata — дельтами
+    _, state0 = cluster[0]
+    paths = [path for _, path in state0.requests]
+    assert sum(p.startswith("/api/v2/app/preferences") for p in paths) == 1
+    assert sum(p.startswith("/api/v2/sync/maindata") for p in paths) == 2
+
+
+def test_scrape_is_served_from_cache(mock_qbt_cluster):
+    cluster = mock_qbt_cluster(1)
+    (_, state), = cluster
+    exporter = _exporter(cluster, dead=False)
+
+    def scrape(url, accept=""):
+        request = urllib.request.Request(url, headers={"Accept": accept} if accept else {})
+        with urllib.request.urlopen(request) as resp:
+            return resp.headers["Content-Type"], resp.read().decode()
+
+    async def main():
+        await exporter.poll()
+        server = serve_metrics(exporter, ("127.0.0.1", 0))
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            before = len(state.requests)
+            plain = [await asyncio.to_thread(scrape, url) for _ in range(5)]
+            om = await asyncio.to_thread(scrape, url, "application/openmetrics-text")
+            return before, plain, om
+        finally:
+            server.shutdown()
+            await exporter.close()
+
+    before, plain, (om_type, om_text) = asyncio.run(main())
+    assert len(state.requests) == before  # запросы Prometheus не доходят до WebAPI
+    content_type, text = plain[-1]
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "# EOF" not in text and "# UNIT" not in text
+    assert "# TYPE qbittorrent_poll_errors_total counter" in text
+    assert om_type.startswith("application/openmetrics-text") and om_text.endswith("# EOF\n")
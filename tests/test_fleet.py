@@ -0,0 +1,71 @@
+"""Тесты headless-режима для парка машин."""
+
+import configparser
+import json
+import subprocess
+import sys
+
+from optimizer.fleet import process_host, run_fleet, load_inventory
+
+
+def _write_inventory(path):
+    hosts = [
+        {"host": "seed-01", "download": 1000, "upload": 1000, "connection": "FIBER",
+         "storage": "NVME", "ram": 32, "cores": 16, "tracker": "PRIVATE",
+         "role": "UPLOADER", "environment": "SEEDBOX"},
+        {"host": "nas-01", "download": 100, "upload": 50, "connection": "CABLE_DSL",
+         "storage": "HDD", "ram": 4, "cores": 4, "environment": "NAS"},
+        {"host": "broken", "download": 100, "upload": 50, "storage": "FLOPPY",
+         "ram": 4, "cores": 4},
+    ]
+    path.write_text("\n".join(json.dumps(h) for h in hosts), encoding="utf-8")
+
+
+def test_run_fleet_writes_configs_and_summary(tmp_path):
+    inventory = tmp_path / "hosts.jsonl"
+    _write_inventory(inventory)
+    out = tmp_path / "out"
+
+    summary = run_fleet(inventory, out, workers=1)
+
+    assert summary["total"] == 3
+    assert summary["ok"] == 2
+    assert summary["failed"] == 1
+    assert json.loads((out / "summary.json").read_text(encoding="utf-8"))["ok"] == 2
+
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(out / "seed-01" / "qBittorrent.conf", encoding="utf-8")
+    assert config["BitTorrent"]["MaxConnections"] == "200"
+    assert config["Advanced"]["DiskCache"] == "4096"
+
+
+def test_host_cannot_escape_output_dir(tmp_path):
+    out = tmp_path / "out"
+    base = {"download": 100, "upload": 50, "storage": "SSD_SATA", "ram": 8, "cores": 4}
+    for host in ("../../etc", str(tmp_path / "abs"), "..", "a/b", "a\\b", "C:evil"):
+        result = process_host({**base, "host": host}, str(out))
+        assert result["ok"] is False and "Invalid host name" in result["error"], host
+    assert not (tmp_path / "etc").exists() and not (tmp_path / "abs").exists()
+    assert process_host({**base, "host": "seed.example.org"}, str(out))["ok"]
+
+
+def test_load_inventory_csv(tmp_path):
+    inventory = tmp_path / "hosts.csv"
+    inventory.write_text(
+        "host,download,upload,storage,ram,cores,use_vpn\n"
+        "box-1,300,100,SSD_SATA,8,4,true\n",
+        encoding="utf-8",
+    )
+    records = load_inventory(inventory)
+    assert records == [{
+        "host": "box-1", "download": "300", "upload": "100", "storage": "SSD_SATA",
+        "ram": "8", "cores": "4", "use_vpn": "true",
+    }]
+
+
+def test_headless_cli_does_not_import_pyqt():
+    code = (
+        "import sys, optimizer.cli, optimizer.fleet; "
+        "sys.exit(any(m.startswith('PyQt') for m in sys.modules))"
+    )
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
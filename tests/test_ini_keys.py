@@ -0,0 +1,81 @@
+import configparser
+from dataclasses import fields
+
+import pytest
+
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.config_manager import ConfigManager
+from optimizer.ini_keys import LEGACY_KEYS, SESSION_KEYS, keys_for, listening_port, parse_version
+from optimizer.models import (
+    ConnectionType, EnvironmentProfile, HardwareSettings, NetworkSettings, OptimizedSettings,
+    StorageType, TrackerType, UsageSettings, UserRole,
+)
+
+
+def _settings():
+    return calculate_optimal_settings(
+        NetworkSettings(300, 100, ConnectionType.FIBER, True, "wg0", True, "host-1"),
+        HardwareSettings(storage_type=StorageType.SSD_SATA, ram_gb=16, cpu_cores=8),
+        UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER, EnvironmentProfile.SYSTEM),
+    )
+
+
+def _expected(settings, name):
+    if name == "listening_port":
+        return listening_port(settings.listening_port)
+    return getattr(settings, name)
+
+
+def _write(tmp_path, settings, version):
+    path = tmp_path / "qBittorrent.ini"
+    path.write_text("[BitTorrent]\nSession\\QueueingSystemEnabled=true\n", encoding="utf-8")
+    mgr = ConfigManager()
+    mgr.config_path = path
+    assert mgr.apply_settings(settings, version)
+    config = configparser.ConfigParser(interpolation=None)
+    config.optionxform = str
+    config.read(path, encoding="utf-8")
+    return mgr, config
+
+
+@pytest.mark.parametrize("version", ["v4.3.9", "4.6.2", "v5.0.1", None])
+def test_every_key_round_trips(tmp_path, version):
+    settings = _settings()
+    assert settings.network_interface == "wg0" and listening_port(settings.listening_port)
+    mgr, config = _write(tmp_path, settings, version)
+
+    keys = keys_for(parse_version(version) if version else None)
+    for key in keys:
+        raw = config[key.section][key.key]
+        expected = True if key.field is None else _expected(settings, key.field)
+        assert key.codec.decode(raw) == expected, f"{key.section}/{key.key}"
+    assert config["BitTorrent"]["Session\\QueueingSystemEnabled"] == "true"  # чужие ключи целы
+
+    read = mgr.read_settings(version)
+    for name, value in read.items():
+        assert value == _expected(settings, name), name
+
+
+def test_mapping_covers_all_computed_fields():
+    computed = {f.name for f in fields(OptimizedSettings)} - {
+        "super_seeding", "warnings", "explanations", "memory_budget",  # не глобальные ключи INI
+    }
+    assert {k.field for k in SESSION_KEYS} - {None} == computed
+    assert all(k.section == "BitTorrent" and k.key.startswith("Session\\") for k in SESSION_KEYS)
+
+
+def test_keys_depend_on_version():
+    def names(version):
+        return {k.key for k in keys_for(version)}
+
+    old, new, v5 = names((4, 3, 9)), names((4, 6, 2)), names((5, 0))
+    assert "Session\\UseOSCache" in old and "Session\\DiskIOReadMode" not in old
+    # 4.4–4.6 бывают и с libtorrent 1.2 — кэш пишется всегда
+    assert "Session\\DiskCacheSize" in old & new
+    assert "Session\\HashingThreadsCount" not in old
+    assert {"Session\\DiskIOReadMode", "Session\\DiskIOWriteMode", "Session\\HashingThreadsCount"} <= new
+    assert "Session\\UseOSCache" not in new and v5 == new
+    # Прежние секции — только когда версия неизвестна
+    assert not {k.key for k in LEGACY_KEYS} & (old | new)
+    assert {k.key for k in LEGACY_KEYS} <= names(None)
+    assert parse_version("v5.0.0beta1") == (5, 0, 0) and parse_version("unknown") is None
@@ -0,0 +1,119 @@
+import codecs
+import os
+import subprocess
+import sys
+
+import pytest
+
+from optimizer.ini_patch import ConfigLockedError, held_lock, patch_file, patch_ini
+
+ORIGINAL = (
+    "; qBittorrent config\r\n"
+    "[BitTorrent]\r\n"
+    "Session\\Port=6881\r\n"
+    "# keep me\r\n"
+    "Session\\MaxConnections = 100\r\n"
+    "Session\\QueueingSystemEnabled=true\r\n"
+    "\r\n"
+    "[Preferences]\r\n"
+    "WebUI\\Port=8080\r\n"
+    "WebUI\\Password_PBKDF2=\"@ByteArray(a=b==)\""
+)
+
+
+def test_patch_keeps_every_other_byte():
+    patched = patch_ini(ORIGINAL, {
+        ("BitTorrent", "Session\\MaxConnections"): "500",
+        ("BitTorrent", "Session\\DHTEnabled"): "false",
+        ("Preferences", "WebUI\\Port"): "8080",
+        ("Preferences", "Connection\\Interface"): "wg0",
+        ("Meta", "MigrationVersion"): "6",
+    })
+    assert patched == (
+        "; qBittorrent config\r\n"
+        "[BitTorrent]\r\n"
+        "Session\\Port=6881\r\n"
+        "# keep me\r\n"
+        "Session\\MaxConnections = 500\r\n"
+        "Session\\QueueingSystemEnabled=true\r\n"
+        "Session\\DHTEnabled=false\r\n"
+        "\r\n"
+        "[Preferences]\r\n"
+        "WebUI\\Port=8080\r\n"
+        "WebUI\\Password_PBKDF2=\"@ByteArray(a=b==)\"\r\n"
+        "Connection\\Interface=wg0\r\n"
+        "\r\n"
+        "[Meta]\r\n"
+        "MigrationVersion=6\r\n"
+    )
+    assert patch_ini("", {("BitTorrent", "Session\\Port"): "1"}) == "[BitTorrent]\nSession\\Port=1\n"
+
+
+def test_patch_file_is_idempotent_and_keeps_bom(tmp_path):
+    path = tmp_path / "qBittorrent.ini"
+    path.write_bytes(codecs.BOM_UTF8 + ORIGINAL.encode())
+    updates = {("BitTorrent", "Session\\Port"): "51234"}
+
+    assert patch_file(path, updates) is True
+    data = path.read_bytes()
+    assert data.startswith(codecs.BOM_UTF8) and b"Session\\Port=51234\r\n" in data
+    mtime = path.stat().st_mtime_ns
+    assert patch_file(path, updates) is False and path.stat().st_mtime_ns == mtime
+
+
+def test_failed_write_leaves_original_intact(tmp_path, monkeypatch):
+    path = tmp_path / "qBittorrent.ini"
+    path.write_bytes(ORIGINAL.encode())
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", crash)
+    with pytest.raises(OSError):
+        patch_file(path, {("BitTorrent", "Session\\Port"): "1"})
+    assert path.read_bytes() == ORIGINAL.encode()
+    assert os.listdir(tmp_path) == ["qBittorrent.ini"]  # временный файл убран
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+def test_write_keeps_file_mode(tmp_path):
+    path = tmp_path / "qBittorrent.ini"
+    path.write_bytes(ORIGINAL.encode())
+    path.chmod(0o640)
+    assert patch_file(path, {("BitTorrent", "Session\\Port"): "1"})
+    assert path.stat().st_mode & 0o777 == 0o640
+
+    fresh = tmp_path / "new.ini"
+    assert patch_file(fresh, {("BitTorrent", "Session\\Port"): "1"})
+    assert fresh.stat().st_mode & 0o777 == 0o644  # не 0600 от mkstemp
+
+
+def test_refuses_while_qbittorrent_holds_lock(tmp_path):
+    path = tmp_path / "qBittorrent.ini"
+    path.write_text("[BitTorrent]\n", encoding="utf-8")
+    updates = {("BitTorrent", "Session\\Port"): "1"}
+
+    # QLockFile: PID живого процесса → занят, завершившегося → устаревший
+    lock = tmp_path / "qBittorrent.ini.lock"
+    lock.write_text(f"{os.getpid()}\nqbittorrent\nhost\n")
+    with pytest.raises(ConfigLockedError):
+        patch_file(path, updates)
+    assert path.read_text(encoding="utf-8") == "[BitTorrent]\n"
+    assert patch_file(path, updates, force=True)
+
+    done = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    lock.write_text(f"{done.stdout.strip()}\nqbittorrent\nhost\n")
+    assert held_lock(path) is None
+
+
+def test_detects_flock_on_profile_lockfile(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    path = tmp_path / "qBittorrent.ini"
+    lockfile = tmp_path / "lockfile"
+    lockfile.touch()
+    assert held_lock(path) is None  # файл остаётся после выхода qBittorrent — это не блокировка
+
+    with open(lockfile, "r+") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert held_lock(path) == lockfile
+    assert held_lock(path) is None
@@ -0,0 +1,31 @@
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.library_scanner import bdecode, library_from_webapi, scan_bt_backup, torrent_size
+
+GB = 1024 ** 3
+
+
+def test_bdecode_and_sizes():
+    assert bdecode(b"d3:agei42e4:listl1:ai-1eee") == {b"age": 42, b"list": [b"a", -1]}
+    # v1 многофайловый и v2 file tree
+    assert torrent_size({b"info": {b"files": [{b"length": 10}, {b"length": 5}]}}) == 15
+    tree = {b"dir": {b"a.mkv": {b"": {b"length": 7}}}, b"b.nfo": {b"": {b"length": 3}}}
+    assert torrent_size({b"info": {b"file tree": tree}}) == 10
+
+
+def test_scan_bt_backup(tmp_path):
+    (tmp_path / "aa.fastresume").write_bytes(b"de")
+    (tmp_path / "aa.torrent").write_bytes(b"d4:infod6:lengthi%dee" % (3 * GB) + b"e")
+    (tmp_path / "bb.fastresume").write_bytes(b"de")  # magnet без метаданных
+    (tmp_path / "cc.fastresume").write_bytes(b"de")
+    (tmp_path / "cc.torrent").write_bytes(b"broken")
+
+    assert scan_bt_backup(tmp_path) == (3, 3.0)
+
+
+def test_library_from_webapi(mock_qbt):
+    url, state = mock_qbt
+    state.torrents = [{"total_size": 2 * GB}, {"total_size": GB // 2}]
+    manager = BenchmarkManager(url)
+    assert manager.connect("admin", "admin")
+
+    assert library_from_webapi(manager) == (2, 2.5)
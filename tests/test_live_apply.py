@@ -0,0 +1,74 @@
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.live_apply import apply_live, preference_diff, settings_to_preferences
+from optimizer.models import (
+    ConnectionType, EncryptionMode, EnvironmentProfile, HardwareSettings, NetworkSettings,
+    ProtocolMode, StorageType, TrackerType, UsageSettings, UserRole,
+)
+
+
+def _settings():
+    return calculate_optimal_settings(
+        NetworkSettings(500, 100, ConnectionType.FIBER, False),
+        HardwareSettings(storage_type=StorageType.NVME, ram_gb=16, cpu_cores=8),
+        UsageSettings(TrackerType.PRIVATE, UserRole.SEEDER, EnvironmentProfile.SYSTEM),
+    )
+
+
+def _manager(mock_qbt):
+    url, state = mock_qbt
+    manager = BenchmarkManager(url)
+    assert manager.connect()
+    return manager, state
+
+
+def test_preferences_cover_computed_fields():
+    settings = _settings()
+    prefs = settings_to_preferences(settings)
+    assert prefs["bittorrent_protocol"] == {ProtocolMode.UTP_TCP: 0, ProtocolMode.TCP_ONLY: 1, ProtocolMode.UTP_ONLY: 2}[settings.protocol_mode]
+    assert prefs["encryption"] == {EncryptionMode.PREFER: 0, EncryptionMode.REQUIRE: 1, EncryptionMode.DISABLED: 2}[settings.encryption_mode]
+    assert prefs["send_buffer_watermark"] == settings.send_buffer_watermark_kb
+    assert prefs["send_buffer_watermark_factor"] == settings.send_buffer_factor
+    assert prefs["hashing_threads"] == settings.hashing_threads == 4
+    assert (prefs["dht"], prefs["pex"], prefs["lsd"]) == (settings.enable_dht, settings.enable_pex, settings.enable_lsd)
+    assert prefs["up_limit"] == settings.global_upload_limit_kbps * 1024
+    assert "listen_port" not in prefs  # «Стандартный» — порт не трогаем
+
+    # 0 и -1 — оба «без ограничений»; флаги сравниваются с 0/1
+    changes, unsupported = preference_diff(
+        {"dl_limit": -1, "dht": 1, "max_connec": "200"},
+        {"dl_limit": 0, "dht": True, "max_connec": 200, "hashing_threads": 2},
+    )
+    assert changes == {} and unsupported == ["hashing_threads"]
+
+
+def test_apply_pushes_minimal_diff_once_and_verifies(mock_qbt):
+    manager, state = _manager(mock_qbt)
+    settings = _settings()
+    state.prefs.update({"max_active_downloads": settings.max_active_downloads, "dht": not settings.enable_dht})
+
+    result = apply_live(manager, settings)
+    assert result.ok, result.summary()
+    assert len(state.set_calls) == 1
+    assert state.set_calls[0] == result.changed
+    assert set(result.changed) <= {"max_connec", "max_uploads", "async_io_threads", "send_buffer_watermark", "disk_cache", "dht"}
+    assert "dht" in result.changed and "max_active_downloads" in result.unchanged
+    assert result.previous["dht"] == (not settings.enable_dht)
+    assert "hashing_threads" in result.unsupported  # старый mock — ключа нет
+    # Повторное применение ничего не отправляет
+    again = apply_live(manager, settings)
+    assert again.ok and again.changed == {} and len(state.set_calls) == 1
+
+
+def test_rejected_key_is_reported(mock_qbt):
+    manager, state = _manager(mock_qbt)
+    settings = _settings()
+    real_set = manager.set_preferences
+    manager.set_preferences = lambda prefs: real_set({k: v for k, v in prefs.items() if k != "max_connec"})
+
+    result = apply_live(manager, settings)
+    assert not result.ok
+    assert result.mismatched == {"max_connec": (settings.max_connections_global, 500)}
+
+    dry = apply_live(manager, settings, dry_run=True)
+    assert list(dry.changed) == ["max_connec"] and len(state.set_calls) == 1
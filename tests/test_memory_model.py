@@ -0,0 +1,46 @@
+from optimizer.models import (
+    NetworkSettings, HardwareSettings, UsageSettings,
+    ConnectionType, StorageType, EnvironmentProfile, TrackerType, UserRole
+)
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.memory_model import COMPONENTS, CONNECTIONS_FLOOR, estimate_memory
+
+NETWORK = NetworkSettings(1000, 1000, ConnectionType.FIBER, False)
+
+
+def test_budget_fits_without_changes():
+    hardware = HardwareSettings(StorageType.NVME, 32, 8)
+    usage = UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER)
+    result = calculate_optimal_settings(NETWORK, hardware, usage)
+
+    budget = result.memory_budget
+    assert set(COMPONENTS) <= set(budget)
+    assert budget["limit"] == 32 * 1024 * 0.5
+    assert budget["total"] <= budget["limit"]
+    assert not any(w.startswith("🧠") for w in result.warnings)
+    assert "memory" in result.explanations
+
+
+def test_small_nas_is_scaled_down():
+    # 4 ГБ NAS, огромная библиотека, qBittorrent может занять 25% RAM
+    hardware = HardwareSettings(StorageType.HDD, 4, 4, ram_share=0.25)
+    usage = UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER, EnvironmentProfile.NAS, 3000, 2000)
+    result = calculate_optimal_settings(NETWORK, hardware, usage)
+
+    assert result.disk_cache_mb < 512
+    assert result.max_connections_global >= CONNECTIONS_FLOOR
+    assert result.memory_budget["total"] <= result.memory_budget["limit"] == 1024
+    assert any("снижено" in w for w in result.warnings)
+    # Бюджет в отчёте совпадает с повторной оценкой итоговых настроек
+    parts = estimate_memory(result, hardware, usage)
+    assert round(parts["disk_cache"], 1) == result.memory_budget["disk_cache"]
+
+
+def test_zfs_cache_is_never_raised_or_scaled():
+    hardware = HardwareSettings(StorageType.HDD, 4, 4, ram_share=0.1)
+    usage = UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER, EnvironmentProfile.TRUENAS, 20000, 250000)
+    result = calculate_optimal_settings(NETWORK, hardware, usage)
+
+    assert result.disk_cache_mb == 0
+    assert result.memory_budget["total"] > result.memory_budget["limit"]
+    assert any("Даже после снижения" in w for w in result.warnings)
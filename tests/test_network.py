@@ -23,3 +23,20 @@ def test_test_upload_speed_success(mocker):
     # 2MB * 4 threads = 8MB. 8MB * 8 / 1s / 1MB = 64 Mbps.
     speed = NetworkTester.test_upload_speed_mbps()
     assert speed == 64.0
+
+def test_rtt_idle_and_loaded(mocker):
+    mocker.patch.object(NetworkTester, 'get_best_server', return_value={"name": "TestServer", "url": "https://dummy.url"})
+    mocker.patch.object(NetworkTester, '_download_chunk', return_value=0)
+    mocker.patch("socket.getaddrinfo", return_value=[(2, 1, 6, "", ("10.0.0.1", 443))])
+    mocker.patch("time.sleep")
+    # Простой: 10..19 мс; под нагрузкой: 50..59 мс и один таймаут
+    samples = [10 + i for i in range(10)] + [50 + i for i in range(9)] + [None]
+    rtt = mocker.patch.object(NetworkTester, '_tcp_rtt_ms', side_effect=samples)
+
+    result = NetworkTester.test_rtt_ms(samples=10)
+
+    assert rtt.call_args.args[0] == ("10.0.0.1", 443)
+    assert result["idle"] == {"samples": 10, "min": 10, "p50": 14, "p90": 18, "max": 19, "jitter": 4}
+    assert result["loaded"]["samples"] == 9
+    assert result["loaded"]["p50"] == 54
+    assert result["server"] == "TestServer"
@@ -0,0 +1,53 @@
+import configparser
+
+from optimizer.models import (
+    NetworkSettings, HardwareSettings, UsageSettings,
+    ConnectionType, StorageType, EnvironmentProfile, TrackerType, UserRole
+)
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.config_manager import ConfigManager
+from optimizer.partition import SHARED_LIMITS, instance_config_paths, partition_settings
+
+NETWORK = NetworkSettings(10000, 10000, ConnectionType.FIBER, False, port_seed="box-1")
+HARDWARE = HardwareSettings(StorageType.NVME, 128, 32)
+USAGE = UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER, EnvironmentProfile.SEEDBOX, 20000, 400000)
+
+
+def test_partition_splits_box_between_instances():
+    single = calculate_optimal_settings(NETWORK, HARDWARE, USAGE)
+    parts = partition_settings(NETWORK, HARDWARE, USAGE, 4)
+
+    assert len(parts) == 4
+    ports = [int(p.listening_port.split("(")[1].rstrip(")")) for p in parts]
+    assert ports == list(range(ports[0], ports[0] + 4))
+    assert all(49152 <= port <= 65535 for port in ports)
+
+    first = parts[0]
+    assert first.global_upload_limit_kbps == single.global_upload_limit_kbps // 4
+    assert first.async_io_threads == single.async_io_threads // 4
+    assert sum(p.memory_budget["limit"] for p in parts) <= single.memory_budget["limit"]
+    assert "instance" in first.explanations
+    # Лимиты из уровней среды (SEEDBOX) не умножаются на число экземпляров
+    for name, key in SHARED_LIMITS.items():
+        assert sum(getattr(p, name) for p in parts) <= getattr(single, name), name
+        assert "÷ 4" in first.explanations[key], key
+    assert first.max_connections_per_torrent <= first.max_connections_global
+    assert first.max_active_torrents <= first.max_active_downloads + first.max_active_uploads
+    # Изменяемые поля не разделяются между экземплярами
+    first.warnings.append("x")
+    assert "x" not in parts[1].warnings
+
+
+def test_config_manager_writes_instance_configs(tmp_path):
+    parts = partition_settings(NETWORK, HARDWARE, USAGE, 3)
+    paths = instance_config_paths(tmp_path, 3)
+
+    assert ConfigManager().apply_instances(parts, paths) == [True, True, True]
+
+    written = []
+    for path in paths:
+        config = configparser.ConfigParser(interpolation=None)
+        config.optionxform = str
+        config.read(path, encoding="utf-8")
+        written.append(config["Connection"]["PortRangeMin"])
+    assert len(set(written)) == 3
@@ -0,0 +1,76 @@
+import math
+
+import pytest
+
+from optimizer.rrd import ARCHIVES, RoundRobinStore, archive_name
+
+T0 = 1_699_999_200.0  # кратно часу
+
+
+def _sample(dl):
+    return {"dl_speed": dl, "ul_speed": 1.0, "dht_nodes": 300, "peers": 5}
+
+
+def test_file_size_is_fixed(tmp_path):
+    path = tmp_path / "a.rrd"
+    with RoundRobinStore(path) as store:
+        size = path.stat().st_size
+        for i in range(5000):
+            store.update(_sample(i), T0 + i)
+    assert path.stat().st_size == size
+    rows = sum(r for _, r in ARCHIVES)
+    assert size == 4096 + rows * (2 + 4 * 4) * 8
+
+
+def test_rollups_min_avg_max_last(tmp_path):
+    with RoundRobinStore(tmp_path / "a.rrd") as store:
+        for i in range(180):
+            store.update(_sample(float(i)), T0 + i)
+
+        raw = store.fetch("dl_speed", T0 + 170)
+        assert raw["step"] == 1
+        assert raw["timestamp"] == [T0 + i for i in range(170, 180)]
+        assert raw["avg"] == [float(i) for i in range(170, 180)]
+
+        minutes = store.fetch("dl_speed", T0, step=60)
+        assert minutes["timestamp"] == [T0, T0 + 60, T0 + 120]
+        assert minutes["count"] == [60, 60, 60]
+        assert minutes["min"] == [0.0, 60.0, 120.0]
+        assert minutes["max"] == [59.0, 119.0, 179.0]
+        assert minutes["last"] == minutes["max"]
+        assert minutes["avg"] == pytest.approx([29.5, 89.5, 149.5])
+
+        hour = store.summary("dl_speed", T0, T0 + 3599)
+        assert hour["samples"] == 180 and hour["avg"] == pytest.approx(89.5)
+
+
+def test_window_picks_archive_by_depth_and_skips_stale_rows(tmp_path):
+    with RoundRobinStore(tmp_path / "a.rrd") as store:
+        store.update(_sample(1.0), T0)
+        # Через два часа: ячейки секундного архива перезаписаны не все,
+        # но старые данные не попадают в окно — время начала не совпадает
+        store.update(_sample(2.0), T0 + 7200)
+        assert store.fetch("dl_speed", T0 + 7200 - 3000)["avg"] == [2.0]
+        assert store.fetch("dl_speed", T0 + 7200 - 3000)["step"] == 1
+
+        day = store.fetch("dl_speed", T0 - 3600)
+        assert day["step"] == 60 and day["avg"] == [1.0, 2.0]
+
+        year = store.fetch("dl_speed", T0 - 30 * 86400)
+        assert year["step"] == 3600 and year["timestamp"] == [T0, T0 + 7200]
+
+
+def test_reopen_keeps_history_and_checks_layout(tmp_path):
+    path = tmp_path / "a.rrd"
+    with RoundRobinStore(path) as store:
+        store.update(_sample(42.0), T0 + 5)
+    with RoundRobinStore(path) as store:
+        assert store.last_update == T0 + 5
+        assert store.fetch("peers", T0)["last"] == [5.0]
+        assert math.isnan(store._data[store._column(0, 0)])
+    with pytest.raises(ValueError):
+        RoundRobinStore(path, fields=("dl_speed",))
+
+
+def test_archive_name():
+    assert archive_name("http://Seed-1:8080/") == "seed-1_8080.rrd"
@@ -0,0 +1,72 @@
+import threading
+
+from optimizer.sampler import SamplingService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_one_poll_fans_out_to_all_subscribers():
+    calls = []
+    clock = FakeClock()
+    service = SamplingService(lambda: calls.append(1) or {"dl_speed": 5, "ul_speed": 0}, clock=clock)
+    cards, recorder = [], []
+    service.subscribe(cards.append)
+    unsubscribe = service.subscribe(recorder.append)
+
+    assert service.next_delay() == 0.0
+    service.poll()
+    assert len(calls) == 1 and cards == recorder and cards[0]["dl_speed"] == 5
+    assert service.next_delay() == 1.0
+
+    unsubscribe()
+    clock.now += 1.0
+    service.poll()
+    assert len(cards) == 2 and len(recorder) == 1
+
+
+def test_interval_backs_off_when_idle_and_speeds_up_when_recording():
+    clock = FakeClock()
+    traffic = {"dl_speed": 0, "ul_speed": 0}
+    service = SamplingService(lambda: dict(traffic), idle_after=2, max_interval=4.0, clock=clock)
+
+    intervals = []
+    for _ in range(5):
+        service.poll()
+        intervals.append(service.interval)
+        clock.now += service.interval
+    assert intervals == [1.0, 2.0, 4.0, 4.0, 4.0]
+    assert service.next_delay() == 0.0
+
+    service.poll()  # следующий опрос через 4 сек — запись подтягивает его
+    service.set_fast("recording", True)
+    assert service.interval == 0.5 and service.next_delay() == 0.5
+    traffic["ul_speed"] = 10
+    service.set_fast("recording", False)
+    clock.now += 0.5
+    service.poll()
+    assert service.interval == 1.0
+
+
+def test_lagging_poll_reports_merged_intervals():
+    clock = FakeClock()
+    service = SamplingService(lambda: {"dl_speed": 1}, clock=clock)
+    service.poll()
+    clock.now += 3.5  # ответ/команда задержали опрос на 2.5 интервала
+    assert service.poll()["merged"] == 2
+    clock.now += 1.0
+    assert service.poll()["merged"] == 0
+
+
+def test_run_loop_stops():
+    stop = threading.Event()
+    samples = []
+    service = SamplingService(lambda: {"dl_speed": 1}, interval=0.01)
+    service.subscribe(lambda s: (samples.append(s), len(samples) >= 3 and stop.set()))
+    service.run(stop)
+    assert len(samples) == 3
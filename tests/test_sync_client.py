@@ -0,0 +1,71 @@
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.sync_client import MaindataMirror, MaindataSync
+
+
+def test_mirror_applies_deltas():
+    mirror = MaindataMirror()
+    mirror.apply({
+        "rid": 1,
+        "full_update": True,
+        "server_state": {"dl_info_speed": 10, "up_info_speed": 20, "dht_nodes": 5},
+        "torrents": {
+            "a": {"dlspeed": 1, "state": "downloading", "num_seeds": 3, "num_leechs": 1},
+            "b": {"upspeed": 2, "num_leechs": 5},
+        },
+        "categories": {"tv": {"name": "tv", "savePath": "/tv"}},
+        "tags": ["x", "y"],
+    })
+    mirror.apply({
+        "rid": 2,
+        "server_state": {"up_info_speed": 30},
+        "torrents": {"a": {"dlspeed": 7, "num_seeds": 6}},
+        "torrents_removed": ["b"],
+        "categories_removed": ["tv"],
+        "tags_removed": ["x"],
+    })
+
+    assert mirror.rid == 2
+    stats = mirror.main_stats()
+    assert stats.pop("monotonic") > 0
+    assert stats == {
+        "dl_speed": 10, "ul_speed": 30, "dht_nodes": 5, "connection_status": "unknown", "peers": 7,
+    }
+    assert mirror.torrents == {
+        "a": {"dlspeed": 7, "state": "downloading", "num_seeds": 6, "num_leechs": 1, "hash": "a"},
+    }
+    assert mirror.torrent_stats("a")["state"] == "downloading"
+    assert mirror.torrent_stats("b") is None
+    assert mirror.categories == {} and mirror.tags == {"y"}
+    assert mirror.last_changed == 2
+
+    mirror.apply({"rid": 9, "full_update": True, "torrents": {"c": {}}})
+    assert list(mirror.torrents) == ["c"] and mirror.server_state == {} and mirror.peers == 0
+
+
+def test_sync_fetches_only_changes(mock_qbt):
+    url, state = mock_qbt
+    state.speed_model = lambda prefs: (1000, 500)
+    state.torrents = [
+        {"hash": f"h{i}", "dlspeed": 0, "upspeed": 0, "progress": 1.0, "state": "stalledUP", "num_seeds": 0}
+        for i in range(200)
+    ]
+    manager = BenchmarkManager(url)
+    assert manager.connect()
+    sync = MaindataSync(manager)
+
+    assert sync.update()
+    assert state.sync_responses[-1]["full_update"] and len(sync.mirror.torrents) == 200
+
+    state.torrents[3]["upspeed"] = 4096
+    state.torrents[3]["state"] = "uploading"
+    del state.torrents[150]
+    assert sync.update()
+    delta = state.sync_responses[-1]
+    assert delta["torrents"] == {"h3": {"upspeed": 4096, "state": "uploading"}}
+    assert delta["torrents_removed"] == ["h150"] and "server_state" not in delta
+    assert sync.torrent_stats("h3")["ul_speed"] == 4096
+    assert len(sync.mirror.torrents) == 199
+
+    assert sync.update()
+    assert state.sync_responses[-1] == {"rid": sync.mirror.rid}  # ничего не изменилось
+    assert sync.main_stats()["ul_speed"] == 500
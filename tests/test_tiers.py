@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from optimizer.models import (
+    NetworkSettings, HardwareSettings, UsageSettings,
+    ConnectionType, StorageType, EnvironmentProfile,
+    TrackerType, UserRole, ProtocolMode
+)
+from optimizer.calculator import calculate_optimal_settings
+from optimizer.tiers import TierTable, DEFAULT_TIERS, DEFAULT_TIER_TABLE
+
+
+def test_ladder_bounds_follow_calculator_thresholds():
+    conn = DEFAULT_TIER_TABLE.sections["connections"]
+    ladder = conn.index[(TrackerType.PUBLIC, EnvironmentProfile.SYSTEM)]
+    assert [ladder.index_for(v) for v in (99, 100, 499, 500)] == [0, 1, 1, 2]
+
+    net = DEFAULT_TIER_TABLE.sections["network"]
+    ladder = net.index[(EnvironmentProfile.SYSTEM,)]
+    # up_to: 100 Мбит/с ещё в первой ступени
+    assert [ladder.index_for(v) for v in (100, 101, 500, 501)] == [0, 1, 1, 2]
+
+
+def test_site_table_from_json(tmp_path):
+    site = {
+        "network": {
+            "select": ["environment"],
+            "rules": [
+                {"tiers": [
+                    {"send_buffer_watermark_kb": 2048, "send_buffer_low_watermark_kb": 64,
+                     "send_buffer_factor": 110, "socket_backlog_size": 64,
+                     "outgoing_connections_per_second": 150, "protocol_mode": "UTP_TCP",
+                     "explanations": {"send_buffer": "Site: {send_buffer_watermark_kb} КБ."}},
+                ]},
+            ],
+        },
+    }
+    path = tmp_path / "tiers.json"
+    path.write_text(json.dumps(site), encoding="utf-8")
+    table = TierTable.from_json(path)
+
+    network = NetworkSettings(1000, 1000, ConnectionType.CABLE_DSL, False)
+    hardware = HardwareSettings(StorageType.NVME, 32, 8)
+    usage = UsageSettings(TrackerType.PUBLIC, UserRole.SEEDER, EnvironmentProfile.SEEDBOX)
+
+    settings = calculate_optimal_settings(network, hardware, usage, tiers=table)
+    assert settings.send_buffer_watermark_kb == 2048
+    assert settings.protocol_mode == ProtocolMode.UTP_TCP
+    assert settings.explanations["send_buffer"] == "Site: 2048 КБ."
+    # Остальные разделы — из таблицы по умолчанию
+    assert settings.max_connections_global == 2000
+
+
+def test_invalid_table_is_rejected():
+    spec = json.loads(json.dumps(DEFAULT_TIERS))
+    spec["queue"]["rules"][1]["tiers"][0]["below"] = 500
+    with pytest.raises(ValueError, match="ascending"):
+        TierTable(spec)
+
+    spec = json.loads(json.dumps(DEFAULT_TIERS))
+    spec["disk_io"]["rules"].pop()  # NVMe без правила
+    with pytest.raises(ValueError, match="no rule matches"):
+        TierTable(spec)
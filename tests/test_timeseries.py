@@ -0,0 +1,107 @@
+import random
+import statistics
+
+import pytest
+
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.timeseries import MB, CounterRates, P2Quantile, TimeSeries
+
+
+def _samples(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        {"timestamp": float(i), "dl_speed": rng.uniform(5, 15) * MB, "ul_speed": rng.uniform(1, 3) * MB,
+         "dht_nodes": 300 + i % 7, "peers": rng.randrange(50)}
+        for i in range(n)
+    ]
+
+
+def test_ring_window_statistics_match_recomputation():
+    samples = _samples(500)
+    series = TimeSeries(capacity=30)
+    for s in samples:
+        series.append(s)
+
+    window = samples[-30:]
+    dl = [s["dl_speed"] for s in window]
+    assert len(series) == 30 and series.total == 500
+    assert series.timestamps() == [s["timestamp"] for s in window]
+    assert series.values("dl_speed") == dl
+    assert series.stats["dl_speed"].mean == pytest.approx(statistics.fmean(dl))
+    assert series.stats["dl_speed"].std == pytest.approx(statistics.pstdev(dl))
+    assert series.stats["peers"].mean == pytest.approx(statistics.fmean(s["peers"] for s in window))
+
+
+def test_analysis_matches_two_pass_formula():
+    samples = _samples(40)
+    dl = [s["dl_speed"] for s in samples]
+    mean = sum(dl) / len(dl)
+    std = (sum((x - mean) ** 2 for x in dl) / len(dl)) ** 0.5
+
+    analysis = BenchmarkManager.analyze_results(samples)
+    assert analysis["samples"] == 40
+    assert analysis["avg_dl_mbps"] == round(mean / MB, 2)
+    assert analysis["stability_score"] == round(100 - min(100, std / mean * 100), 1)
+    assert analysis["avg_dht"] == int(sum(s["dht_nodes"] for s in samples) / 40)
+    assert analysis["p50_dl_mbps"] == pytest.approx(10, abs=0.5)
+    assert BenchmarkManager.analyze_results([]) == {}
+
+
+@pytest.mark.parametrize("p", [0.5, 0.95, 0.99])
+def test_p2_quantile_estimates(p):
+    rng = random.Random(7)
+    data = [rng.expovariate(1.0) for _ in range(20000)]
+    estimator = P2Quantile(p)
+    for x in data:
+        estimator.add(x)
+    exact = sorted(data)[int(p * len(data))]
+    assert estimator.value == pytest.approx(exact, rel=0.05)
+
+    small = P2Quantile(p)
+    for x in (3, 1, 2):
+        small.add(x)
+    assert small.value == (2 if p == 0.5 else 3)
+
+
+def test_counter_rates_are_exact_under_jitter():
+    # Реальная скорость 2 МБ/с; опрос с дрожанием и пропущенными тиками,
+    # «мгновенное» значение qBittorrent врёт (сглаживание)
+    rng = random.Random(9)
+    rates = CounterRates()
+    series = TimeSeries(capacity=100)
+    t, data = 50.0, 10 * MB
+    samples = []
+    for _ in range(40):
+        t += rng.choice([0.5, 1.0, 1.0, 1.3, 3.0])
+        data = 10 * MB + (t - 50.0) * 2 * MB
+        sample = rates.apply({"dl_speed": 5 * MB, "monotonic": t, "dl_data": data, "ul_data": 0})
+        samples.append(sample)
+        series.append(sample)
+
+    assert samples[0]["dt"] == 0.0 and samples[0]["dl_speed"] == 5 * MB
+    assert all(s["dl_speed"] == pytest.approx(2 * MB) for s in samples[1:])
+    assert series.mean_rate("dl_speed") == pytest.approx(2 * MB)
+    assert series.analysis()["avg_dl_mbps"] == 2.0
+    assert BenchmarkManager.analyze_results(series.samples())["avg_dl_mbps"] == 2.0
+
+
+def test_counter_reset_falls_back_to_instant_speed():
+    rates = CounterRates()
+    rates.apply({"dl_speed": 1, "monotonic": 1.0, "dl_data": 1000, "ul_data": 10})
+    restarted = rates.apply({"dl_speed": 7, "monotonic": 2.0, "dl_data": 50, "ul_data": 0})
+    assert restarted["dl_speed"] == 7 and restarted["dt"] == 0.0
+    after = rates.apply({"dl_speed": 7, "monotonic": 4.0, "dl_data": 250, "ul_data": 100})
+    assert after["dl_speed"] == 100 and after["ul_speed"] == 50
+    no_counters = {"dl_speed": 3}
+    assert rates.apply(no_counters) == {"dl_speed": 3}
+
+
+def test_window_eviction_keeps_counter_sums():
+    series = TimeSeries(capacity=3)
+    rates = CounterRates()
+    # Скорости 100, 100, 400, 400 байт/с на интервалах 1, 1, 2, 1 сек
+    for t, data in [(0, 0), (1, 100), (2, 200), (4, 1000), (5, 1400)]:
+        series.append(rates.apply({"monotonic": float(t), "dl_data": data, "ul_data": 0}))
+    # В окне последние три интервала: 1 сек × 100, 2 сек × 400, 1 сек × 400
+    assert series.counted_sec == pytest.approx(4.0)
+    assert series.mean_rate("dl_speed") == pytest.approx(325.0)
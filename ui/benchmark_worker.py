@@ -0,0 +1,158 @@
+"""Фоновый поток для всех обращений бенчмарка к qBittorrent WebAPI.
+
+GUI только ставит задачи: команды (подключение, добавление/удаление
+торрента) выполняются по очереди, а между ними поток опрашивает
+qBittorrent по расписанию общего ``SamplingService``. Если ответ или
+команда задержали опрос, пропущенные интервалы сливаются в следующий
+образец (поле ``merged``). Готовые образцы и результаты команд
+возвращаются в GUI сигналами.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Callable, Optional
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.rrd import RoundRobinStore
+from optimizer.sampler import SamplingService
+from optimizer.sync_client import MaindataSync
+
+
+EMPTY_STATS = {"dl_speed": 0, "ul_speed": 0, "dht_nodes": 0}
+
+
+class BenchmarkWorker(QThread):
+    """Поток опроса: одна сессия ``requests`` используется только из него."""
+
+    sample_ready = pyqtSignal(dict)
+    command_finished = pyqtSignal(str, object)
+
+    def __init__(self, manager: BenchmarkManager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.sync = MaindataSync(manager)
+        self.sampler = SamplingService(self._sample)
+        # Карточки и запись получают образцы через сигнал (в потоке GUI)
+        self.sampler.subscribe(self.sample_ready.emit)
+        self._cond = threading.Condition()
+        self._commands: deque = deque()
+        self._torrent_hash: Optional[str] = None
+        # Круглосуточный архив показателей подключённого экземпляра
+        self.archive: Optional[RoundRobinStore] = None
+        self._unsubscribe_archive: Optional[Callable[[], None]] = None
+        # Общие показатели экземпляра, пока образцы — по одному торренту
+        self._instance_stats: Optional[dict] = None
+        self._polling = False
+        self._stopping = False
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Вызовы из GUI
+    # ─────────────────────────────────────────────────────────────────────────
+    def set_polling(self, enabled: bool):
+        """Включить/выключить опрос (после подключения / при отключении)."""
+        with self._cond:
+            self._polling = enabled
+            if enabled:
+                self.sampler.reset()
+            self._cond.notify()
+
+    def set_torrent(self, torrent_hash: Optional[str]):
+        """Показатели конкретного торрента вместо общих (стандартизованный тест)."""
+        with self._cond:
+            if torrent_hash != self._torrent_hash:
+                self.sampler.reset_rates()
+            self._torrent_hash = torrent_hash
+
+    def set_recording(self, enabled: bool):
+        """Во время записи опрос чаще."""
+        with self._cond:
+            self.sampler.set_fast("recording", enabled)
+            self._cond.notify()
+
+    def set_archive(self, archive: Optional[RoundRobinStore]):
+        """Писать образцы в RRD-архив (``None`` — закрыть текущий)."""
+        with self._cond:
+            old, self.archive = self.archive, archive
+            if self._unsubscribe_archive is not None:
+                self._unsubscribe_archive()
+                self._unsubscribe_archive = None
+            if archive is not None:
+                self._unsubscribe_archive = self.sampler.subscribe(self._archive_sample)
+        if old is not None and old is not archive:
+            old.close()
+
+    def submit(self, name: str, func: Callable[..., Any], *args):
+        """Выполнить ``func(*args)`` в потоке; результат — ``command_finished(name, result)``."""
+        with self._cond:
+            self._commands.append((name, func, args))
+            self._cond.notify()
+
+    def reset_sync(self):
+        """Начать копию maindata заново (новый хост или переподключение)."""
+        self.submit("reset_sync", self.sync.mirror.reset)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._commands.clear()
+            self._cond.notify()
+        self.wait()
+        self.set_archive(None)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Поток
+    # ─────────────────────────────────────────────────────────────────────────
+    def _archive_sample(self, sample: dict):
+        """В архив — всегда показатели всего экземпляра, а не тестового торрента."""
+        archive = self.archive
+        if archive is None:
+            return
+        instance = self._instance_stats
+        archive.update(instance if instance is not None else sample, sample["timestamp"])
+
+    def _sample(self) -> dict:
+        """Источник ``SamplingService``: текущие показатели из копии maindata."""
+        torrent_hash = self._torrent_hash
+        self._instance_stats = None
+        if not self.sync.update():
+            return dict(EMPTY_STATS)
+        if torrent_hash:
+            self._instance_stats = self.sync.main_stats()
+            stats = self.sync.torrent_stats(torrent_hash)
+            if not stats:
+                return dict(EMPTY_STATS)
+            # Get global DHT nodes for the nodes card
+            stats["dht_nodes"] = self._instance_stats.get("dht_nodes", 0)
+            # Дисковая очередь общая для всех раздач — нужна диагностике
+            stats.update(BenchmarkManager.disk_stats_from_state(self.sync.mirror.server_state))
+            return stats
+        return self.sync.main_stats()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not (self._stopping or self._commands):
+                    if not self._polling:
+                        self._cond.wait()
+                        continue
+                    delay = self.sampler.next_delay()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._stopping:
+                    return
+                command = self._commands.popleft() if self._commands else None
+
+            if command is None:
+                self.sampler.poll()
+                continue
+
+            name, func, args = command
+            try:
+                result = func(*args)
+            except Exception as e:
+                print(f"Benchmark command '{name}' failed: {e}")
+                result = None
+            self.command_finished.emit(name, result)
@@ -34,6 +34,8 @@ from optimizer.models import (
 )
 from optimizer.config_manager import ConfigManager
 from optimizer.session_manager import SessionManager
+from optimizer.disk_benchmark import profile_to_dict, profile_from_dict
+from optimizer.memory_model import COMPONENT_LABELS
 
 
 class MainWindow(QMainWindow):
@@ -51,6 +53,10 @@ class MainWindow(QMainWindow):
         self._setup_ui()
         if not self._load_session():
             self._show_welcome()
+
+    def closeEvent(self, event):
+        self.benchmark_tab.shutdown()
+        super().closeEvent(event)
     
     def _setup_ui(self):
         central = QWidget()
@@ -116,6 +122,9 @@ class MainWindow(QMainWindow):
         self.hardware_tab = HardwareTab()
         self.usage_tab = UsageTab()
         self.benchmark_tab = BenchmarkTab()
+        # Прогоны сохраняются в историю вместе с рассчитанными настройками и средой
+        self.benchmark_tab.context_provider = lambda: (self._last_result, self._environment.name)
+        self.benchmark_tab.live_applied.connect(self._on_live_applied)
         
         self.tabs.addTab(self.network_tab, "📡 Сеть")
         self.tabs.addTab(self.hardware_tab, "💻 Железо")
@@ -343,15 +352,42 @@ class MainWindow(QMainWindow):
         output = self._format_results(result)
         self.results_text.setHtml(output)
         
-        # Enable apply button if config found
-        if self.config_manager.config_path:
+        # Применить можно в файл или на лету через подключённый WebAPI
+        if self.config_manager.config_path or self.benchmark_tab.is_connected:
             self.apply_button.setEnabled(True)
 
     def _on_apply_settings(self):
-        """Записать настройки в файл."""
+        """Применить настройки: через WebAPI без перезапуска или записью в файл."""
         if not self._last_result:
             return
 
+        if self.benchmark_tab.is_connected:
+            msg = QMessageBox(self)
+            msg.setWindowTitle("Применение настроек")
+            msg.setText(
+                "qBittorrent подключён через Web UI.\n\n"
+                "Применить настройки на лету? Будут отправлены только отличающиеся "
+                "ключи, перезапуск не нужен."
+            )
+            live = msg.addButton("На лету (WebAPI)", QMessageBox.ButtonRole.AcceptRole)
+            to_file = msg.addButton("В файл", QMessageBox.ButtonRole.ActionRole)
+            msg.addButton("Отмена", QMessageBox.ButtonRole.RejectRole)
+            to_file.setEnabled(self.config_manager.config_path is not None)
+            msg.exec()
+            if msg.clickedButton() is live:
+                self.apply_button.setEnabled(False)
+                self.benchmark_tab.apply_settings_live(self._last_result)
+                return
+            if msg.clickedButton() is not to_file:
+                return
+        elif not self.config_manager.config_path:
+            QMessageBox.warning(
+                self, "Внимание",
+                "Файл настроек не найден. Укажите его вручную или подключитесь "
+                "к Web UI на вкладке «Бенчмарк»."
+            )
+            return
+
         reply = QMessageBox.question(
             self, "Подтверждение",
             "Вы уверены, что хотите перезаписать настройки qBittorrent?\n\n"
@@ -360,7 +396,20 @@ class MainWindow(QMainWindow):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            success = self.config_manager.apply_settings(self._last_result)
+            force = False
+            lock = self.config_manager.locked_by()
+            if lock is not None:
+                # Запущенный qBittorrent перезапишет файл своими значениями при выходе
+                force = QMessageBox.warning(
+                    self, "qBittorrent запущен",
+                    f"Файл блокировки занят: {lock}\n\n"
+                    "Закройте qBittorrent и повторите. Записать всё равно?",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                    QMessageBox.StandardButton.No,
+                ) == QMessageBox.StandardButton.Yes
+                if not force:
+                    return
+            success = self.config_manager.apply_settings(self._last_result, force=force)
             if success:
                 QMessageBox.information(
                     self, "Успех",
@@ -373,6 +422,19 @@ class MainWindow(QMainWindow):
                     "Не удалось записать настройки в файл."
                 )
 
+    def _on_live_applied(self, result):
+        """Итог применения через WebAPI."""
+        self.apply_button.setEnabled(True)
+        if result is None:
+            QMessageBox.critical(self, "Ошибка", "Не удалось применить настройки через WebAPI.")
+        elif result.ok:
+            QMessageBox.information(
+                self, "Успех",
+                "Настройки применены без перезапуска qBittorrent.\n\n" + result.summary()
+            )
+        else:
+            QMessageBox.warning(self, "Внимание", "Применено не полностью.\n\n" + result.summary())
+
     def _save_session(self, n: NetworkSettings, h: HardwareSettings, u: UsageSettings):
         """Сохранить текущие параметры в JSON."""
         data = {
@@ -383,6 +445,7 @@ class MainWindow(QMainWindow):
                 "use_vpn": n.use_vpn,
                 "vpn_interface": n.vpn_interface,
                 "isp_throttling": n.isp_throttling,
+                "rtt_ms": n.rtt_ms,
             },
             "hardware": {
                 "storage": h.storage_type.name,
@@ -390,11 +453,15 @@ class MainWindow(QMainWindow):
                 "cores": h.cpu_cores,
                 "is_hybrid": h.is_hybrid_cpu,
                 "p_cores": h.p_cores,
+                "ram_share": h.ram_share,
+                "disk": profile_to_dict(h.disk) if h.disk else None,
             },
             "usage": {
                 "tracker": u.tracker_type.name,
                 "role": u.user_role.name,
                 "environment": u.environment.name,
+                "torrent_count": u.torrent_count,
+                "library_size_gb": u.library_size_gb,
             }
         }
         self.session_manager.save_session(data)
@@ -415,6 +482,7 @@ class MainWindow(QMainWindow):
                 use_vpn=nw["use_vpn"],
                 vpn_interface=nw["vpn_interface"],
                 isp_throttling=nw["isp_throttling"],
+                rtt_ms=nw.get("rtt_ms"),
             )
             self.network_tab.set_settings(n_settings)
 
@@ -426,6 +494,8 @@ class MainWindow(QMainWindow):
                 cpu_cores=hw["cores"],
                 is_hybrid_cpu=hw["is_hybrid"],
                 p_cores=hw["p_cores"],
+                ram_share=hw.get("ram_share", 0.5),
+                disk=profile_from_dict(hw["disk"]) if hw.get("disk") else None,
             )
             self.hardware_tab.set_settings(h_settings)
 
@@ -435,6 +505,8 @@ class MainWindow(QMainWindow):
                 tracker_type=TrackerType[us["tracker"]],
                 user_role=UserRole[us["role"]],
                 environment=EnvironmentProfile[us["environment"]],
+                torrent_count=us.get("torrent_count", 0),
+                library_size_gb=us.get("library_size_gb", 0.0),
             )
             self.usage_tab.set_settings(u_settings)
             
@@ -493,6 +565,12 @@ class MainWindow(QMainWindow):
                 return f"<div class='explain'>💡 {r.explanations[key]}</div>"
             return ""
         
+        budget = r.memory_budget
+        memory_html = "".join(
+            f"<div class='setting'>• {label}: <span class='value'>{budget[name]:.0f} МБ</span></div>"
+            for name, label in COMPONENT_LABELS.items()
+        ) if budget else ""
+
         html = f"""
         <style>
             body {{ font-family: Segoe UI, Arial; line-height: 1.6; color: #e0e0e0; }}
@@ -596,6 +674,11 @@ class MainWindow(QMainWindow):
         {explain("anonymous")}
         
         {f"<div class='setting'>• Network interface: <span class='value'>{r.network_interface}</span></div>" + explain("vpn_interface") if r.network_interface else ""}
+        
+        <h3>Бюджет памяти</h3>
+        <p class="path">Оценка резидентного размера qBittorrent</p>
+        {memory_html}
+        {explain("memory")}
         """
         
         # Advanced section
@@ -637,6 +720,12 @@ class MainWindow(QMainWindow):
             </div>
             {explain("coalesce")}
             
+            <div class="setting">
+                • File pool size: 
+                <span class="value">{r.file_pool_size}</span>
+            </div>
+            {explain("library")}
+            
             <h3 class="advanced">Network Tuning (Advanced)</h3>
             <p class="path">Tools → Options → Advanced</p>
             
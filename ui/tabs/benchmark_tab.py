@@ -1,5 +1,7 @@
 """Вкладка бенчмаркинга и мониторинга."""
 
+import time
+
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -15,9 +17,20 @@ from PyQt6.QtWidgets import (
     QCheckBox,
     QFileDialog,
 )
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal
 
 from optimizer.benchmark_manager import BenchmarkManager
+from optimizer.benchmark_store import BenchmarkStore
+from optimizer.diagnostics import RunContext, cpu_load, diagnose_run
+from optimizer.live_apply import apply_live
+from optimizer.rrd import RoundRobinStore, archive_name
+from optimizer.session_manager import SessionManager
+from optimizer.timeseries import TimeSeries
+from ..benchmark_worker import BenchmarkWorker
+
+RECORDING_SEC = 30
+STABILITY_WINDOW = 30
+
 
 class StatCard(QFrame):
     """Виджет карточки для отображения одного показателя."""
@@ -61,14 +74,30 @@ class StatCard(QFrame):
 class BenchmarkTab(QWidget):
     """Вкладка для проведения замеров производительности."""
     
+    # Итог применения настроек через WebAPI (LiveApplyResult)
+    live_applied = pyqtSignal(object)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.manager = BenchmarkManager()
-        self.history = []
+        self.history = TimeSeries(capacity=STABILITY_WINDOW)
         self._recording_state = None  # None, "baseline", "optimized"
-        self._recording_samples = []
-        self._recording_timer = QTimer()
-        self._recording_timer.timeout.connect(self._on_record_tick)
+        self._pending_compare = None  # снимок прогонов, отданный на сравнение
+        # Запас на частый опрос (0.5 сек) и слитые тики
+        self._recording_samples = TimeSeries(capacity=RECORDING_SEC * 4)
+        self._recording_started = 0.0
+        self._connected = False
+        self._archive_minute = 0
+        # История прогонов (SQLite) открывается при первой записи
+        self.store = None
+        # Главное окно подставляет (OptimizedSettings | None, имя среды)
+        self.context_provider = lambda: (None, "")
+
+        # Все обращения к WebAPI — в фоновом потоке
+        self.worker = BenchmarkWorker(self.manager, self)
+        self.worker.sample_ready.connect(self._on_sample)
+        self.worker.command_finished.connect(self._on_command_finished)
+        self.worker.start()
         
         # Ubuntu 25.10 "Questing Quokka"
         self._test_hash = "6a40552b7dfe176a928ba556128445103ca7fe45" 
@@ -82,8 +111,11 @@ class BenchmarkTab(QWidget):
         
         self._setup_ui()
         
-        self.timer = QTimer()
-        self.timer.timeout.connect(self._update_stats)
+    def shutdown(self):
+        """Остановить опрос и фоновый поток (при закрытии окна)."""
+        self.worker.stop()
+        if self.store is not None:
+            self.store.close()
         
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -232,11 +264,15 @@ class BenchmarkTab(QWidget):
         self.optimized_btn.setEnabled(False)
         self.optimized_btn.clicked.connect(lambda: self._start_recording("optimized"))
         btn_layout.addWidget(self.optimized_btn)
+
+        self.reset_runs_btn = QPushButton("🗑 Сбросить замеры")
+        self.reset_runs_btn.clicked.connect(self._reset_runs)
+        btn_layout.addWidget(self.reset_runs_btn)
         bench_layout.addLayout(btn_layout)
         
         self.progress = QProgressBar()
         self.progress.setTextVisible(False)
-        self.progress.setRange(0, 30)
+        self.progress.setRange(0, RECORDING_SEC)
         self.progress.setValue(0)
         self.progress.setStyleSheet("""
             QProgressBar {
@@ -281,8 +317,15 @@ class BenchmarkTab(QWidget):
         self.add_iso_btn.setEnabled(checked)
 
     def _toggle_connection(self):
-        if self.timer.isActive():
-            self.timer.stop()
+        if self._connected:
+            self._connected = False
+            self.worker.set_polling(False)
+            self.worker.submit("close_archive", self.worker.set_archive, None)
+            if self._recording_state is not None:
+                self._recording_state = None
+                self.worker.set_recording(False)
+                self.progress.setValue(0)
+                self.bench_desc.setText("Запись прервана: соединение закрыто.")
             self.connect_btn.setText("🔌 Подключиться")
             self.baseline_btn.setEnabled(False)
             self.optimized_btn.setEnabled(False)
@@ -293,17 +336,72 @@ class BenchmarkTab(QWidget):
             username = self.user_edit.text()
             password = self.pass_edit.text()
             
-            self.manager.host = host
-            if self.manager.connect(username, password):
-                self.timer.start(1000)
-                self.connect_btn.setText("🔴 Отключиться")
-                self.baseline_btn.setEnabled(True)
-                self.optimized_btn.setEnabled(True)
-                self.add_iso_btn.setEnabled(True)
-                self.cleanup_btn.setEnabled(True)
-                self.report_label.setText("Соединение установлено. Готов к замерам.")
-            else:
-                self.report_label.setText("⚠ Ошибка подключения! Проверьте WebAPI (Логин/Пароль).")
+            self.connect_btn.setEnabled(False)
+            self.connect_btn.setText("⏳ Подключение...")
+            self.worker.reset_sync()
+            self.worker.submit("connect", self._connect_job, host, username, password)
+
+    def _connect_job(self, host: str, username: str, password: str) -> bool:
+        """Выполняется в фоновом потоке."""
+        self.manager.host = host
+        if not self.manager.connect(username, password):
+            return False
+        try:
+            archive = RoundRobinStore(SessionManager(f"monitoring/{archive_name(host)}").session_path)
+        except (OSError, ValueError) as e:
+            print(f"Monitoring archive unavailable: {e}")
+            archive = None
+        self.worker.set_archive(archive)
+        return True
+
+    def _on_connected(self, ok: bool):
+        self.connect_btn.setEnabled(True)
+        if ok:
+            self._connected = True
+            self.worker.set_polling(True)
+            self.connect_btn.setText("🔴 Отключиться")
+            self.baseline_btn.setEnabled(True)
+            self.optimized_btn.setEnabled(True)
+            self.add_iso_btn.setEnabled(True)
+            self.cleanup_btn.setEnabled(True)
+            self.report_label.setText("Соединение установлено. Готов к замерам.")
+        else:
+            self.connect_btn.setText("🔌 Подключиться")
+            self.report_label.setText("⚠ Ошибка подключения! Проверьте WebAPI (Логин/Пароль).")
+
+    def _on_command_finished(self, name: str, result):
+        """Результат команды из фонового потока."""
+        if name == "connect":
+            self._on_connected(bool(result))
+        elif name == "add_iso":
+            self._on_test_iso_added(result)
+        elif name == "delete_iso":
+            self._on_test_iso_deleted(bool(result))
+        elif name == "compare":
+            # Снимок устарел, если прогоны сбросили или отправили новый
+            if result is not None and result[0] is self._pending_compare:
+                self.manager.comparison = result[1]
+                self._pending_compare = None
+            self.report_label.setText(self.manager.get_comparison_report())
+        elif name == "diagnose" and result is not None:
+            self.bench_desc.setText(f"{self.bench_desc.text()}\nДиагностика: {result.summary()}")
+            if result.recommendations:
+                self.bench_desc.setToolTip("\n".join(
+                    f"{r.field}: {r.current} → {r.suggested}. {r.reason}" if r.suggested is not None
+                    else f"{r.field}: {r.reason}"
+                    for r in result.recommendations
+                ))
+        elif name == "apply_live":
+            if result is not None:
+                self.report_label.setText(f"Применение через WebAPI: {result.summary()}")
+            self.live_applied.emit(result)
+        elif name == "store_run" and result is None:
+            self.bench_desc.setText(self.bench_desc.text() + " (в историю не сохранён)")
+
+    def _set_standardized(self, enabled: bool):
+        """Показатели тестового торрента (True) или всего клиента (False)."""
+        self._is_standardized = enabled
+        self.worker.set_torrent(self._test_hash if enabled else None)
 
     def _check_connection(self) -> bool:
         """Проверка подключения перед действием."""
@@ -320,10 +418,23 @@ class BenchmarkTab(QWidget):
         if not self._check_connection():
             return
 
+        self.add_iso_btn.setEnabled(False)
+        save_path = self.save_path_edit.text().strip()
+        self.worker.submit("add_iso", self._add_iso_job, save_path)
+
+    def _add_iso_job(self, save_path: str) -> str:
+        """Выполняется в фоновом потоке: "exists", "added" или "failed"."""
         # Проверяем, не добавлен ли уже этот торрент
-        stats = self.manager.get_torrent_stats(self._test_hash)
-        if stats:
-            self._is_standardized = True
+        if self.manager.get_torrent_stats(self._test_hash):
+            return "exists"
+        if self.manager.add_torrent(self._test_magnet, save_path=save_path):
+            return "added"
+        return "failed"
+
+    def _on_test_iso_added(self, outcome):
+        self.add_iso_btn.setEnabled(self.manager.is_connected)
+        if outcome == "exists":
+            self._set_standardized(True)
             self._is_external_torrent = True
             self.baseline_btn.setEnabled(True)
             self.optimized_btn.setEnabled(True)
@@ -335,9 +446,8 @@ class BenchmarkTab(QWidget):
             )
             return
 
-        save_path = self.save_path_edit.text().strip()
-        if self.manager.add_torrent(self._test_magnet, save_path=save_path):
-            self._is_standardized = True
+        if outcome == "added":
+            self._set_standardized(True)
             self._is_external_torrent = False
             QMessageBox.information(
                 self, "Добавлено", 
@@ -357,7 +467,7 @@ class BenchmarkTab(QWidget):
              # но не удаляем из клиента (или удаляем только задачу, без файлов).
              # Безопаснее всего - спросить или просто не удалять файлы.
              # Решение: Просто сбросить флаги в UI, сказав пользователю, что мы закончили.
-             self._is_standardized = False
+             self._set_standardized(False)
              self._is_external_torrent = False
              self.baseline_btn.setEnabled(False)
              self.optimized_btn.setEnabled(False)
@@ -365,13 +475,18 @@ class BenchmarkTab(QWidget):
              QMessageBox.information(self, "Готово", "Тест завершён. Ваш существующий торрент не был затронут.")
              return
 
-        if self.manager.delete_torrent(self._test_hash):
-            self._is_standardized = False
+        self.cleanup_btn.setEnabled(False)
+        self.worker.submit("delete_iso", self.manager.delete_torrent, self._test_hash)
+
+    def _on_test_iso_deleted(self, ok: bool):
+        if ok:
+            self._set_standardized(False)
             self.baseline_btn.setEnabled(False)
             self.optimized_btn.setEnabled(False)
             self.cleanup_btn.setEnabled(False)
             QMessageBox.information(self, "Готово", "Тестовые данные удалены из qBittorrent.")
         else:
+            self.cleanup_btn.setEnabled(True)
             QMessageBox.warning(self, "Ошибка", "Не удалось удалить торрент.")
 
     def _start_recording(self, mode: str):
@@ -380,8 +495,10 @@ class BenchmarkTab(QWidget):
             return
             
         self._recording_state = mode
-        self._recording_samples = []
+        self._recording_samples.clear()
+        self._recording_started = time.time()
         self.progress.setValue(0)
+        self.worker.set_recording(True)
         
         self.baseline_btn.setEnabled(False)
         self.optimized_btn.setEnabled(False)
@@ -390,41 +507,32 @@ class BenchmarkTab(QWidget):
         
         prefix = "🔬 [STANDARDIZED]" if self._is_standardized else "🔴 [LIVE]"
         self.bench_desc.setText(f"{prefix} Идет запись ({mode.upper()})... Ждите 30 сек.")
-        
-        self._recording_timer.start(1000)
-
-    def _on_record_tick(self):
-        """Очередной тик записи."""
-        if self._is_standardized:
-            stats = self.manager.get_torrent_stats(self._test_hash)
-            if not stats:
-                stats = {"dl_speed": 0, "ul_speed": 0, "dht_nodes": 0}
-            else:
-                # Add dht_nodes from general stats for complete consistency
-                gen = self.manager.get_main_stats()
-                stats["dht_nodes"] = gen.get("dht_nodes", 0)
-        else:
-            stats = self.manager.get_main_stats()
-            
+
+    def _on_record_sample(self, stats: dict):
+        """Очередной образец записи."""
         self._recording_samples.append(stats)
         
-        current_val = self.progress.value() + 1
-        self.progress.setValue(current_val)
+        # Прогресс — по времени: интервал опроса адаптивный, тики могут сливаться
+        elapsed = stats["timestamp"] - self._recording_started
+        self.progress.setValue(min(RECORDING_SEC, int(elapsed)))
         
-        if current_val >= 30:
+        if elapsed >= RECORDING_SEC:
             self._finish_recording()
 
     def _finish_recording(self):
         """Завершить запись и проанализировать."""
-        self._recording_timer.stop()
-        analysis = self.manager.analyze_results(self._recording_samples)
+        self.worker.set_recording(False)
+        samples = self._recording_samples.samples()
+        analysis = self.manager.add_run(self._recording_state, samples)
+        settings, environment = self.context_provider()
+        self.worker.submit("store_run", self._store_run_job, self._recording_state, samples, settings, environment)
+        self.worker.submit("diagnose", self._diagnose_job, samples, settings)
         
         if self._recording_state == "baseline":
-            self.manager.baseline_results = analysis
             msg = "✅ Baseline замер завершен! Настройте qBittorrent и нажмите 'Optimized'."
         else:
-            self.manager.optimized_results = analysis
             msg = "✅ Optimized замер завершен!"
+        msg += f" Прогонов: {analysis['runs']} (повторите для надёжного вывода)."
             
         self.bench_desc.setText(msg)
         self.baseline_btn.setEnabled(True)
@@ -432,9 +540,55 @@ class BenchmarkTab(QWidget):
         self.add_iso_btn.setEnabled(True)
         self.cleanup_btn.setEnabled(True)
         
-        report = self.manager.get_comparison_report()
-        self.report_label.setText(report)
+        self.report_label.setText(self.manager.get_comparison_report())
         self._recording_state = None
+        if all(self.manager.runs.values()):
+            # Бутстрап нагружает CPU — считаем в фоновом потоке
+            # Снимок берётся в потоке GUI: add_run/reset_runs меняют прогоны здесь же
+            self._pending_compare = self.manager.snapshot_runs()
+            self.worker.submit("compare", self._compare_job, self._pending_compare)
+
+    @staticmethod
+    def _compare_job(runs: dict) -> tuple:
+        """Сравнение снимка прогонов (в фоновом потоке); снимок — для сверки."""
+        return runs, BenchmarkManager.compute_comparison(runs)
+
+    def _store_run_job(self, mode: str, samples: list, settings, environment: str) -> int:
+        """Сохранить прогон в историю (в фоновом потоке: версия и настройки — из WebAPI)."""
+        if self.store is None:
+            self.store = BenchmarkStore(SessionManager("benchmarks.db").session_path)
+        return self.store.record_run(
+            self.manager.host,
+            mode,
+            samples,
+            settings=settings,
+            preferences=self.manager.get_preferences(),
+            environment=environment,
+            qbt_version=self.manager.get_version(),
+        )
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected and self.manager.is_connected
+
+    def apply_settings_live(self, settings):
+        """Применить настройки на лету (setPreferences), итог — сигнал ``live_applied``."""
+        self.worker.submit("apply_live", apply_live, self.manager, settings)
+
+    def _diagnose_job(self, samples: list, settings):
+        """Узкое место прогона (в фоновом потоке: лимиты — из app/preferences)."""
+        local = any(h in self.manager.host for h in ("localhost", "127.0.0.1", "[::1]"))
+        context = RunContext.from_preferences(
+            self.manager.get_preferences(), cpu_load=cpu_load() if local else None
+        )
+        return diagnose_run(samples, context, settings)
+
+    def _reset_runs(self):
+        """Забыть все прогоны (новая серия сравнения)."""
+        self.manager.reset_runs()
+        self._pending_compare = None
+        self.bench_desc.setText("Замеры сброшены. Нажмите 'Baseline' для замера текущих показателей.")
+        self.report_label.setText("Нет замеров.")
 
     def _show_guide(self):
         """Показать инструкцию по настройке Web UI."""
@@ -450,25 +604,33 @@ class BenchmarkTab(QWidget):
         )
         QMessageBox.information(self, "Настройка Web UI", guide)
 
-    def _update_stats(self):
-        if self._is_standardized:
-            stats = self.manager.get_torrent_stats(self._test_hash)
-            if stats:
-                # Get global DHT nodes for the nodes card
-                gen = self.manager.get_main_stats()
-                stats["dht_nodes"] = gen.get("dht_nodes", 0)
-            else:
-                stats = {"dl_speed": 0, "ul_speed": 0, "dht_nodes": 0}
-        else:
-            stats = self.manager.get_main_stats()
+    def _on_sample(self, stats: dict):
+        """Готовый образец из фонового потока."""
+        if self._recording_state is not None:
+            self._on_record_sample(stats)
 
         self.dl_card.set_value(f"{stats['dl_speed'] / (1024*1024):.2f}")
         self.ul_card.set_value(f"{stats['ul_speed'] / (1024*1024):.2f}")
         self.nodes_card.set_value(str(stats['dht_nodes']))
         
+        # Окно фиксированной длины: O(1) на образец
         self.history.append(stats)
-        if len(self.history) > 30:
-            self.history.pop(0)
-            
-        analysis = self.manager.analyze_results(self.history)
-        self.stable_card.set_value(f"{analysis.get('stability_score', 0)}%")
+        self.stable_card.set_value(f"{round(self.history.stability(), 1)}%")
+
+        # Сводка за сутки из архива — раз в минуту (читается только окно)
+        minute = int(stats["timestamp"] // 60)
+        archive = self.worker.archive
+        if archive is not None and minute != self._archive_minute:
+            self._archive_minute = minute
+            self._update_archive_tooltips(archive, stats["timestamp"])
+
+    def _update_archive_tooltips(self, archive: RoundRobinStore, now: float):
+        """Подсказки карточек скорости: min/avg/max за последние 24 часа."""
+        mb = 1024 * 1024
+        for card, field in ((self.dl_card, "dl_speed"), (self.ul_card, "ul_speed")):
+            day = archive.summary(field, now - 24 * 3600, now)
+            if day:
+                card.setToolTip(
+                    f"За 24 ч: мин {day['min'] / mb:.2f}, "
+                    f"сред {day['avg'] / mb:.2f}, макс {day['max'] / mb:.2f} МБ/с"
+                )
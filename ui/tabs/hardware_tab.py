@@ -11,11 +11,13 @@ from PyQt6.QtWidgets import (
     QCheckBox,
     QGroupBox,
     QLabel,
+    QFileDialog,
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
 from optimizer.models import StorageType, HardwareSettings
 from optimizer.hardware_detector import HardwareDetector
+from optimizer.disk_benchmark import DiskBenchmark
 from PyQt6.QtWidgets import QPushButton
 
 
@@ -57,6 +59,7 @@ class HardwareTab(QWidget):
         self._storage_touched = False
         self._ram_touched = False
         self._cores_touched = False
+        self._disk_profile = None
         self.detector = HardwareDetector()
         self._setup_ui()
     
@@ -104,6 +107,15 @@ class HardwareTab(QWidget):
         hint.setStyleSheet("color: #aaa; font-size: 11px;")
         storage_layout.addWidget(hint)
         
+        self.diskbench_btn = QPushButton("💽 Замерить диск (папка загрузок)...")
+        self.diskbench_btn.clicked.connect(self._on_disk_benchmark)
+        storage_layout.addWidget(self.diskbench_btn)
+        
+        self.disk_label = QLabel("Без замера: кэш и потоки I/O — по типу накопителя")
+        self.disk_label.setStyleSheet("color: #aaa; font-size: 11px;")
+        self.disk_label.setWordWrap(True)
+        storage_layout.addWidget(self.disk_label)
+        
         layout.addWidget(storage_group)
         
         # === RAM ===
@@ -139,6 +151,22 @@ class HardwareTab(QWidget):
         hint.setStyleSheet("color: #aaa; font-size: 11px;")
         ram_layout.addWidget(hint)
         
+        share_layout = QHBoxLayout()
+        share_layout.addWidget(QLabel("Доступно qBittorrent:"))
+        self.ram_share_spin = QSpinBox()
+        self.ram_share_spin.setRange(10, 90)
+        self.ram_share_spin.setSingleStep(5)
+        self.ram_share_spin.setValue(50)
+        self.ram_share_spin.setSuffix(" %")
+        self.ram_share_spin.setFixedWidth(100)
+        share_layout.addWidget(self.ram_share_spin)
+        share_layout.addStretch()
+        ram_layout.addLayout(share_layout)
+        
+        hint = QLabel("Кэш и лимиты будут снижены, если оценка памяти не помещается")
+        hint.setStyleSheet("color: #aaa; font-size: 11px;")
+        ram_layout.addWidget(hint)
+        
         layout.addWidget(ram_group)
         
         # === CPU ===
@@ -273,6 +301,8 @@ class HardwareTab(QWidget):
         self.cores_spin.setValue(settings.cpu_cores)
         self.hybrid_check.setChecked(settings.is_hybrid_cpu)
         self.p_cores_spin.setValue(settings.p_cores)
+        self.ram_share_spin.setValue(round(settings.ram_share * 100))
+        self._set_disk_profile(settings.disk)
         
         self._storage_touched = True
         self._ram_touched = True
@@ -285,8 +315,51 @@ class HardwareTab(QWidget):
             cpu_cores=self.cores_spin.value(),
             is_hybrid_cpu=self.hybrid_check.isChecked(),
             p_cores=self.p_cores_spin.value() if self.hybrid_check.isChecked() else 0,
+            disk=self._disk_profile,
+            ram_share=self.ram_share_spin.value() / 100,
         )
 
+    def _set_disk_profile(self, profile):
+        self._disk_profile = profile
+        if profile is None:
+            self.disk_label.setText("Без замера: кэш и потоки I/O — по типу накопителя")
+            return
+        i = profile.queue_depths.index(max(profile.queue_depths))
+        self.disk_label.setText(
+            f"Замер: запись {profile.seq_write_mb_s:.0f} МБ/с, "
+            f"16К чтение до {max(profile.read_iops):.0f} IOPS, "
+            f"запись до {max(profile.write_iops):.0f} IOPS "
+            f"(QD{profile.queue_depths[i]}: {profile.read_latency_ms[i]:.2f} мс)"
+        )
+
+    def _on_disk_benchmark(self):
+        """Замер диска в фоновом потоке."""
+        directory = QFileDialog.getExistingDirectory(self, "Папка загрузок qBittorrent")
+        if not directory:
+            return
+        self.diskbench_btn.setEnabled(False)
+        self.diskbench_btn.setText("⏳ Замер диска... (до 20 сек)")
+        
+        class BenchThread(QThread):
+            finished = pyqtSignal(object, str)
+            def run(self):
+                try:
+                    self.finished.emit(DiskBenchmark(directory).run(), "")
+                except OSError as e:
+                    self.finished.emit(None, str(e))
+        
+        self.bench_thread = BenchThread(self)
+        self.bench_thread.finished.connect(self._on_disk_benchmark_finished)
+        self.bench_thread.start()
+
+    def _on_disk_benchmark_finished(self, profile, error):
+        self.diskbench_btn.setEnabled(True)
+        self.diskbench_btn.setText("💽 Замерить диск (папка загрузок)...")
+        if profile is None:
+            self.disk_label.setText(f"Замер не удался: {error}")
+            return
+        self._set_disk_profile(profile)
+
     def _on_autodetect(self):
         """Авто-определение характеристик."""
         # RAM
@@ -163,6 +163,17 @@ class NetworkTab(QWidget):
         hint.setStyleSheet("color: #aaa; font-size: 11px;")
         connection_layout.addRow(hint)
         
+        self.rtt_spin = QSpinBox()
+        self.rtt_spin.setRange(0, 5000)
+        self.rtt_spin.setSuffix(" мс")
+        self.rtt_spin.setSpecialValueText("Не измерено")
+        self.rtt_spin.setFixedWidth(120)
+        connection_layout.addRow("Задержка (RTT):", self.rtt_spin)
+        
+        self.rtt_label = QLabel("Спидтест замерит RTT; буфер отправки рассчитается по BDP")
+        self.rtt_label.setStyleSheet("color: #aaa; font-size: 11px;")
+        connection_layout.addRow(self.rtt_label)
+        
         layout.addWidget(connection_group)
         
         # === ISP Throttling ===
@@ -277,6 +288,7 @@ class NetworkTab(QWidget):
         self.vpn_check.setChecked(settings.use_vpn)
         self.vpn_interface_edit.setText(settings.vpn_interface)
         self.isp_throttle_check.setChecked(settings.isp_throttling)
+        self.rtt_spin.setValue(round(settings.rtt_ms or 0))
         
         # Сбрасываем флаги touched так как это программная установка
         self._download_touched = True
@@ -290,6 +302,7 @@ class NetworkTab(QWidget):
             use_vpn=self.vpn_check.isChecked(),
             vpn_interface=self.vpn_interface_edit.text().strip(),
             isp_throttling=self.isp_throttle_check.isChecked(),
+            rtt_ms=float(self.rtt_spin.value()) or None,
         )
 
     def _on_test_connection(self):
@@ -298,16 +311,17 @@ class NetworkTab(QWidget):
         self.test_btn.setText("⏳ Тестирование... (до 20 сек)")
         
         class TestThread(QThread):
-            finished = pyqtSignal(float, float, str)
+            finished = pyqtSignal(float, float, str, dict)
             def run(self):
                 dl, ul, server = NetworkTester.run_full_test()
-                self.finished.emit(dl, ul, server)
+                rtt = NetworkTester.test_rtt_ms()
+                self.finished.emit(dl, ul, server, rtt)
         
         self.thread = TestThread(self)
         self.thread.finished.connect(self._on_test_finished)
         self.thread.start()
 
-    def _on_test_finished(self, dl, ul, server):
+    def _on_test_finished(self, dl, ul, server, rtt):
         """Обработка результатов теста."""
         self.test_btn.setEnabled(True)
         self.test_btn.setText(f"🚀 Тест: {server}")
@@ -318,3 +332,12 @@ class NetworkTab(QWidget):
         if ul > 0:
             self.upload_spin.setValue(int(ul))
             self._upload_touched = True
+        
+        idle, loaded = rtt.get("idle", {}), rtt.get("loaded", {})
+        if loaded.get("samples"):
+            # Под нагрузкой — та задержка, которую видят пиры при раздаче
+            self.rtt_spin.setValue(round(loaded["p50"]))
+            self.rtt_label.setText(
+                f"RTT: простой {idle.get('p50', '—')} мс, "
+                f"под нагрузкой {loaded['p50']} мс (p90 {loaded['p90']} мс)"
+            )
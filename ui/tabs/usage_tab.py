@@ -8,10 +8,16 @@ from PyQt6.QtWidgets import (
     QButtonGroup,
     QGroupBox,
     QLabel,
+    QFormLayout,
+    QSpinBox,
+    QDoubleSpinBox,
+    QPushButton,
+    QFileDialog,
 )
 from PyQt6.QtCore import Qt
 
 from optimizer.models import TrackerType, UserRole, EnvironmentProfile, UsageSettings
+from optimizer.library_scanner import find_bt_backup, scan_bt_backup
 
 
 class UsageTab(QWidget):
@@ -102,6 +108,33 @@ class UsageTab(QWidget):
         
         layout.addWidget(role_group)
         
+        # === Библиотека ===
+        library_group = QGroupBox("Библиотека раздач")
+        library_layout = QFormLayout(library_group)
+        
+        self.torrent_count_spin = QSpinBox()
+        self.torrent_count_spin.setRange(0, 1_000_000)
+        self.torrent_count_spin.setSpecialValueText("Не задано")
+        self.torrent_count_spin.setFixedWidth(120)
+        library_layout.addRow("Раздач в клиенте:", self.torrent_count_spin)
+        
+        self.library_size_spin = QDoubleSpinBox()
+        self.library_size_spin.setRange(0, 10_000_000)
+        self.library_size_spin.setDecimals(0)
+        self.library_size_spin.setSuffix(" ГБ")
+        self.library_size_spin.setFixedWidth(120)
+        library_layout.addRow("Общий объём:", self.library_size_spin)
+        
+        self.scan_btn = QPushButton("📂 Подсчитать по BT_backup...")
+        self.scan_btn.clicked.connect(self._on_scan_library)
+        library_layout.addRow(self.scan_btn)
+        
+        hint = QLabel("Для тысяч раздач: очередь, соединения и file pool масштабируются")
+        hint.setStyleSheet("color: #aaa; font-size: 11px;")
+        library_layout.addRow(hint)
+        
+        layout.addWidget(library_group)
+        
         # === Справка ===
         info_group = QGroupBox("Справка")
         info_layout = QVBoxLayout(info_group)
@@ -141,7 +174,21 @@ class UsageTab(QWidget):
             self.seeder_radio.setChecked(True)
         else:
             self.uploader_radio.setChecked(True)
+        
+        self.torrent_count_spin.setValue(settings.torrent_count)
+        self.library_size_spin.setValue(settings.library_size_gb)
 
+    def _on_scan_library(self):
+        """Подсчитать раздачи по каталогу BT_backup qBittorrent."""
+        directory = find_bt_backup()
+        if directory is None:
+            chosen = QFileDialog.getExistingDirectory(self, "Каталог BT_backup qBittorrent")
+            if not chosen:
+                return
+            directory = chosen
+        count, size_gb = scan_bt_backup(directory)
+        self.torrent_count_spin.setValue(count)
+        self.library_size_spin.setValue(size_gb)
     
     def get_settings(self) -> UsageSettings:
         """Получить выбранный сценарий использования."""
@@ -161,4 +208,6 @@ class UsageTab(QWidget):
             tracker_type=tracker_type, 
             user_role=role,
             environment=self._environment,
+            torrent_count=self.torrent_count_spin.value(),
+            library_size_gb=self.library_size_spin.value(),
         )